@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file
 import subprocess
 import os
 import sys
@@ -8,6 +8,12 @@ import pyodbc
 from scripts.data_retrieval  import daily_data_retrieval
 from scripts.sql_upload import upload_market_states_system_a
 from scripts.sql_upload import upload_market_states_system_b
+from scripts.classifier_runner import run_classifiers, summarize_results, diagnostic_rows
+from scripts.frame_cache import frame_cache_stats
+from scripts.result_cache import cache_stats
+from scripts.storage import export_csv
+from scripts.query_index import state_index, indicator_frame, frame_rows, render_rows
+from scripts.download_cache import send_download, send_delta
 app = Flask(__name__)
 logger = get_logger("flask_app")
 
@@ -81,18 +87,7 @@ def update_local_files():
 
 @app.route("/download/<filename>", methods=["GET"])
 def download_file(filename):
-    try:
-        base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "data"))
-        file_path = os.path.join(base_dir, filename)
-
-        if not os.path.exists(file_path):
-            logger.error(f"File not found: {file_path}")
-            return jsonify({"error": f"{filename} does not exist"}), 404
-
-        return send_file(file_path, as_attachment=True)
-    except Exception as e:
-        logger.error(f"Error sending file: {e}")
-        return jsonify({"error": str(e)}), 500
+    return _send_data_file(filename)
 
 @app.route("/test-sql-connection", methods=["GET"])
 def test_sql_connection():
@@ -136,22 +131,13 @@ def test_sql_connection():
 @app.route("/run-classify-upload-system-a", methods=["POST"])
 def run_classify_upload_system_a():
     try:
-        result = subprocess.run(
-            [sys.executable, "scripts/scoring_Euclidean.py"],
-            check=True,
-            capture_output=True,
-            text=True
-        )
-        logger.info("System A classification completed.")
-        logger.info(result.stdout)
+        results, timings = run_classifiers(["A"])
+        logger.info(f"System A classification completed in {timings['total_seconds']}s.")
 
         upload_market_states_system_a()
         logger.info("System A upload to SQL completed.")
-        return jsonify({"status": "System A classification + upload complete"}), 200
-
-    except subprocess.CalledProcessError as e:
-        logger.error(f"System A script failed: {e.stderr}")
-        return jsonify({"error": e.stderr}), 500
+        return jsonify({"status": "System A classification + upload complete",
+                        "timings": summarize_results(results, timings)}), 200
 
     except Exception as e:
         logger.error(f"System A pipeline failed: {e}", exc_info=True)
@@ -161,28 +147,45 @@ def run_classify_upload_system_a():
 @app.route("/run-classify-upload-system-b", methods=["POST"])
 def run_classify_upload_system_b():
     try:
-        result = subprocess.run(
-            [sys.executable, "scripts/scoring_Original.py"],
-            check=True,
-            capture_output=True,
-            text=True
-        )
-        logger.info("System B classification completed.")
-        logger.info(result.stdout)
+        results, timings = run_classifiers(["B"])
+        logger.info(f"System B classification completed in {timings['total_seconds']}s.")
 
         upload_market_states_system_b()
         logger.info("System B upload to SQL completed.")
-        return jsonify({"status": "System B classification + upload complete"}), 200
-
-    except subprocess.CalledProcessError as e:
-        logger.error(f"System B script failed: {e.stderr}")
-        return jsonify({"error": e.stderr}), 500
+        return jsonify({"status": "System B classification + upload complete",
+                        "timings": summarize_results(results, timings)}), 200
 
     except Exception as e:
         logger.error(f"System B pipeline failed: {e}", exc_info=True)
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/run-classify-all", methods=["POST"])
+def run_classify_all():
+    try:
+        payload = request.get_json(silent=True) or {}
+        results, timings = run_classifiers(
+            payload.get("systems"),
+            incremental=bool(payload.get("incremental", False)),
+            rerun_from=payload.get("rerun_from"),
+        )
+        summary = summarize_results(results, timings)
+        logger.info(f"Classified systems {', '.join(results)} in {timings['total_seconds']}s.")
+
+        if payload.get("upload", False):
+            if "A" in results:
+                upload_market_states_system_a()
+            if "B" in results:
+                upload_market_states_system_b()
+            logger.info("Classified systems uploaded to SQL.")
+        return jsonify({"status": "Classification complete", **summary}), 200
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Combined classification failed: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
 @app.route("/upload-market-states-system-a", methods=["POST"])
 def run_upload_system_a():
     try:
@@ -202,6 +205,48 @@ def run_upload_system_b():
     except Exception as e:
         logger.error(f"System B SQL upload failed: {e}", exc_info=True)
         return jsonify({"error": str(e)}), 500
+
+# === Query Routes ===
+# JSON by default, NDJSON (one row per line) with ?format=ndjson
+
+def _rows_response(rows, key):
+    ndjson = request.args.get("format") == "ndjson"
+    return Response(render_rows(rows, key, ndjson),
+                    mimetype="application/x-ndjson" if ndjson else "application/json")
+
+@app.route("/states", methods=["GET"])
+def get_states():
+    """States from the in-memory state index, e.g. /states?system=B&start=2024-01-01&end=2024-06-30."""
+    try:
+        rows = state_index().lookup(request.args.get("system"), request.args.get("start"), request.args.get("end"))
+        return _rows_response(rows, "states")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"State query failed: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/indicators", methods=["GET"])
+def get_indicators():
+    """Indicator rows from the column store, e.g. /indicators?cols=RSI_14_SP500,BBW&start=2025-01-01."""
+    try:
+        cols = request.args.get("cols")
+        df = indicator_frame(cols.split(",") if cols else None, request.args.get("start"), request.args.get("end"))
+        return _rows_response(frame_rows(df), "indicators")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except FileNotFoundError as e:
+        logger.error(f"Indicator query failed: {e}")
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        logger.error(f"Indicator query failed: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/cache-metrics", methods=["GET"])
+def cache_metrics():
+    """Hit/miss/reload counters of the in-process frame cache and the classification result cache."""
+    return jsonify({"frames": frame_cache_stats(), "classification_results": cache_stats()}), 200
+
 # === Dedicated Download Routes ===
 
 @app.route("/download/market-data", methods=["GET"])
@@ -235,12 +280,24 @@ def _send_data_file(filename):
     try:
         base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "data"))
         file_path = os.path.join(base_dir, filename)
+        if filename.endswith(".csv"):
+            # With the Parquet backend the CSV is an export, refreshed when the dataset is newer
+            export_csv(file_path)
 
         if not os.path.exists(file_path):
             logger.error(f"File not found: {file_path}")
             return jsonify({"error": f"{filename} does not exist"}), 404
 
-        return send_file(file_path, as_attachment=True)
+        # ?since=2025-07-01&until=...&columns=Close_SP500,MarketState streams just that slice;
+        # columns=...,Diagnostics renders the diagnostics text for the selected rows
+        since, until, columns = request.args.get("since"), request.args.get("until"), request.args.get("columns")
+        if since or until or columns:
+            columns = columns.split(",") if columns else None
+            rows = diagnostic_rows(file_path, since, until, columns)
+            return send_delta(file_path, since, until, columns, rows=rows)
+        return send_download(file_path)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Error sending file {filename}: {e}")
         return jsonify({"error": str(e)}), 500
@@ -6,6 +6,7 @@ from datetime import datetime
 import argparse
 from dotenv import load_dotenv
 from scripts.logger import get_logger
+from scripts.storage import write_frame
 
 # Load environment variables
 load_dotenv()
@@ -87,7 +88,7 @@ def save_market_data(start_date, end_date):
         valid_days = get_valid_trading_days(start_date, end_date)
         df = df[df["Date"].isin(valid_days)]
         df.sort_values("Date", inplace=True)
-        df.to_csv(filepath, index=False)
+        write_frame(df, filepath)
         logger.info(f"✅ Saved MarketStates_Data.csv to {filepath}")
     else:
         logger.warning("⚠️ No data retrieved from FMP API.")
@@ -3,6 +3,7 @@ import pandas as pd
 import os
 from dotenv import load_dotenv
 from scripts.logger import get_logger
+from scripts.storage import CORRECTION_WINDOW, read_tail, upsert_frame, frame_exists
 
 # Load .env
 load_dotenv()
@@ -101,26 +102,48 @@ def reformat_breadth_data():
         raise
 
 
+def merge_breadth_rows(breadth_df, market_path):
+    """
+    Merge NYAD/NYMO columns into the stored market frame by Date.
+
+    Once the frame carries breadth columns, only breadth rows inside the
+    storage correction window are compared against the stored tail, and just
+    the dates whose values changed are written. The first merge adds the
+    columns and rewrites the frame once.
+    """
+    breadth_cols = [col for col in breadth_df.columns if col != "Date"]
+    tail = read_tail(market_path, CORRECTION_WINDOW)
+    if not len(tail) or set(breadth_cols) - set(tail.columns):
+        upsert_frame(breadth_df, market_path, partial=True)
+        return len(breadth_df)
+
+    recent = breadth_df[breadth_df["Date"] >= tail["Date"].iloc[0]].reset_index(drop=True)
+    stored = tail.drop_duplicates(subset=["Date"], keep="last").set_index("Date")[breadth_cols]
+    stored = stored.reindex(recent["Date"]).reset_index(drop=True)
+    fresh = recent[breadth_cols]
+    unchanged = ((stored == fresh) | (stored.isna() & fresh.isna())).all(axis=1)
+    changed = recent[~unchanged.to_numpy()]
+    if not changed.empty:
+        upsert_frame(changed, market_path, partial=True)
+    return len(changed)
+
 def merge_with_market_data():
     """Merge reformatted breadth data into MarketStates_Data.csv, starting from 2005-01-01."""
     market_path = os.path.join(data_dir, "MarketStates_Data.csv")
     breadth_path = os.path.join(data_dir, "MarketData_NYAD_NYMO.csv")
 
-    if not os.path.exists(market_path):
+    if not frame_exists(market_path):
         logger.warning("MarketStates_Data.csv not found. Skipping merge.")
         return
 
     try:
-        market_df = pd.read_csv(market_path, parse_dates=["Date"])
-        breadth_df = pd.read_csv(breadth_path, parse_dates=["Date"])
+        breadth_df = pd.read_csv(breadth_path, parse_dates=["Date"], float_precision="round_trip")
 
         # Filter breadth data to 2005-01-01 and later
         breadth_df = breadth_df[breadth_df["Date"] >= pd.Timestamp("2005-01-01")]
 
-        final_df = pd.merge(market_df, breadth_df, on="Date", how="outer")
-        final_df.sort_values("Date", inplace=True)
-        final_df.to_csv(market_path, index=False)
-        logger.info(f"Merged breadth data (from 2005) into MarketStates_Data.csv")
+        merged = merge_breadth_rows(breadth_df, market_path)
+        logger.info(f"Merged breadth data (from 2005) into MarketStates_Data.csv, {merged} date(s) updated")
     except Exception as e:
         logger.error(f"Failed to merge with market data: {e}")
         raise
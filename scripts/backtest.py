@@ -0,0 +1,164 @@
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import numpy as np
+
+from scripts.logger import get_logger
+from scripts.scoring_Euclidean import (
+    SYSTEM_A_THRESHOLDS, compute_scores_system_a_vectorized, state_profiles,
+)
+from scripts.scoring_Original import (
+    REQUIRED_INDICATORS as REQUIRED_B, SYSTEM_B_THRESHOLDS, SYSTEM_B_GAP, STATES_B,
+    score_matrix_system_b, _sticky_states,
+)
+
+logger = get_logger("backtest")
+
+# Forward S&P 500 return horizons (trading days) reported per state
+DEFAULT_HORIZONS = (5, 20)
+
+# Profile sets evaluated together per score matrix; bounds the (profiles x rows x states) distance block
+PROFILE_CHUNK = 64
+
+# ========== Configurations ==========
+def param_grid(**grid):
+    """
+    Expand {name: [values]} into a list of config dicts, one per combination.
+
+    Names are threshold keys of SYSTEM_A_THRESHOLDS / SYSTEM_B_THRESHOLDS, plus
+    "profiles" (a {state: vector} dict, System A) and "gap" (System B).
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def _split_config(config, threshold_keys):
+    thresholds = {k: v for k, v in config.items() if k in threshold_keys}
+    unknown = set(config) - set(threshold_keys) - {"profiles", "gap"}
+    if unknown:
+        raise ValueError(f"Unknown backtest parameter(s): {', '.join(sorted(unknown))}")
+    return thresholds
+
+# ========== Metrics ==========
+def forward_returns(df, horizons=DEFAULT_HORIZONS):
+    """Forward S&P 500 percent returns per horizon, NaN where the window runs past the data."""
+    close = df["Close_SP500"].to_numpy(dtype=np.float64)
+    out = {}
+    for h in horizons:
+        fwd = np.full(len(close), np.nan)
+        if len(close) > h:
+            fwd[:-h] = (close[h:] / close[:-h] - 1) * 100
+        out[h] = fwd
+    return out
+
+def state_metrics(codes, names, fwd_returns):
+    """
+    Distribution, transition counts and mean forward return per state for one
+    state-code sequence. Returns a flat dict for the results table.
+    """
+    n_states = len(names)
+    keys = [name.replace(" ", "") for name in names]
+    counts = np.bincount(codes, minlength=n_states)
+
+    row = {"rows": len(codes), "transitions": int(np.count_nonzero(codes[1:] != codes[:-1]))}
+    for key, count in zip(keys, counts):
+        row[f"share_{key}"] = count / len(codes) if len(codes) else np.nan
+
+    pair = codes[:-1] * n_states + codes[1:]
+    pair_counts = np.bincount(pair[codes[1:] != codes[:-1]], minlength=n_states * n_states)
+    for i, j in itertools.permutations(range(n_states), 2):
+        row[f"trans_{keys[i]}_to_{keys[j]}"] = int(pair_counts[i * n_states + j])
+
+    for h, fwd in fwd_returns.items():
+        valid = ~np.isnan(fwd)
+        totals = np.bincount(codes[valid], weights=fwd[valid], minlength=n_states)
+        seen = np.bincount(codes[valid], minlength=n_states)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = totals / seen
+        for key, mean in zip(keys, means):
+            row[f"fwd{h}_{key}"] = mean
+    return row
+
+# ========== System A ==========
+def backtest_system_a(df, configs, horizons=DEFAULT_HORIZONS):
+    """
+    Score System A threshold/profile configurations against one indicator frame.
+
+    Configs sharing thresholds reuse one score matrix; their profile sets are
+    compared against it in a single broadcast. Profiles must keep the default
+    state names. Returns one results row per config, in input order.
+    """
+    start = time.perf_counter()
+    fwd = forward_returns(df, horizons)
+    names = list(state_profiles)
+
+    groups = {}
+    for i, config in enumerate(configs):
+        thresholds = _split_config(config, SYSTEM_A_THRESHOLDS)
+        key = repr(sorted(thresholds.items()))
+        groups.setdefault(key, (thresholds, []))[1].append(i)
+
+    rows = [None] * len(configs)
+    for thresholds, indices in groups.values():
+        scores = compute_scores_system_a_vectorized(df, thresholds).to_numpy(dtype=np.float64)
+        for chunk_start in range(0, len(indices), PROFILE_CHUNK):
+            chunk = indices[chunk_start:chunk_start + PROFILE_CHUNK]
+            profiles = np.array([
+                [configs[i].get("profiles", state_profiles)[name] for name in names] for i in chunk
+            ], dtype=np.float64)
+            # (configs x rows x states) distances; argmin keeps the first state on ties
+            distances = np.linalg.norm(scores[None, :, None, :] - profiles[:, None, :, :], axis=3)
+            for i, codes in zip(chunk, distances.argmin(axis=2)):
+                rows[i] = {"config": i, **state_metrics(codes, names, fwd)}
+
+    logger.info(f"Backtested {len(configs)} System A config(s) over {len(df)} rows "
+                f"in {time.perf_counter() - start:.2f}s")
+    return pd.DataFrame(rows)
+
+# ========== System B ==========
+def _backtest_b_chunk(df, configs, offset, horizons):
+    fwd = forward_returns(df, horizons)
+    rows = []
+    for i, config in enumerate(configs):
+        thresholds = _split_config(config, SYSTEM_B_THRESHOLDS)
+        states, _, _ = _sticky_states(score_matrix_system_b(df, thresholds), gap=config.get("gap", SYSTEM_B_GAP))
+        rows.append({"config": offset + i, **state_metrics(states, STATES_B, fwd)})
+    return rows
+
+def backtest_system_b(df, configs, horizons=DEFAULT_HORIZONS, workers=None):
+    """
+    Score System B threshold/gap configurations against one indicator frame.
+
+    System B is path-dependent, so each config replays the sticky-state kernel;
+    with workers > 1 the configs are split across processes. Returns one
+    results row per config, in input order.
+    """
+    start = time.perf_counter()
+    workers = int(workers or os.getenv("BACKTEST_WORKERS", 1))
+    columns = [c for c in ["Date", "Close_SP500", *REQUIRED_B] if c in df.columns]
+    df = df[columns]
+
+    if workers <= 1 or len(configs) < 2 * workers:
+        rows = _backtest_b_chunk(df, configs, 0, horizons)
+    else:
+        size = -(-len(configs) // workers)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_backtest_b_chunk, df, configs[i:i + size], i, horizons)
+                       for i in range(0, len(configs), size)]
+            rows = [row for future in futures for row in future.result()]
+
+    logger.info(f"Backtested {len(configs)} System B config(s) over {len(df)} rows "
+                f"with {workers} worker(s) in {time.perf_counter() - start:.2f}s")
+    return pd.DataFrame(rows)
+
+def attach_configs(results, configs):
+    """Join the parameter values onto a results table for sorting and export."""
+    params = pd.DataFrame([{k: (v if np.isscalar(v) else repr(v)) for k, v in c.items()} for c in configs])
+    return pd.concat([params, results.drop(columns=["config"])], axis=1)
+
+def load_backtest_frame(systems=("A", "B")):
+    """The shared indicator frame with every column the backtested systems read."""
+    # Imported here to keep the engine usable on frames loaded elsewhere
+    from scripts.classifier_runner import load_shared_frame
+    return load_shared_frame(list(systems))
@@ -1,140 +1,240 @@
 import pandas as pd
 import numpy as np
 import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 from scripts.logger import get_logger
+from scripts.compact_frames import compact_frame
+from scripts.storage import read_frame, write_frame
 
 # Initialize logger
 logger = get_logger("indicators")
 
-def load_data(file_path):
+def load_data(file_path, compact=False):
     try:
-        df = pd.read_csv(file_path, parse_dates=['Date'])
+        df = read_frame(file_path)
         df.sort_values('Date', inplace=True)
         df.reset_index(drop=True, inplace=True)
         logger.info(f"Loaded data from {file_path} with {len(df)} rows.")
+        if compact:
+            df = compact_frame(df, label=os.path.basename(file_path))
         return df
     except Exception as e:
-        logger.error(f"Failed to load CSV: {e}")
+        logger.error(f"Failed to load {file_path}: {e}")
         return pd.DataFrame()
 
+def _close_matrix(df):
+    close_cols = [col for col in df.columns if col.startswith("Close_")]
+    bases = [col.replace("Close_", "") for col in close_cols]
+    return bases, np.ascontiguousarray(df[close_cols].to_numpy(dtype=np.float64))
+
+def _append_columns(df, columns):
+    """Attach all new columns with a single concat instead of one insert per column."""
+    new = pd.DataFrame(columns, index=df.index)
+    df = df.drop(columns=[col for col in new.columns if col in df.columns])
+    return pd.concat([df, new], axis=1)
+
+def _named(prefix, bases, values):
+    return {f"{prefix}{base}": values[:, j] for j, base in enumerate(bases)}
+
+# ========== Matrix Kernels (rows x tickers) ==========
+def pct_change_matrix(closes, periods):
+    return pd.DataFrame(closes).pct_change(periods=periods).to_numpy() * 100
+
+def rsi_matrix(closes, window=14):
+    delta = np.diff(closes, axis=0, prepend=np.nan)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = -np.where(delta < 0, delta, 0.0)
+    avg_gain = pd.DataFrame(gain).rolling(window=window, min_periods=window).mean().to_numpy()
+    avg_loss = pd.DataFrame(loss).rolling(window=window, min_periods=window).mean().to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+def sma_matrix(closes, window=3):
+    return pd.DataFrame(closes).rolling(window=window).mean().to_numpy()
+
+def rolling_slope(values, window):
+    """Rolling OLS slope per column, fitted over rows i-window..i-1 (same as np.polyfit)."""
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        return rolling_slope(values[:, None], window)[:, 0]
+
+    out = np.full(values.shape, np.nan)
+    if len(values) <= window:
+        return out
+
+    x = np.arange(window, dtype=np.float64)
+    weights = (x - x.mean()) / ((x - x.mean()) ** 2).sum()
+    # Shift-and-accumulate rather than a BLAS dot, so results do not depend on
+    # memory layout and a sharded (parallel) run is bit-identical to a serial one
+    n = len(values) - window
+    acc = np.zeros((n, values.shape[1]))
+    for j in range(window):
+        acc += weights[j] * values[j:j + n]
+    out[window:] = acc
+    return out
+
+def _bbw(bases, closes, window=20):
+    if "SP500" not in bases:
+        logger.warning("Close_SP500 not found. Skipping BBW.")
+        return None
+    rolling_mean = pd.Series(closes[:, bases.index("SP500")]).rolling(window)
+    sma = rolling_mean.mean()
+    std = rolling_mean.std()
+    upper_band = sma + 2 * std
+    lower_band = sma - 2 * std
+    return ((upper_band - lower_band) / sma).to_numpy()
+
+def _rsp_spy_ratio(bases, closes):
+    if "RSP" not in bases or "SPY" not in bases:
+        logger.warning("Missing Close_RSP or Close_SPY columns. Skipping RSP/SPY ratio.")
+        return None
+    return closes[:, bases.index("RSP")] / closes[:, bases.index("SPY")]
+
+# ========== Per-indicator Entry Points ==========
 def calculate_5d_pct(df):
-    for col in df.columns:
-        if col.startswith("Close_"):
-            base = col.replace("Close_", "")
-            df[f"5d_pct_{base}"] = df[col].pct_change(periods=5) * 100
-    return df
+    bases, closes = _close_matrix(df)
+    return _append_columns(df, _named("5d_pct_", bases, pct_change_matrix(closes, 5)))
 
 def calculate_roc(df, window=10):
-    for col in df.columns:
-        if col.startswith("Close_"):
-            base = col.replace("Close_", "")
-            df[f"{window}d_ROC_{base}"] = df[col].pct_change(periods=window) * 100
-    return df
+    bases, closes = _close_matrix(df)
+    return _append_columns(df, _named(f"{window}d_ROC_", bases, pct_change_matrix(closes, window)))
 
 def calculate_rsi(df, window=14):
-    for col in df.columns:
-        if col.startswith("Close_"):
-            base = col.replace("Close_", "")
-            delta = df[col].diff()
-            gain = delta.where(delta > 0, 0.0)
-            loss = -delta.where(delta < 0, 0.0)
-            avg_gain = gain.rolling(window=window, min_periods=window).mean()
-            avg_loss = loss.rolling(window=window, min_periods=window).mean()
-            rs = avg_gain / avg_loss
-            rsi = 100 - (100 / (1 + rs))
-            df[f"RSI_{window}_{base}"] = rsi
-    return df
+    bases, closes = _close_matrix(df)
+    return _append_columns(df, _named(f"RSI_{window}_", bases, rsi_matrix(closes, window)))
 
 def calculate_regression_slope(df, window=20):
-    for col in df.columns:
-        if col.startswith("Close_"):
-            base = col.replace("Close_", "")
-            slopes = []
-            for i in range(len(df)):
-                if i < window:
-                    slopes.append(np.nan)
-                else:
-                    y = df[col].iloc[i-window:i]
-                    x = np.arange(window)
-                    slope, _ = np.polyfit(x, y, 1)
-                    slopes.append(slope)
-            df[f"{window}d_slope_{base}"] = slopes
-    return df
+    bases, closes = _close_matrix(df)
+    return _append_columns(df, _named(f"{window}d_slope_", bases, rolling_slope(closes, window)))
 
 def calculate_sma(df, window=3):
-    for col in df.columns:
-        if col.startswith("Close_"):
-            base = col.replace("Close_", "")
-            df[f"SMA_{window}_{base}"] = df[col].rolling(window=window).mean()
-    return df
+    bases, closes = _close_matrix(df)
+    return _append_columns(df, _named(f"SMA_{window}_", bases, sma_matrix(closes, window)))
 
 def calculate_intermarket_scores(df):
-    for col in df.columns:
-        if col.startswith("Close_"):
-            base = col.replace("Close_", "")
-            slopes = []
-            for i in range(len(df)):
-                if i < 5:
-                    slopes.append(np.nan)
-                else:
-                    y = df[col].iloc[i-5:i]
-                    x = np.arange(5)
-                    slope, _ = np.polyfit(x, y, 1)
-                    slopes.append(slope)
-            df[f"5d_Slope_{base}"] = slopes
-    return df
+    bases, closes = _close_matrix(df)
+    return _append_columns(df, _named("5d_Slope_", bases, rolling_slope(closes, 5)))
 
 def calculate_bbw(df, window=20):
-    target = 'Close_SP500'
-    if target not in df.columns:
-        logger.warning(f"{target} not found. Skipping BBW.")
-        return df
-
-    rolling_mean = df[target].rolling(window)
-    sma = rolling_mean.mean()
-    std = rolling_mean.std()
-    upper_band = sma + 2 * std
-    lower_band = sma - 2 * std
-    bbw = (upper_band - lower_band) / sma
-    df['BBW'] = bbw
-    return df
+    bases, closes = _close_matrix(df)
+    bbw = _bbw(bases, closes, window)
+    return df if bbw is None else _append_columns(df, {"BBW": bbw})
 
 def calculate_rsp_spy_ratio(df):
-    if 'Close_RSP' in df.columns and 'Close_SPY' in df.columns:
-        df['RSP/SPY_Ratio'] = df['Close_RSP'] / df['Close_SPY']
-    else:
-        logger.warning("Missing Close_RSP or Close_SPY columns. Skipping RSP/SPY ratio.")
-    return df
+    bases, closes = _close_matrix(df)
+    ratio = _rsp_spy_ratio(bases, closes)
+    return df if ratio is None else _append_columns(df, {"RSP/SPY_Ratio": ratio})
 
 def calculate_normalized_atr(df):
     if "5d_Slope_SP500" in df.columns and "Close_SP500" in df.columns:
-        df["Normalized_ATR"] = df["5d_Slope_SP500"] / df["Close_SP500"]
+        return _append_columns(df, {"Normalized_ATR": df["5d_Slope_SP500"] / df["Close_SP500"]})
+    logger.warning("Missing 5d_Slope_SP500 or Close_SP500 for Normalized_ATR calculation.")
+    return df
+
+# ========== Full Indicator Frame ==========
+# Per-ticker indicators in output column order. Each kernel maps a
+# (rows x tickers) close matrix to a matrix of the same shape.
+TICKER_INDICATORS = [
+    ("5d_pct_", lambda closes: pct_change_matrix(closes, 5)),
+    ("10d_ROC_", lambda closes: pct_change_matrix(closes, 10)),
+    ("RSI_14_", lambda closes: rsi_matrix(closes, 14)),
+    ("20d_slope_", lambda closes: rolling_slope(closes, 20)),
+    ("SMA_3_", lambda closes: sma_matrix(closes, 3)),
+    ("5d_Slope_", lambda closes: rolling_slope(closes, 5)),
+]
+
+def ticker_indicator_block(closes):
+    """Stack every per-ticker indicator into a (indicators x rows x tickers) array."""
+    return np.stack([kernel(closes) for _, kernel in TICKER_INDICATORS])
+
+def _indicator_columns(bases, closes, block):
+    columns = {}
+    for k, (prefix, _) in enumerate(TICKER_INDICATORS):
+        columns.update(_named(prefix, bases, block[k]))
+
+    if "SP500" in bases:
+        slope_5d = block[[prefix for prefix, _ in TICKER_INDICATORS].index("5d_Slope_")]
+        columns["Normalized_ATR"] = slope_5d[:, bases.index("SP500")] / closes[:, bases.index("SP500")]
     else:
         logger.warning("Missing 5d_Slope_SP500 or Close_SP500 for Normalized_ATR calculation.")
-    return df
 
-def calculate_all_indicators(input_path, output_path):
+    bbw = _bbw(bases, closes)
+    if bbw is not None:
+        columns["BBW"] = bbw
+    ratio = _rsp_spy_ratio(bases, closes)
+    if ratio is not None:
+        columns["RSP/SPY_Ratio"] = ratio
+    return columns
+
+def calculate_indicators_frame(df, workers=None):
+    """Compute every indicator from one Close_ matrix and attach them in a single concat."""
+    bases, closes = _close_matrix(df)
+    if workers and workers > 1 and len(bases) > 1:
+        block = _parallel_indicator_block(closes, workers)
+    else:
+        block = ticker_indicator_block(closes)
+    return _append_columns(df, _indicator_columns(bases, closes, block))
+
+# ========== Parallel Mode ==========
+def _indicator_worker(in_name, out_name, shape, start, stop):
+    """Compute the indicator block for tickers [start, stop) directly into shared memory."""
+    shm_in = shared_memory.SharedMemory(name=in_name)
+    shm_out = shared_memory.SharedMemory(name=out_name)
+    try:
+        closes = np.ndarray(shape, dtype=np.float64, buffer=shm_in.buf)
+        out = np.ndarray((len(TICKER_INDICATORS),) + shape, dtype=np.float64, buffer=shm_out.buf)
+        out[:, :, start:stop] = ticker_indicator_block(closes[:, start:stop])
+        del closes, out
+    finally:
+        shm_in.close()
+        shm_out.close()
+    return start, stop
+
+def _parallel_indicator_block(closes, workers):
+    """
+    Shard tickers across a process pool. Closes and results live in shared
+    memory, so workers only receive block names and column ranges.
+    """
+    workers = min(workers, closes.shape[1])
+    out_shape = (len(TICKER_INDICATORS),) + closes.shape
+    shm_in = shared_memory.SharedMemory(create=True, size=max(closes.nbytes, 1))
+    shm_out = shared_memory.SharedMemory(create=True, size=max(int(np.prod(out_shape)) * 8, 1))
+    try:
+        np.ndarray(closes.shape, dtype=np.float64, buffer=shm_in.buf)[:] = closes
+        bounds = np.linspace(0, closes.shape[1], workers + 1).astype(int)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_indicator_worker, shm_in.name, shm_out.name, closes.shape, start, stop)
+                for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start
+            ]
+            for future in futures:
+                future.result()
+        logger.info(f"Computed indicators for {closes.shape[1]} tickers across {workers} worker(s).")
+        return np.ndarray(out_shape, dtype=np.float64, buffer=shm_out.buf).copy()
+    finally:
+        shm_in.close()
+        shm_in.unlink()
+        shm_out.close()
+        shm_out.unlink()
+
+def calculate_all_indicators(input_path, output_path, workers=None):
     df = load_data(input_path)
     if df.empty:
         logger.warning("No data to process. Aborting.")
         return
 
-    logger.info("Calculating indicators...")
-    df = calculate_5d_pct(df)
-    df = calculate_roc(df)
-    df = calculate_rsi(df)
-    df = calculate_regression_slope(df)
-    df = calculate_sma(df)
-    df = calculate_intermarket_scores(df)
-    df = calculate_normalized_atr(df)  # ✅ NEW LINE
-    df = calculate_bbw(df)
-    df = calculate_rsp_spy_ratio(df)
+    if workers is None:
+        workers = int(os.getenv("INDICATOR_WORKERS", "1"))
+    logger.info(f"Calculating indicators with {workers} worker(s)...")
+    df = calculate_indicators_frame(df, workers=workers)
 
     try:
-        df.to_csv(output_path, index=False)
+        write_frame(df, output_path)
         logger.info(f"Indicators saved to: {output_path}")
     except Exception as e:
-        logger.error(f"Failed to save output CSV: {e}")
+        logger.error(f"Failed to save indicators: {e}")
 
 if __name__ == "__main__":
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
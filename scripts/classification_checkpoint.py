@@ -0,0 +1,73 @@
+import json
+import os
+import pandas as pd
+from scripts.logger import get_logger
+
+logger = get_logger("classifier_runner")
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+checkpoint_path = os.path.join(base_dir, "data", "classification_checkpoint.json")
+
+# Recent (date, state) pairs kept per system, about one trading year. A re-run
+# can start anywhere inside this window without replaying the full history.
+CHECKPOINT_HISTORY = 260
+
+def load_checkpoint(path=None):
+    path = path or checkpoint_path
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"Could not read classification checkpoint {path}: {e}")
+        return {}
+
+def save_checkpoint(checkpoint, path=None):
+    path = path or checkpoint_path
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+    logger.info(f"Saved classification checkpoint for {', '.join(checkpoint)} to {path}")
+
+def update_system_checkpoint(checkpoint, name, dates, states, full=False):
+    """
+    Record newly classified rows for one system.
+
+    Rows dated on or after the first new date replace what the checkpoint had,
+    so a re-run overwrites its window. full=True marks the rows as the complete
+    history, which lets a later re-run start from the very first date.
+    """
+    new = [(pd.Timestamp(d).strftime("%Y-%m-%d"), str(s)) for d, s in zip(dates, states) if pd.notna(d)]
+    entry = {} if full else checkpoint.get(name, {})
+    if not new:
+        return entry
+
+    history = [pair for pair in entry.get("history", []) if pair[0] < new[0][0]] + [list(p) for p in new]
+    first_date = new[0][0] if full else entry.get("first_date", new[0][0])
+    entry = {
+        "last_date": history[-1][0],
+        "last_state": history[-1][1],
+        "first_date": first_date,
+        "history": history[-CHECKPOINT_HISTORY:],
+    }
+    checkpoint[name] = entry
+    return entry
+
+def state_before(entry, date):
+    """
+    Last recorded state strictly before `date`, or None when `date` starts the
+    history. Raises ValueError when `date` is older than the retained window.
+    """
+    date = pd.Timestamp(date).strftime("%Y-%m-%d")
+    history = entry.get("history", [])
+    if date <= entry.get("first_date", ""):
+        return None
+    if not history or date <= history[0][0]:
+        raise ValueError(
+            f"Re-run from {date} is outside the checkpoint window "
+            f"(earliest {history[0][0] if history else 'none'}); run a full classification instead"
+        )
+    previous = [state for day, state in history if day < date]
+    return previous[-1]
@@ -0,0 +1,269 @@
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+
+from scripts.column_store import open_columns
+from scripts.classification_checkpoint import load_checkpoint, save_checkpoint, update_system_checkpoint, state_before
+from scripts.download_cache import precompress_later
+from scripts.frame_cache import cached_frame, get_frame
+from scripts.indicator_registry import compute_indicators
+from scripts.logger import get_logger
+from scripts.result_cache import cached_classify, cache_stats, ruleset_version
+from scripts.state_store import write_states, bump_data_generation
+from scripts.storage import write_frame, append_frame, truncate_frame, read_frame, frame_columns
+from scripts.txt_logs import truncate_log
+import scripts.scoring_Euclidean as system_a
+import scripts.scoring_Original as system_b
+import scripts.scoring_system_june as system_june
+
+logger = get_logger("classifier_runner")
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+data_dir = os.path.join(base_dir, "data")
+indicator_path = os.path.join(data_dir, "MarketData_with_Indicators.csv")
+
+# ========== Registry ==========
+# state_column names the classifier's label column; sequential systems carry
+# state between rows and accept initial_state to resume from a checkpoint.
+# ruleset returns the thresholds/rules/scoring code that define the output, and
+# inputs lists every column read; together with the source of the modules
+# defining classify and the scoring code they key the result cache.
+# score_column is stored next to the state in the SQLite state store.
+# diagnostics is (column, render): the text column is not stored, render
+# builds it from the stored columns when a download asks for it.
+ClassifierSpec = namedtuple(
+    "ClassifierSpec",
+    "classify required output_file append_logs log_files state_column sequential ruleset inputs score_column "
+    "diagnostics",
+)
+
+CLASSIFIERS = {}
+
+def register_classifier(name, classify, required, output_file, append_logs=None, log_files=(),
+                        state_column="MarketState", sequential=False, ruleset=None, inputs=None, score_column=None,
+                        diagnostics=None):
+    CLASSIFIERS[name] = ClassifierSpec(classify, required, output_file, append_logs, tuple(log_files),
+                                       state_column, sequential, ruleset or (lambda: ()), inputs or required,
+                                       score_column, diagnostics)
+
+register_classifier(
+    "A", system_a.classify_market_states_system_a, system_a.REQUIRED_INDICATORS,
+    "MarketData_with_States_System_A.csv", system_a.append_to_txt_logs_system_a,
+    ("MarketStates_System_A.txt", "MarketStates_Diagnostics_System_A.txt"), "MarketState_A",
+    diagnostics=("Diagnostics_A", system_a.render_diagnostics_system_a),
+    ruleset=lambda: (system_a.SYSTEM_A_THRESHOLDS, system_a.state_profiles,
+                     system_a.compute_scores_system_a_vectorized, system_a.nearest_profiles),
+)
+register_classifier(
+    "B", system_b.classify_market_states_system_b, system_b.REQUIRED_INDICATORS,
+    "MarketData_with_States_System_B.csv", system_b.append_to_txt_logs_system_b,
+    ("MarketStates_System_B.txt", "MarketStates_Diagnostics_System_B.txt"), "MarketState_B",
+    sequential=True, score_column="Score_B", diagnostics=("Diagnostics_B", system_b.render_diagnostics_system_b),
+    ruleset=lambda: (system_b.SYSTEM_B_THRESHOLDS, system_b.SYSTEM_B_GAP, system_b.STATES_B,
+                     system_b.score_matrix_system_b, system_b._sticky_kernel),
+)
+register_classifier(
+    "June", system_june.classify_market_states_june, system_june.REQUIRED_INDICATORS,
+    "MarketData_with_States.csv", system_june.append_to_txt_logs_june,
+    ("MarketStates.txt", "MarketStates_Diagnostics.txt"),
+    ruleset=lambda: (system_june.RULES, system_june.INDICATOR_DEFAULTS, system_june.score_rules),
+    inputs=system_june.rule_inputs(system_june.RULES), score_column="Score",
+    diagnostics=("Diagnostics", system_june.render_diagnostics_june),
+)
+
+# ========== Shared Load ==========
+def load_shared_frame(systems, path=None, columns=None, start=None):
+    """
+    Read the indicator frame once and add any columns the selected systems
+    still need, derived through the indicator registry. The stored frame
+    itself is always computed in full by the data pipeline.
+
+    columns limits the read to those columns (Date is always kept) and start
+    skips rows dated before it. Columns that have to be derived need the full
+    history, so the frame is re-read unfiltered in that case.
+    """
+    path = path or indicator_path
+    store = open_columns(path)
+    if store is not None and store.is_current(path):
+        # Zero-copy view over the published column store; classifiers copy before changing anything
+        df = store.frame(columns=columns, start=start)
+    else:
+        # Served from the process-wide frame cache between pipeline runs
+        df = cached_frame(path, columns=columns, start=start)
+    required = list(dict.fromkeys(col for name in systems for col in CLASSIFIERS[name].required))
+    missing = [col for col in required if col not in df.columns]
+    if missing and (columns is not None or start is not None):
+        df = get_frame(path)
+        missing = [col for col in required if col not in df.columns]
+    if missing:
+        try:
+            df = compute_indicators(df, missing)
+        except KeyError as e:
+            # Classifiers treat absent inputs as NaN, so a missing raw series only weakens the scores
+            logger.warning(f"Could not derive all required columns: {e}")
+    logger.info(f"Loaded shared indicator frame with {len(df)} rows from {path}")
+    return df
+
+def diagnostic_rows(path, since=None, until=None, columns=None):
+    """
+    CSV blocks for a states download whose columns include the classifier's
+    diagnostics column, with the text rendered for the selected rows only
+    (rows that already carry it, e.g. from the standalone scripts, keep
+    theirs). Returns None when the request needs no rendering and the file
+    can be streamed as written. Raises ValueError for a bad date or column.
+    """
+    spec = next((s for s in CLASSIFIERS.values() if s.output_file == os.path.basename(path)), None)
+    if spec is None or spec.diagnostics is None or not columns or spec.diagnostics[0] not in columns:
+        return None
+    column, render = spec.diagnostics
+    stored = frame_columns(path)
+    unknown = [c for c in columns if c != column and c not in stored]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+    df = read_frame(path, start=since, end=until)
+    text = df[column].astype(object) if column in df.columns else pd.Series(None, index=df.index, dtype=object)
+    missing = text.isna().to_numpy()
+    if missing.any():
+        text[missing] = render(df[missing]).to_numpy()
+    out = df[["Date"] + [c for c in stored if c in columns and c not in ("Date", column)]].copy()
+    out[column] = text
+    return iter([out.to_csv(index=False, date_format="%Y-%m-%d").encode()])
+
+def _input_columns(systems):
+    return list(dict.fromkeys(col for name in systems for col in CLASSIFIERS[name].inputs))
+
+# ========== Runner ==========
+def _plan(name, df, entry, incremental, rerun_from):
+    """Pick the rows to classify and the carried-in state: (mode, rows, initial_state, since)."""
+    if rerun_from is not None and entry:
+        return "rerun", df[df["Date"] >= rerun_from], state_before(entry, rerun_from), rerun_from
+    if incremental and entry:
+        since = pd.Timestamp(entry["last_date"])
+        return "append", df[df["Date"] > since], entry["last_state"], since
+    return "full", df, None, None
+
+def _run_one(name, df, write, plan):
+    spec = CLASSIFIERS[name]
+    mode, rows, initial_state, since = plan
+    start = time.perf_counter()
+    if spec.sequential:
+        classify = lambda frame: spec.classify(frame, initial_state=initial_state)
+    else:
+        classify = spec.classify
+    version = ruleset_version(spec.classify, *spec.ruleset())
+    classified = cached_classify(name, version, rows, spec.inputs, classify, extra=initial_state)
+    classify_seconds = time.perf_counter() - start
+
+    if write:
+        output_path = os.path.join(data_dir, spec.output_file)
+        if mode == "full":
+            write_frame(classified, output_path)
+        else:
+            if mode == "rerun":
+                truncate_frame(output_path, since)
+                for log_file in spec.log_files:
+                    truncate_log(os.path.join(data_dir, log_file), since)
+            if len(classified):
+                append_frame(classified, output_path)
+        if spec.append_logs:
+            spec.append_logs(classified, data_dir, logger)
+        write_states(name, classified, spec.state_column, spec.score_column,
+                     replace_from=since if mode == "rerun" else None, full=mode == "full")
+        precompress_later(output_path, *(os.path.join(data_dir, log_file) for log_file in spec.log_files))
+    return classified, {
+        "mode": mode,
+        "rows": len(classified),
+        "classify_seconds": round(classify_seconds, 4),
+        "total_seconds": round(time.perf_counter() - start, 4),
+    }
+
+def _load_start(systems, checkpoint, incremental, rerun_from):
+    """Earliest date any selected system will classify, or None when one needs the full history."""
+    starts = []
+    for name in systems:
+        entry = checkpoint.get(name)
+        if not entry:
+            return None
+        if rerun_from is not None:
+            starts.append(rerun_from)
+        elif incremental:
+            starts.append(pd.Timestamp(entry["last_date"]))
+        else:
+            return None
+    return min(starts) if starts else None
+
+def run_classifiers(systems=None, df=None, write=True, max_workers=None, incremental=False, rerun_from=None):
+    """
+    Classify one shared indicator frame with several systems concurrently.
+
+    The frame is read once (unless df is given) and passed read-only to every
+    classifier; each classifier works on its own copy. Incremental and re-run
+    loads skip rows older than the earliest checkpointed date, and write=False
+    loads only the classifiers' input columns. With write=True each
+    system's CSV and txt logs are written to data/. Returns
+    ({system: classified frame}, timings), where timings holds the load time
+    and per-system classify/write seconds.
+
+    With incremental=True only rows after each system's checkpointed date are
+    classified and appended, System B resuming from its sustained state.
+    rerun_from re-classifies from that date onward (within the checkpoint
+    window), replacing the affected CSV rows and txt lines. Systems without a
+    checkpoint get a full run.
+    """
+    systems = list(CLASSIFIERS) if systems is None else list(systems)
+    unknown = [name for name in systems if name not in CLASSIFIERS]
+    if unknown:
+        raise ValueError(f"Unknown classifier(s): {', '.join(unknown)}")
+
+    start = time.perf_counter()
+    checkpoint = load_checkpoint()
+    rerun_from = None if rerun_from is None else pd.Timestamp(rerun_from)
+    if df is None:
+        df = load_shared_frame(systems, columns=None if write else _input_columns(systems),
+                               start=_load_start(systems, checkpoint, incremental, rerun_from))
+    timings = {"load_seconds": round(time.perf_counter() - start, 4), "systems": {}}
+
+    # Plans are resolved up front so an out-of-window re-run fails before any file changes
+    plans = {name: _plan(name, df, checkpoint.get(name), incremental, rerun_from) for name in systems}
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers or len(systems) or 1) as pool:
+        futures = {name: pool.submit(_run_one, name, df, write, plans[name]) for name in systems}
+        for name, future in futures.items():
+            results[name], timings["systems"][name] = future.result()
+
+    if write:
+        for name, classified in results.items():
+            update_system_checkpoint(checkpoint, name, classified["Date"], classified[CLASSIFIERS[name].state_column],
+                                     full=plans[name][0] == "full")
+        save_checkpoint(checkpoint)
+        bump_data_generation()
+
+    timings["total_seconds"] = round(time.perf_counter() - start, 4)
+    classified_rows = sum(t["rows"] for t in timings["systems"].values())
+    logger.info(f"Classified {classified_rows} row(s) with {', '.join(systems)} in {timings['total_seconds']}s")
+    return results, timings
+
+def summarize_results(results, timings):
+    """
+    JSON-friendly summary: latest date and state per system, timings and
+    result-cache counters. A system that classified no new rows reports the
+    checkpoint's latest date and state, where its stored series still ends.
+    """
+    summary = {"load_seconds": timings["load_seconds"], "total_seconds": timings["total_seconds"],
+               "cache": cache_stats(), "systems": {}}
+    checkpoint = None
+    for name, df in results.items():
+        state_col = CLASSIFIERS[name].state_column
+        dated = df.dropna(subset=["Date"])
+        if len(dated):
+            latest = dated.iloc[-1]
+            last_date, last_state = pd.Timestamp(latest["Date"]).strftime("%Y-%m-%d"), str(latest[state_col])
+        else:
+            checkpoint = load_checkpoint() if checkpoint is None else checkpoint
+            entry = checkpoint.get(name, {})
+            last_date, last_state = entry.get("last_date"), entry.get("last_state")
+        summary["systems"][name] = {**timings["systems"][name], "last_date": last_date, "last_state": last_state}
+    return summary
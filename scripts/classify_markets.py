@@ -3,6 +3,11 @@ import pandas as pd
 import numpy as np
 import logging
 import sys
+try:
+    from scripts.txt_logs import append_state_logs
+except ModuleNotFoundError:
+    # Run directly from the scripts/ directory
+    from txt_logs import append_state_logs
 
 # ========== Logger Setup ==========
 def get_logger(name="market_state_classifier"):
@@ -23,6 +28,9 @@ def get_logger(name="market_state_classifier"):
 
 logger = get_logger()
 
+# Indicator columns read by the scoring logic (see scripts/indicator_registry.py)
+REQUIRED_INDICATORS = ["5d_pct_SP500", "20d_slope_SP500", "RSI_14_SP500", "Close_VIX", "Normalized_ATR", "BBW"]
+
 # ========== Market State Profiles ==========
 state_profiles = {
     "Steady Climb": [2, 1, 2],
@@ -68,28 +76,108 @@ def compute_scores(row):
 
     return pd.Series([trend_score, momentum_score, volatility_score])
 
+def _column(df, name):
+    return df[name].to_numpy(dtype=np.float64) if name in df.columns else np.full(len(df), np.nan)
+
+def compute_scores_vectorized(df):
+    """
+    Column-wise equivalent of compute_scores: same buckets, same NaN handling
+    (NaN falls through to the final branch of each if/elif chain).
+    """
+    sp500 = _column(df, "5d_pct_SP500")
+    ma20 = _column(df, "20d_slope_SP500")
+    rsi = _column(df, "RSI_14_SP500")
+    vix = _column(df, "Close_VIX")
+    atr = _column(df, "Normalized_ATR")
+    bbw = _column(df, "BBW")
+
+    trend_score = (
+        np.select([sp500 > 2.0, (0.5 <= sp500) & (sp500 <= 2.0), (-0.5 <= sp500) & (sp500 < 0.5),
+                   (-2.0 <= sp500) & (sp500 < -0.5), sp500 < -2.0], [2, 1, 0, -1, -2], default=0)
+        + np.select([ma20 > 0.5, (0.2 <= ma20) & (ma20 <= 0.5), (-0.2 <= ma20) & (ma20 < 0.2),
+                     (-0.5 <= ma20) & (ma20 < -0.2), ma20 < -0.5], [2, 1, 0, -1, -2], default=0)
+    )
+    momentum_score = np.select([rsi > 65, (50 <= rsi) & (rsi <= 65), (40 <= rsi) & (rsi < 50)], [2, 1, 0], default=-2)
+
+    vix_score = np.select([vix < 16, (16 <= vix) & (vix <= 20), (20 < vix) & (vix <= 25)], [1, 0, -1], default=-2)
+    atr_score = np.select([atr < 0.01, (0.01 <= atr) & (atr <= 0.015)], [1, 0], default=-1)
+    bbw_score = np.select([bbw < 3.0, (3.0 <= bbw) & (bbw <= 5.0)], [1, 0], default=-1)
+    volatility_score = vix_score + atr_score + bbw_score
+
+    return pd.DataFrame({
+        "TrendScore": trend_score,
+        "MomentumScore": momentum_score,
+        "VolatilityScore": volatility_score,
+    }, index=df.index).astype(np.int64)
+
 # ========== Classification Function ==========
-def classify_market_states(df: pd.DataFrame) -> pd.DataFrame:
+def nearest_profiles(scores):
+    """
+    Distances from each (trend, momentum, volatility) row to every profile in
+    state_profiles, as a (rows x states) matrix. argmin takes the first minimum,
+    which matches min() over the dict in insertion order on ties.
+    """
+    profiles = np.array(list(state_profiles.values()), dtype=np.float64)
+    distances = np.linalg.norm(scores[:, None, :] - profiles[None, :, :], axis=2)
+    return distances.argmin(axis=1), distances
+
+def classify_market_states(df: pd.DataFrame, compact: bool = False, include_distances: bool = False,
+                           diagnostics: bool = False) -> pd.DataFrame:
     logger.info("Scoring and classifying market states...")
     df = df.copy()
-    df[['TrendScore', 'MomentumScore', 'VolatilityScore']] = df.apply(compute_scores, axis=1)
-
-    def classify_row(row):
-        vector = np.array([row['TrendScore'], row['MomentumScore'], row['VolatilityScore']])
-        distances = {state: np.linalg.norm(vector - np.array(profile)) for state, profile in state_profiles.items()}
-        best_state = min(distances, key=distances.get)
-        dist = distances[best_state]
-        diag = (
-            f"5d%: {row['5d_pct_SP500']:+.2f}%, MA20: {row['20d_slope_SP500']:+.2f}, "
-            f"RSI: {row['RSI_14_SP500']:.1f}, VIX: {row['Close_VIX']:.2f}, "
-            f"ATR: {row['Normalized_ATR']:.4f}, BBW: {row['BBW']:.2f}, "
-            f"Score: {[row['TrendScore'], row['MomentumScore'], row['VolatilityScore']]}, Dist: {dist:.2f}"
-        )
-        return pd.Series([best_state, dist, diag])
-
-    df[['MarketState', 'EuclideanDist', 'Diagnostics']] = df.apply(classify_row, axis=1)
+    score_cols = ['TrendScore', 'MomentumScore', 'VolatilityScore']
+    df[score_cols] = compute_scores_vectorized(df)
+
+    scores = df[score_cols].to_numpy()
+    best, distances = nearest_profiles(scores.astype(np.float64))
+    states = np.array(list(state_profiles), dtype=object)[best]
+    dist = distances[np.arange(len(df)), best]
+
+    df['MarketState'] = pd.Series(states, index=df.index, dtype=str)
+    df['EuclideanDist'] = dist
+    if diagnostics:
+        df['Diagnostics'] = render_diagnostics(df)
+
+    if include_distances:
+        for j, state in enumerate(state_profiles):
+            df[f"Dist_{state.replace(' ', '')}"] = distances[:, j]
+        # Confidence margin: how much closer the winner is than the runner-up
+        ordered = np.sort(distances, axis=1)
+        df['DistMargin'] = ordered[:, 1] - ordered[:, 0] if len(state_profiles) > 1 else np.nan
+
+    if compact:
+        # Imported lazily so the module still runs as a standalone script
+        from scripts.compact_frames import compact_frame
+        df = compact_frame(df, label="classified states")
     return df
 
+# ========== Diagnostics ==========
+def _fmt(values, spec):
+    return np.strings.mod(spec, np.asarray(values, dtype=np.float64))
+
+def _assemble(*parts):
+    """Element-wise concatenation of literal strings and string arrays."""
+    out = parts[0]
+    for part in parts[1:]:
+        out = np.strings.add(out, part)
+    return out
+
+def render_diagnostics(df: pd.DataFrame) -> pd.Series:
+    """
+    Build the Diagnostics text from the stored indicator, score and distance
+    columns. Classification leaves it out; writers render just the rows they emit.
+    """
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=str)
+    text = _assemble(
+        "5d%: ", _fmt(df['5d_pct_SP500'], "%+.2f"), "%, MA20: ", _fmt(df['20d_slope_SP500'], "%+.2f"),
+        ", RSI: ", _fmt(df['RSI_14_SP500'], "%.1f"), ", VIX: ", _fmt(df['Close_VIX'], "%.2f"),
+        ", ATR: ", _fmt(df['Normalized_ATR'], "%.4f"), ", BBW: ", _fmt(df['BBW'], "%.2f"),
+        ", Score: [", _fmt(df['TrendScore'], "%d"), ", ", _fmt(df['MomentumScore'], "%d"),
+        ", ", _fmt(df['VolatilityScore'], "%d"), "], Dist: ", _fmt(df['EuclideanDist'], "%.2f"),
+    )
+    return pd.Series(text, index=df.index, dtype=str)
+
 # ========== Write to .txt Logs ==========
 def append_to_txt_logs(df: pd.DataFrame, data_dir: str, logger=None):
     if logger:
@@ -100,22 +188,8 @@ def append_to_txt_logs(df: pd.DataFrame, data_dir: str, logger=None):
     states_txt = os.path.join(data_dir, "MarketStates.txt")
     diag_txt = os.path.join(data_dir, "MarketStates_Diagnostics.txt")
 
-    existing_dates = set()
-    if os.path.exists(states_txt):
-        with open(states_txt, 'r') as f:
-            existing_dates = {line.split(",")[0].strip() for line in f.readlines()}
-
-    new_rows = 0
-    with open(states_txt, 'a') as f1, open(diag_txt, 'a') as f2:
-        for _, row in df.iterrows():
-            if pd.isna(row['Date']):
-                continue
-            date_str = pd.to_datetime(row['Date']).strftime('%Y-%m-%d')
-            if date_str in existing_dates:
-                continue
-            f1.write(f"{date_str}, {row['MarketState']}\n")
-            f2.write(f"{date_str}, {row['MarketState']}, {row['Diagnostics']}\n")
-            new_rows += 1
+    # Only rows after each log's last date are written; diagnostics are rendered for those rows only
+    new_rows = append_state_logs(df, states_txt, diag_txt, "MarketState", "Diagnostics", render_diagnostics)
 
     if logger:
         logger.info(f"Appended {new_rows} new rows to MarketStates.txt and MarketStates_Diagnostics.txt")
@@ -130,7 +204,8 @@ if __name__ == "__main__":
         output_path = os.path.join(base_dir, "data", "MarketData_with_States.csv")
 
         df = pd.read_csv(input_path, parse_dates=["Date"])
-        df_classified = classify_market_states(df)
+        # Standalone runs keep the text in the CSV so downloads of it need no renderer
+        df_classified = classify_market_states(df, diagnostics=True)
         df_classified.to_csv(output_path, index=False)
 
         append_to_txt_logs(df_classified, os.path.join(base_dir, "data"), logger)
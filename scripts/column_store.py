@@ -0,0 +1,169 @@
+import json
+import os
+import shutil
+import threading
+import numpy as np
+import pandas as pd
+from scripts.logger import get_logger
+from scripts.storage import frame_signature, read_frame
+
+logger = get_logger("column_store")
+
+# Generations kept on disk after a publish; readers still mapping an older one keep working
+KEEP_GENERATIONS = 2
+
+_open_stores = {}
+_lock = threading.Lock()
+
+# ========== Layout ==========
+# <csv dir>/columns/<csv stem>/, e.g. data/columns/MarketData_with_Indicators/
+#   CURRENT          name of the live generation, swapped atomically on publish
+#   gen-000042/      manifest.json, Date.npy and one c0000.npy ... per column
+def store_dir(csv_path):
+    root, _ = os.path.splitext(os.path.basename(csv_path))
+    return os.path.join(os.path.dirname(csv_path), "columns", root)
+
+def _current_generation(directory):
+    try:
+        with open(os.path.join(directory, "CURRENT"), "r") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def _column_array(series):
+    """Fixed-width array for one column: numeric/bool/datetime as is, anything else as unicode."""
+    if series.dtype.kind in "fiubM":
+        return np.ascontiguousarray(series.to_numpy())
+    return series.fillna("").astype(str).to_numpy(dtype=str)
+
+# ========== Publish ==========
+def publish_columns(df, csv_path):
+    """
+    Write df as a new read-only generation of the column store for csv_path
+    and make it current. The source frame's signature is recorded so readers
+    can tell whether the store still matches the stored frame.
+    """
+    directory = store_dir(csv_path)
+    os.makedirs(directory, exist_ok=True)
+    current = _current_generation(directory)
+    number = int(current.split("-")[1]) + 1 if current else 1
+    name = f"gen-{number:06d}"
+    tmp_dir = os.path.join(directory, name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    df = df.sort_values("Date").reset_index(drop=True)
+    np.save(os.path.join(tmp_dir, "Date.npy"), pd.to_datetime(df["Date"]).to_numpy())
+    columns = []
+    for i, col in enumerate(c for c in df.columns if c != "Date"):
+        values = _column_array(df[col])
+        filename = f"c{i:04d}.npy"
+        np.save(os.path.join(tmp_dir, filename), values)
+        columns.append({"name": col, "file": filename, "dtype": values.dtype.str, "text": df[col].dtype.kind not in "fiubM"})
+
+    manifest = {
+        "source": os.path.basename(csv_path),
+        "signature": frame_signature(csv_path),
+        "rows": len(df),
+        "columns": columns,
+    }
+    with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_dir, os.path.join(directory, name))
+
+    pointer = os.path.join(directory, "CURRENT.tmp")
+    with open(pointer, "w") as f:
+        f.write(name)
+    os.replace(pointer, os.path.join(directory, "CURRENT"))
+
+    generations = sorted(d for d in os.listdir(directory) if d.startswith("gen-") and not d.endswith(".tmp"))
+    for old in generations[:-KEEP_GENERATIONS]:
+        shutil.rmtree(os.path.join(directory, old), ignore_errors=True)
+    logger.info(f"Published {len(df)} rows x {len(columns)} columns of {manifest['source']} as {name}")
+    return name
+
+def publish_frame(csv_path):
+    """Publish the stored frame at csv_path."""
+    return publish_columns(read_frame(csv_path), csv_path)
+
+def append_columns(rows, csv_path):
+    """
+    Publish the current generation plus rows dated after it, e.g. after a
+    daily append_frame, without re-reading the stored frame. Falls back to
+    publish_frame when nothing is published yet or the layout changed.
+    """
+    store = open_columns(csv_path)
+    if store is None or set(rows.columns) - {"Date"} - set(store.columns) or (
+            len(store) and pd.to_datetime(rows["Date"]).min() <= store.dates[-1]):
+        return publish_frame(csv_path)
+    return publish_columns(pd.concat([store.frame(), rows], ignore_index=True), csv_path)
+
+# ========== Read ==========
+class ColumnStore:
+    """
+    One published generation, opened read-only. Every column is memory-mapped
+    at open (no data is read until touched), so processes mapping the same
+    generation share its pages through the OS page cache, and an open store
+    keeps working after a later publish removes its files.
+    """
+
+    def __init__(self, directory, generation):
+        self.directory = os.path.join(directory, generation)
+        self.generation = generation
+        with open(os.path.join(self.directory, "manifest.json"), "r") as f:
+            self.manifest = json.load(f)
+        self.columns = [c["name"] for c in self.manifest["columns"]]
+        self._meta = {c["name"]: c for c in self.manifest["columns"]}
+        self.dates = self._load("Date.npy")
+        self._arrays = {c["name"]: self._load(c["file"]) for c in self.manifest["columns"]}
+
+    def _load(self, filename):
+        return np.load(os.path.join(self.directory, filename), mmap_mode="r")
+
+    def __len__(self):
+        return self.manifest["rows"]
+
+    def is_current(self, csv_path):
+        """True when the store was published from the frame as it is stored now."""
+        return self.manifest["signature"] == frame_signature(csv_path)
+
+    def column(self, name):
+        return self._arrays[name]
+
+    def row_range(self, start=None, end=None):
+        """Positions [lo, hi) of rows dated within start..end, found by binary search."""
+        lo = 0 if start is None else int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start)), "left"))
+        hi = len(self.dates) if end is None else int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end)), "right"))
+        return lo, max(lo, hi)
+
+    def frame(self, columns=None, start=None, end=None):
+        """
+        DataFrame over the mapped arrays for the given columns (Date always
+        included) and date bounds. Numeric columns are views, not copies.
+        """
+        names = self.columns if columns is None else [c for c in self.columns if c in columns]
+        lo, hi = self.row_range(start, end)
+        data = {"Date": self.dates[lo:hi]}
+        for name in names:
+            values = self.column(name)[lo:hi]
+            if self._meta[name]["text"]:
+                values = pd.Series(values).replace("", np.nan).to_numpy(dtype=object)
+            data[name] = values
+        return pd.DataFrame(data, copy=False)
+
+def open_columns(csv_path):
+    """
+    The current published generation for csv_path, or None if nothing has
+    been published. Stores are cached per process and re-opened only when
+    CURRENT moves to a new generation.
+    """
+    directory = store_dir(csv_path)
+    generation = _current_generation(directory)
+    if generation is None:
+        return None
+    with _lock:
+        store = _open_stores.get(directory)
+        if store is None or store.generation != generation:
+            store = ColumnStore(directory, generation)
+            _open_stores[directory] = store
+    return store
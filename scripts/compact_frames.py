@@ -0,0 +1,65 @@
+import pandas as pd
+import numpy as np
+from scripts.logger import get_logger
+
+logger = get_logger("compact_frames")
+
+# Largest relative round-trip error accepted when downcasting a computed column
+# (one written with more than SHORT_DECIMALS decimals) to float32
+FLOAT32_RTOL = 1e-6
+
+# Columns the CSVs store with at most this many decimals (prices, volumes, breadth
+# counts) are downcast only if float32 still rounds back to the written value
+SHORT_DECIMALS = 6
+
+def frame_memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+def _written_decimals(x):
+    """Fewest decimals that reproduce every value in x, or None if more than SHORT_DECIMALS."""
+    for decimals in range(SHORT_DECIMALS + 1):
+        if np.array_equal(np.round(x, decimals), x):
+            return decimals
+    return None
+
+def _fits_float32(values, rtol=FLOAT32_RTOL):
+    finite = np.isfinite(values)
+    if not finite.any():
+        return True
+    x = values[finite]
+    if np.abs(x).max() > np.finfo(np.float32).max:
+        return False
+    y = x.astype(np.float32).astype(np.float64)
+    decimals = _written_decimals(x)
+    if decimals is not None:
+        return np.array_equal(np.round(y, decimals), x)
+    return bool(np.all(np.abs(y - x) <= rtol * np.abs(x)))
+
+def compact_frame(df, rtol=FLOAT32_RTOL, label="frame"):
+    """
+    Shrink a market/indicator/state frame for resident use. The result is for
+    in-memory work only; stored frames are always written from float64 data.
+
+    - float64 columns become float32 where the round trip keeps the written
+      decimals, or stays within rtol for computed columns
+    - Volume_ columns that are all zero or missing become sparse (fill 0)
+    - MarketState*, PrevState* and Diagnostics* string columns become categoricals
+    Column names and order are unchanged.
+    """
+    before = frame_memory_mb(df)
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if col.startswith("Volume_") and pd.api.types.is_numeric_dtype(series) and not (series.fillna(0) != 0).any():
+            columns[col] = series.astype(pd.SparseDtype(np.float32, 0.0))
+        elif series.dtype == np.float64 and _fits_float32(series.to_numpy()):
+            columns[col] = series.astype(np.float32)
+        elif col.startswith(("MarketState", "PrevState", "Diagnostics")) and not pd.api.types.is_numeric_dtype(series):
+            columns[col] = series.astype("category")
+        else:
+            columns[col] = series
+    compacted = pd.DataFrame(columns, index=df.index)
+
+    after = frame_memory_mb(compacted)
+    logger.info(f"Compacted {label}: {before:.2f} MB -> {after:.2f} MB")
+    return compacted
@@ -0,0 +1,154 @@
+import csv
+import io
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+# Line index for date-led text files: the data CSVs ("Date,..." header) and the
+# txt logs ("2025-07-09, Steady Climb"). It lets a download read just the lines
+# in a date range. Indexes are cached per process and rebuilt when the file's
+# size or mtime changes; a rebuild is one newline scan of the raw bytes.
+
+DATE_WIDTH = len("YYYY-MM-DD")
+
+_READ_BLOCK = 1 << 20
+
+_indexes = {}
+_lock = threading.Lock()
+
+def _signature(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+class DateIndex:
+    """Byte offsets and dates of every data line of one version of a file."""
+
+    def __init__(self, path, has_header):
+        self.path = path
+        self.signature = _signature(path)
+        buf = np.fromfile(path, dtype=np.uint8)
+        starts = np.concatenate(([0], np.flatnonzero(buf == ord("\n")) + 1))
+        ends = np.append(starts[1:], len(buf))
+
+        self.header, self.header_end = [], 0
+        if has_header and len(buf):
+            self.header = next(csv.reader([bytes(buf[:ends[0]]).decode().rstrip("\r\n")]), [])
+            if not self.header or self.header[0] != "Date":
+                raise ValueError(f"{os.path.basename(path)} has no leading Date column to index")
+            self.header_end = int(ends[0])
+            starts, ends = starts[1:], ends[1:]
+
+        keep = ends > starts
+        starts, ends = starts[keep], ends[keep]
+        # The first DATE_WIDTH bytes of each line; short or malformed lines parse to NaT
+        positions = np.minimum(starts[:, None] + np.arange(DATE_WIDTH), max(len(buf) - 1, 0))
+        prefixes = buf[positions] if len(buf) else np.empty((0, DATE_WIDTH), dtype=np.uint8)
+        text = np.ascontiguousarray(prefixes).view(f"S{DATE_WIDTH}").ravel().astype(str)
+        self.dates = pd.to_datetime(text, format="%Y-%m-%d", errors="coerce").to_numpy()
+        self.starts, self.ends = starts, ends
+        self.ascending = bool(len(self.dates) == 0 or np.all(self.dates[1:] >= self.dates[:-1]))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def select(self, since=None, until=None):
+        """Positions of lines dated within since..until (inclusive), in file order."""
+        lo, hi = 0, len(self.dates)
+        if self.ascending:
+            if since is not None:
+                lo = int(np.searchsorted(self.dates, np.datetime64(since), "left"))
+            if until is not None:
+                hi = int(np.searchsorted(self.dates, np.datetime64(until), "right"))
+            return np.arange(lo, max(lo, hi))
+        mask = ~np.isnat(self.dates)
+        if since is not None:
+            mask &= self.dates >= np.datetime64(since)
+        if until is not None:
+            mask &= self.dates <= np.datetime64(until)
+        return np.flatnonzero(mask)
+
+    def byte_ranges(self, rows):
+        """Contiguous (start, end) byte ranges covering the selected lines."""
+        if not len(rows):
+            return []
+        breaks = np.flatnonzero(np.diff(rows) != 1) + 1
+        firsts = np.concatenate(([0], breaks))
+        lasts = np.append(breaks - 1, len(rows) - 1)
+        return [(int(self.starts[rows[a]]), int(self.ends[rows[b]])) for a, b in zip(firsts, lasts)]
+
+def date_index(path, has_header=True):
+    """The DateIndex for path as it is now, reused until the file changes."""
+    with _lock:
+        index = _indexes.get(path)
+        if index is None or index.signature != _signature(path):
+            index = DateIndex(path, has_header)
+            _indexes[path] = index
+    return index
+
+# ========== Reading ==========
+def _read_ranges(f, ranges):
+    for start, end in ranges:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(_READ_BLOCK, remaining))
+            if not block:
+                return
+            remaining -= len(block)
+            yield block
+
+def _raw_rows(f, index, ranges):
+    with f:
+        if index.header_end:
+            yield from _read_ranges(f, [(0, index.header_end)])
+        tail = b""
+        for block in _read_ranges(f, ranges):
+            tail = block[-1:]
+            yield block
+    if tail and tail != b"\n":
+        yield b"\n"
+
+def _selected_rows(f, index, ranges, keep):
+    def render(rows):
+        out = io.StringIO()
+        writer = csv.writer(out, lineterminator="\n")
+        for fields in rows:
+            writer.writerow([fields[i] if i < len(fields) else "" for i in keep])
+        return out.getvalue().encode()
+
+    yield render([index.header])
+    pending = b""
+    with f:
+        for block in _read_ranges(f, ranges):
+            pending += block
+            cut = pending.rfind(b"\n") + 1
+            if cut:
+                yield render(csv.reader(pending[:cut].decode().split("\n")[:-1]))
+                pending = pending[cut:]
+    if pending:
+        yield render(csv.reader([pending.decode()]))
+
+def iter_rows(path, since=None, until=None, columns=None, has_header=True):
+    """
+    Bytes of path restricted to lines dated since..until, header first, as an
+    iterator of blocks. columns limits a CSV to those columns (Date is always
+    kept); selected fields are copied as written, so values are not
+    reformatted. Raises ValueError up front for bad dates, unknown columns or
+    columns on a headerless file.
+    """
+    index = date_index(path, has_header)
+    since = None if since is None else pd.Timestamp(since)
+    until = None if until is None else pd.Timestamp(until)
+    ranges = index.byte_ranges(index.select(since, until))
+    if columns is None:
+        return _raw_rows(open(path, "rb"), index, ranges)
+
+    if not has_header:
+        raise ValueError(f"{os.path.basename(path)} has no columns to select")
+    unknown = [c for c in columns if c not in index.header]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+    keep = [0] + [i for i, name in enumerate(index.header) if name in columns and i != 0]
+    # Opened now rather than when streaming starts, so the rows come from the indexed file
+    return _selected_rows(open(path, "rb"), index, ranges, keep)
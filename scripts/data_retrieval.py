@@ -1,13 +1,17 @@
 import os
-import pandas as pd
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
 from scripts.DataRetrieval_FMP import fetch_all_tickers, get_valid_trading_days, TICKER_MAP
 from scripts.MarketBreadth_SQL import gather_market_breadth_data, reformat_breadth_data, merge_with_market_data
 from scripts.calculate_indicators import calculate_all_indicators
+from scripts.incremental_indicators import update_indicators_incremental, LOOKBACK
 from scripts.logger import get_logger
 from scripts.google_drive_uploader import upload_to_drive
+from scripts.column_store import publish_frame, append_columns
+from scripts.state_store import write_frame_rows, bump_data_generation
+from scripts.download_cache import precompress_later
+from scripts.storage import read_frame, read_tail, write_frame, append_frame, frame_exists, export_csv
 
 load_dotenv()
 logger = get_logger("data_retrieval")
@@ -32,7 +36,7 @@ def historical_data_retrieval():
         valid_days = get_valid_trading_days(start_date, end_date)
         df_market = df_market[df_market["Date"].isin(valid_days)]
         df_market.sort_values("Date", inplace=True)
-        df_market.to_csv(market_path, index=False)
+        write_frame(df_market, market_path)
         logger.info(f"Saved {len(df_market)} rows to MarketStates_Data.csv")
 
         gather_market_breadth_data()
@@ -42,30 +46,40 @@ def historical_data_retrieval():
 
         calculate_all_indicators(market_path, indicator_path)
         logger.info("Technical indicators calculated")
+        publish_frame(indicator_path)
+        write_frame_rows("market", read_frame(market_path), full=True)
+        write_frame_rows("indicators", read_frame(indicator_path), full=True)
 
         # Upload files to Google Drive (initial upload)
-        upload_to_drive(market_path, drive_folder_id)
-        upload_to_drive(indicator_path, drive_folder_id)
+        market_csv, indicator_csv = export_csv(market_path), export_csv(indicator_path)
+        upload_to_drive(market_csv, drive_folder_id)
+        upload_to_drive(indicator_csv, drive_folder_id)
+        precompress_later(market_csv, indicator_csv)
+        bump_data_generation()
 
     except Exception as e:
         logger.error(f"[Historical] Data retrieval failed: {e}")
 
 
 def daily_data_retrieval():
+    """
+    Append the days since the last stored date to the market and indicator
+    frames. Only the stored tails are read; indicators for the new rows come
+    from the persisted lookback state.
+    """
     logger.info("Running daily data retrieval...")
 
     market_path = os.path.join(data_dir, "MarketStates_Data.csv")
     indicator_path = os.path.join(data_dir, "MarketData_with_Indicators.csv")
 
-    if not os.path.exists(market_path):
+    if not frame_exists(market_path):
         logger.error("MarketStates_Data.csv not found. Run historical_data_retrieval first.")
         return
 
     try:
-        df_existing = pd.read_csv(market_path, parse_dates=["Date"])
-        df_existing.sort_values("Date", inplace=True)
+        market_tail = read_tail(market_path, LOOKBACK)
 
-        last_date = df_existing["Date"].max()
+        last_date = market_tail["Date"].max()
         start_date = (last_date + timedelta(days=1)).strftime("%Y-%m-%d")
         end_date = datetime.today().strftime("%Y-%m-%d")
 
@@ -77,42 +91,42 @@ def daily_data_retrieval():
             logger.info("No new market data to append.")
             return
 
-        df_combined = pd.concat([df_existing, df_new], ignore_index=True)
-        df_combined.drop_duplicates(subset=["Date"], keep="last", inplace=True)
-        df_combined.sort_values("Date", inplace=True)
-        df_combined.to_csv(market_path, index=False)
+        df_new = df_new.drop_duplicates(subset=["Date"], keep="last").sort_values("Date")
+        append_frame(df_new, market_path)
+        write_frame_rows("market", df_new)
         logger.info(f"Appended {len(df_new)} new row(s) to MarketStates_Data.csv")
 
-        if os.path.exists(indicator_path):
-            df_existing_ind = pd.read_csv(indicator_path, parse_dates=["Date"])
-            known_dates = set(df_existing_ind["Date"])
+        if not frame_exists(indicator_path):
+            logger.info("No indicator frame yet. Running full compute.")
+            calculate_all_indicators(market_path, indicator_path)
+            publish_frame(indicator_path)
+            write_frame_rows("indicators", read_frame(indicator_path), full=True)
         else:
-            df_existing_ind = pd.DataFrame()
-            known_dates = set()
+            ind_tail = read_tail(indicator_path, LOOKBACK)
+            ind_last = ind_tail["Date"].max() if len(ind_tail) else None
 
-        df_new_rows = df_combined[~df_combined["Date"].isin(known_dates)]
-        if df_new_rows.empty:
-            logger.info("No new dates to compute indicators for.")
-            return
-
-        tmp_input = os.path.join(data_dir, "temp_new_data.csv")
-        tmp_output = os.path.join(data_dir, "temp_new_indicators.csv")
-        df_new_rows.to_csv(tmp_input, index=False)
-        calculate_all_indicators(tmp_input, tmp_output)
+            if ind_last is None or ind_last < last_date:
+                # Indicators fell behind the market frame; catch up from the stored rows
+                df_new_rows = read_frame(market_path, start=None if ind_last is None else ind_last + timedelta(days=1))
+            else:
+                df_new_rows = df_new[df_new["Date"] > ind_last]
 
-        df_new_indicators = pd.read_csv(tmp_output, parse_dates=["Date"])
-        final_df = pd.concat([df_existing_ind, df_new_indicators], ignore_index=True)
-        final_df.drop_duplicates(subset=["Date"], keep="last", inplace=True)
-        final_df.sort_values("Date", inplace=True)
-        final_df.to_csv(indicator_path, index=False)
-        logger.info(f"Appended indicators for {len(df_new_indicators)} new date(s)")
+            if df_new_rows.empty:
+                logger.info("No new dates to compute indicators for.")
+                return
 
-        os.remove(tmp_input)
-        os.remove(tmp_output)
+            df_new_indicators = update_indicators_incremental(df_new_rows, ind_tail, indicator_path)
+            append_frame(df_new_indicators, indicator_path)
+            append_columns(df_new_indicators, indicator_path)
+            write_frame_rows("indicators", df_new_indicators)
+            logger.info(f"Appended indicators for {len(df_new_indicators)} new date(s)")
 
         # Upload updated files to Google Drive
-        upload_to_drive(market_path, drive_folder_id)
-        upload_to_drive(indicator_path, drive_folder_id)
+        market_csv, indicator_csv = export_csv(market_path), export_csv(indicator_path)
+        upload_to_drive(market_csv, drive_folder_id)
+        upload_to_drive(indicator_csv, drive_folder_id)
+        precompress_later(market_csv, indicator_csv)
+        bump_data_generation()
 
     except Exception as e:
         logger.error(f"[Daily] Data retrieval failed: {e}")
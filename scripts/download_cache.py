@@ -0,0 +1,167 @@
+import gzip
+import mimetypes
+import os
+import shutil
+import tempfile
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from flask import Response, request, send_file
+from scripts.csv_index import iter_rows
+from scripts.logger import get_logger
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = get_logger("download_cache")
+
+# Each rewrite of a data file is recompressed, so levels favour speed: on the
+# 8 MB states CSV higher levels shrink it a few percent for ~10x the time
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 9
+
+# Content codings in order of preference, with the suffix of the precompressed sibling
+ENCODINGS = (("zstd", ".zst"), ("gzip", ".gz"))
+
+_lock = threading.Lock()
+
+# One background worker: queued refreshes run in order and never compete with each other
+_background = ThreadPoolExecutor(max_workers=1, thread_name_prefix="precompress")
+
+# ========== Precompressed Siblings ==========
+# data/MarketData_with_States.csv -> .csv.gz and .csv.zst next to it. A sibling
+# carries its source's mtime, so it is stale as soon as the source is rewritten.
+def _available(encoding):
+    return encoding != "zstd" or zstandard is not None
+
+def _compress(src, dst, encoding):
+    with open(src, "rb") as f_in, open(dst, "wb") as f_out:
+        if encoding == "gzip":
+            # mtime=0 keeps the bytes, and so the ETag, stable across rebuilds
+            with gzip.GzipFile(filename="", mode="wb", fileobj=f_out, compresslevel=GZIP_LEVEL, mtime=0) as gz:
+                shutil.copyfileobj(f_in, gz, 1 << 20)
+        else:
+            zstandard.ZstdCompressor(level=ZSTD_LEVEL).copy_stream(f_in, f_out)
+
+def _is_fresh(path, sibling):
+    try:
+        return os.stat(sibling).st_mtime_ns == os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+def refresh_siblings(path, encodings=None):
+    """
+    Rebuild any missing or stale .gz/.zst sibling of path, or only those for
+    the given encodings. Returns the encodings rebuilt.
+    """
+    rebuilt = []
+    with _lock:
+        for encoding, suffix in ENCODINGS:
+            sibling = path + suffix
+            if encodings is not None and encoding not in encodings:
+                continue
+            if not _available(encoding) or _is_fresh(path, sibling):
+                continue
+            stat = os.stat(path)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=suffix + ".tmp")
+            os.close(fd)
+            try:
+                _compress(path, tmp_path, encoding)
+                # Stamped with the mtime read before compressing: a rewrite during it leaves the sibling stale
+                os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+                os.replace(tmp_path, sibling)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+            rebuilt.append(encoding)
+    if rebuilt:
+        logger.info(f"Precompressed {os.path.basename(path)} ({', '.join(rebuilt)})")
+    return rebuilt
+
+def precompress(*paths):
+    """Refresh the siblings of each existing file. Failures are logged; downloads then rebuild on demand."""
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        try:
+            refresh_siblings(path)
+        except OSError as e:
+            logger.warning(f"Could not precompress {path}: {e}")
+
+def precompress_later(*paths):
+    """
+    Queue precompress(*paths) on the background worker, so a pipeline run
+    returns without waiting on compression. A download that arrives first
+    compresses the one coding it needs. Returns the Future.
+    """
+    return _background.submit(precompress, *paths)
+
+# ========== Serving ==========
+def _negotiate(accept_encodings, path):
+    """
+    Preferred coding the client accepts, with its sibling rebuilt if stale,
+    or (None, path) for identity, including when the rebuild fails.
+    """
+    for encoding, suffix in ENCODINGS:
+        if _available(encoding) and accept_encodings[encoding] > 0:
+            try:
+                refresh_siblings(path, [encoding])
+            except OSError as e:
+                logger.warning(f"Serving {path} uncompressed: {e}")
+                return None, path
+            # A rewrite during the rebuild leaves the sibling stale; identity is still correct
+            if _is_fresh(path, path + suffix):
+                return encoding, path + suffix
+            return None, path
+    return None, path
+
+def send_download(path, download_name=None):
+    """
+    send_file for a data file, with the precompressed sibling chosen by
+    Accept-Encoding. Responses carry a strong ETag per representation and the
+    source's Last-Modified, answer If-None-Match/If-Modified-Since with 304 and
+    serve Range requests (over the encoded bytes, as HTTP specifies). Only
+    the negotiated coding is compressed when its sibling is stale.
+    """
+    encoding, file_path = _negotiate(request.accept_encodings, path)
+    stat = os.stat(path)
+    etag = f"{stat.st_size:x}-{stat.st_mtime_ns:x}" + (f"-{encoding}" if encoding else "")
+    download_name = download_name or os.path.basename(path)
+
+    response = send_file(
+        file_path,
+        mimetype=mimetypes.guess_type(download_name)[0] or "application/octet-stream",
+        as_attachment=True,
+        download_name=download_name,
+        conditional=True,
+        etag=etag,
+        last_modified=stat.st_mtime,
+    )
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    return response
+
+def send_delta(path, since=None, until=None, columns=None, rows=None):
+    """
+    Stream only the rows of a data file dated since..until (inclusive), and
+    for CSVs only the given columns, located through the file's date index.
+    rows, when given, are the blocks to send instead (e.g. with rendered
+    columns added). The ETag covers the file version and the query, so an
+    unchanged delta revalidates with 304. Raises ValueError for a bad date or
+    column.
+    """
+    if rows is None:
+        rows = iter_rows(path, since, until, columns, has_header=path.endswith(".csv"))
+    stat = os.stat(path)
+    query = "|".join([str(since), str(until), ",".join(columns or [])]).encode()
+    download_name = os.path.basename(path)
+
+    response = Response(rows, mimetype=mimetypes.guess_type(download_name)[0] or "application/octet-stream")
+    response.headers["Content-Disposition"] = f"attachment; filename={download_name}"
+    response.set_etag(f"{stat.st_size:x}-{stat.st_mtime_ns:x}-{zlib.crc32(query):x}")
+    response.last_modified = stat.st_mtime
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
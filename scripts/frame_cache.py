@@ -0,0 +1,85 @@
+import os
+import threading
+from collections import OrderedDict, namedtuple
+import numpy as np
+import pandas as pd
+from scripts.logger import get_logger
+from scripts.state_store import data_generation
+from scripts.storage import frame_signature, read_frame
+
+logger = get_logger("frame_cache")
+
+# Memory budget for cached frames; least recently used frames are evicted past it
+CACHE_MAX_MB = float(os.getenv("FRAME_CACHE_MB", 512))
+
+_Entry = namedtuple("_Entry", "signature generation frame nbytes")
+
+_entries = OrderedDict()
+_stats = {"hits": 0, "misses": 0, "reloads": 0, "evictions": 0}
+_lock = threading.Lock()
+
+# ========== Cache ==========
+# One entry per stored frame, keyed by its CSV path. An entry is served while
+# the frame's signature (size/mtime of the CSV or Parquet dataset) and the
+# pipeline's data generation both match what they were at load time.
+def _evict(budget):
+    total = sum(entry.nbytes for entry in _entries.values())
+    while _entries and total > budget:
+        path, entry = _entries.popitem(last=False)
+        total -= entry.nbytes
+        _stats["evictions"] += 1
+        logger.info(f"Evicted {os.path.basename(path)} ({entry.nbytes / 2**20:.1f} MB) from the frame cache")
+
+def get_frame(path, loader=read_frame):
+    """
+    The whole stored frame at path, loaded once per version and shared by
+    every caller in the process. Treat it as read-only.
+    """
+    signature, generation = frame_signature(path), data_generation()
+    with _lock:
+        entry = _entries.get(path)
+        if entry is not None and entry.signature == signature and entry.generation == generation:
+            _entries.move_to_end(path)
+            _stats["hits"] += 1
+            return entry.frame
+        _stats["reloads" if entry is not None else "misses"] += 1
+
+    df = loader(path)
+    nbytes = int(df.memory_usage(index=True, deep=True).sum())
+    budget = CACHE_MAX_MB * 2**20
+    with _lock:
+        _entries.pop(path, None)
+        if nbytes <= budget:
+            _entries[path] = _Entry(signature, generation, df, nbytes)
+            _evict(budget)
+    logger.info(f"Loaded {os.path.basename(path)} into the frame cache ({len(df)} rows, {nbytes / 2**20:.1f} MB)")
+    return df
+
+def cached_frame(path, columns=None, start=None, end=None, loader=read_frame):
+    """
+    read_frame(path, columns, start, end) served from the cached whole frame.
+    Columns not in the frame are skipped, as read_frame does.
+    """
+    df = get_frame(path, loader)
+    if start is not None or end is not None:
+        dates = df["Date"].to_numpy()
+        lo = 0 if start is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start)), "left"))
+        hi = len(df) if end is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(end)), "right"))
+        df = df.iloc[lo:max(lo, hi)]
+    if columns is not None:
+        df = df[[c for c in df.columns if c == "Date" or c in columns]]
+    return df
+
+def frame_cache_stats():
+    with _lock:
+        stats = dict(_stats)
+        stats["entries"] = len(_entries)
+        stats["megabytes"] = round(sum(entry.nbytes for entry in _entries.values()) / 2**20, 2)
+    lookups = stats["hits"] + stats["misses"] + stats["reloads"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else None
+    return stats
+
+def clear_frame_cache():
+    with _lock:
+        _entries.clear()
+    logger.info("Cleared the frame cache.")
@@ -0,0 +1,99 @@
+import json
+import os
+import pandas as pd
+import numpy as np
+from scripts.calculate_indicators import calculate_indicators_frame
+from scripts.logger import get_logger
+
+logger = get_logger("indicators")
+
+# Longest lookback used by calculate_indicators_frame: the 20d slope and BBW
+# windows. RSI_14 needs 15 closes and 10d_ROC 11, both covered by 20 prior rows.
+LOOKBACK = 20
+
+def indicator_state_path(indicator_path):
+    root, _ = os.path.splitext(indicator_path)
+    return f"{root}.state.json"
+
+def build_indicator_state(df):
+    """Keep the last LOOKBACK closes per ticker, the only inputs the indicators need."""
+    df = df.sort_values("Date")
+    tail = df.tail(LOOKBACK)
+    close_cols = [col for col in df.columns if col.startswith("Close_")]
+    return {
+        "last_date": tail["Date"].iloc[-1].strftime("%Y-%m-%d") if len(tail) else None,
+        "dates": tail["Date"].dt.strftime("%Y-%m-%d").tolist(),
+        "closes": {
+            col: [None if pd.isna(v) else float(v) for v in tail[col]]
+            for col in close_cols
+        },
+    }
+
+def save_indicator_state(state, path):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+    logger.info(f"Saved indicator state ({len(state['closes'])} tickers) to {path}")
+
+def load_indicator_state(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"Could not read indicator state {path}: {e}")
+        return None
+
+def _state_frame(state):
+    closes = {col: np.array(values, dtype=np.float64) for col, values in state["closes"].items()}
+    return pd.DataFrame({"Date": pd.to_datetime(state["dates"]), **closes})
+
+def append_indicators(df_new, state):
+    """
+    Compute indicators for rows dated after the state's last date.
+
+    The new rows are evaluated on top of the stored tail, so each bar costs
+    O(LOOKBACK) per ticker instead of a full-history recompute.
+    Returns (indicator rows for df_new, updated state).
+    """
+    df_new = df_new.sort_values("Date").reset_index(drop=True)
+    if state["last_date"] is not None and df_new["Date"].min() <= pd.Timestamp(state["last_date"]):
+        raise ValueError(f"New rows must be dated after {state['last_date']}")
+
+    tail = _state_frame(state)
+    n_tail = len(tail)
+    combined = pd.concat([tail, df_new], ignore_index=True)
+    combined = calculate_indicators_frame(combined)
+
+    result = combined.iloc[n_tail:].reset_index(drop=True)
+    result = result[list(df_new.columns) + [c for c in result.columns if c not in df_new.columns and c not in tail.columns]]
+    return result, build_indicator_state(combined)
+
+def update_indicators_incremental(df_new, df_existing_ind, indicator_path):
+    """
+    Return indicator rows for df_new using the persisted tail state.
+
+    The state file lives next to the indicator CSV. If it is missing or out of
+    sync with df_existing_ind, it is rebuilt from the tail of the existing
+    indicator frame, which carries the same Close_ columns.
+    """
+    state_path = indicator_state_path(indicator_path)
+    state = load_indicator_state(state_path)
+
+    last_known = None
+    if not df_existing_ind.empty:
+        last_known = pd.Timestamp(df_existing_ind["Date"].max()).strftime("%Y-%m-%d")
+
+    if state is None or state["last_date"] != last_known:
+        logger.info("Indicator state missing or stale. Rebuilding from existing indicators.")
+        if df_existing_ind.empty:
+            state = {"last_date": None, "dates": [], "closes": {}}
+        else:
+            state = build_indicator_state(df_existing_ind)
+
+    df_new_ind, state = append_indicators(df_new, state)
+    save_indicator_state(state, state_path)
+    logger.info(f"Incrementally computed indicators for {len(df_new_ind)} new row(s)")
+    return df_new_ind
@@ -0,0 +1,115 @@
+import re
+import numpy as np
+from scripts.calculate_indicators import (
+    pct_change_matrix, rsi_matrix, sma_matrix, rolling_slope, _bbw, _append_columns,
+)
+from scripts.logger import get_logger
+
+logger = get_logger("indicators")
+
+# ========== Registry ==========
+# Each entry maps an output-column pattern to the columns it reads and the
+# kernel that produces it. Inputs may themselves be registry outputs, so a
+# request resolves to the minimal dependency subgraph.
+#
+# Scope: the daily and incremental pipelines still compute the full indicator
+# set with calculate_indicators, because the stored frame is also what
+# /indicators, the downloads and the Drive/SQL exports serve. The registry
+# fills in columns a classifier needs that the stored frame lacks
+# (load_shared_frame), and serves one-off requests.
+INDICATOR_REGISTRY = []
+
+def register_indicator(pattern, inputs, compute):
+    INDICATOR_REGISTRY.append((re.compile(pattern), inputs, compute))
+
+def _column(values):
+    return values[:, None]
+
+register_indicator(
+    r"^5d_pct_(?P<base>.+)$",
+    lambda m: [f"Close_{m['base']}"],
+    lambda m, close: pct_change_matrix(_column(close), 5)[:, 0],
+)
+register_indicator(
+    r"^(?P<window>\d+)d_ROC_(?P<base>.+)$",
+    lambda m: [f"Close_{m['base']}"],
+    lambda m, close: pct_change_matrix(_column(close), int(m["window"]))[:, 0],
+)
+register_indicator(
+    r"^RSI_(?P<window>\d+)_(?P<base>.+)$",
+    lambda m: [f"Close_{m['base']}"],
+    lambda m, close: rsi_matrix(_column(close), int(m["window"]))[:, 0],
+)
+register_indicator(
+    r"^(?P<window>\d+)d_slope_(?P<base>.+)$",
+    lambda m: [f"Close_{m['base']}"],
+    lambda m, close: rolling_slope(close, int(m["window"])),
+)
+register_indicator(
+    r"^SMA_(?P<window>\d+)_(?P<base>.+)$",
+    lambda m: [f"Close_{m['base']}"],
+    lambda m, close: sma_matrix(_column(close), int(m["window"]))[:, 0],
+)
+register_indicator(
+    r"^5d_Slope_(?P<base>.+)$",
+    lambda m: [f"Close_{m['base']}"],
+    lambda m, close: rolling_slope(close, 5),
+)
+register_indicator(
+    r"^Normalized_ATR$",
+    lambda m: ["5d_Slope_SP500", "Close_SP500"],
+    lambda m, slope, close: slope / close,
+)
+register_indicator(
+    r"^BBW$",
+    lambda m: ["Close_SP500"],
+    lambda m, close: _bbw(["SP500"], _column(close)),
+)
+register_indicator(
+    r"^RSP/SPY_Ratio$",
+    lambda m: ["Close_RSP", "Close_SPY"],
+    lambda m, rsp, spy: rsp / spy,
+)
+
+def _lookup(column):
+    for pattern, inputs, compute in INDICATOR_REGISTRY:
+        match = pattern.match(column)
+        if match:
+            return match, inputs, compute
+    return None
+
+# ========== Resolution ==========
+def _resolve(df, column, memo, stack):
+    if column in memo:
+        return memo[column]
+    if column in df.columns:
+        memo[column] = df[column].to_numpy(dtype=np.float64)
+        return memo[column]
+
+    entry = _lookup(column)
+    if entry is None:
+        raise KeyError(f"No input column or registered indicator named {column}")
+    if column in stack:
+        raise ValueError(f"Circular indicator dependency at {column}")
+
+    match, inputs, compute = entry
+    args = [_resolve(df, dep, memo, stack | {column}) for dep in inputs(match)]
+    memo[column] = compute(match, *args)
+    return memo[column]
+
+def compute_indicators(df, columns, memo=None):
+    """
+    Attach only the requested indicator columns to df.
+
+    Dependencies are computed on demand and memoized in `memo`, which callers
+    may pass in to share intermediates across several requests on the same df.
+    Columns already present in df are used as-is.
+    """
+    memo = {} if memo is None else memo
+    new_columns = {}
+    for column in columns:
+        if column in df.columns:
+            continue
+        new_columns[column] = _resolve(df, column, memo, frozenset())
+    logger.info(f"Computed {len(new_columns)} requested indicator(s) from {len(memo)} resolved column(s).")
+    return _append_columns(df, new_columns) if new_columns else df
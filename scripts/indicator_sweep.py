@@ -0,0 +1,195 @@
+import pandas as pd
+import numpy as np
+from scripts.calculate_indicators import _close_matrix
+from scripts.logger import get_logger
+
+logger = get_logger("indicators")
+
+# Default parameter-study ranges when no windows are given
+DEFAULT_SWEEP = {
+    "RSI": range(7, 31),
+    "slope": range(5, 61),
+}
+
+# Window starts per block of the slope's block-local prefix sums
+SLOPE_BLOCK = 32
+
+# Shortest window each kernel is defined for (slope and BBW divide by w - 1)
+MIN_WINDOW = {"slope": 2, "BBW": 2}
+
+# ========== Prefix Sums ==========
+def _prefix(values):
+    """Cumulative sums with a leading zero row, so window sums are P[end] - P[start]."""
+    out = np.zeros((values.shape[0] + 1, values.shape[1]))
+    np.cumsum(values, axis=0, out=out[1:])
+    return out
+
+class _PrefixSums:
+    """Prefix sums of the centered closes shared by every window in a sweep."""
+
+    def __init__(self, closes, span=0):
+        self.n = closes.shape[0]
+        nan_mask = np.isnan(closes)
+        # Centering keeps the running sums small, which matters for long histories
+        center = np.nan_to_num(np.nanmean(closes, axis=0)) if self.n else np.zeros(closes.shape[1])
+        y = np.where(nan_mask, 0.0, closes - center)
+
+        self.closes = closes
+        self.center = center
+        self.nans = _prefix(nan_mask.astype(np.float64))
+        self.y = _prefix(y)
+        self.yy = _prefix(y * y)
+
+        delta = np.diff(closes, axis=0, prepend=np.nan)
+        self.gain = _prefix(np.where(delta > 0, delta, 0.0))
+        self.loss = _prefix(-np.where(delta < 0, delta, 0.0))
+
+        self.span = span
+        self._local = None
+
+    def local(self, w):
+        """
+        Block-local prefix sums of y and t*y for windows up to w rows long.
+        Block k holds the windows starting in its SLOPE_BLOCK rows, and its
+        sums restart at the block's first row, with t counted from there and
+        y centered on the block's mean. A global t*y prefix grows with the square of the
+        history and its differences lose the slope to cancellation; these
+        stay as small as the window.
+        """
+        if self._local is not None and self._local[0] >= w:
+            return self._local[1:]
+        span = max(w, self.span)
+        rows = np.arange(0, self.n, SLOPE_BLOCK)[:, None] + np.arange(SLOPE_BLOCK + span)
+        values = self.closes[np.minimum(rows, self.n - 1)]
+        valid = (rows < self.n)[:, :, None] & ~np.isnan(values)
+        values = np.where(valid, values, 0.0)
+        center = values.sum(axis=1) / np.maximum(valid.sum(axis=1), 1)
+        y = np.where(valid, values - center[:, None, :], 0.0)
+        t = np.arange(rows.shape[1], dtype=np.float64)[None, :, None]
+
+        sum_y = np.zeros((rows.shape[0], rows.shape[1] + 1, y.shape[2]))
+        sum_ty = np.zeros_like(sum_y)
+        np.cumsum(y, axis=1, out=sum_y[:, 1:])
+        np.cumsum(t * y, axis=1, out=sum_ty[:, 1:])
+        self._local = (span, sum_y, sum_ty)
+        return sum_y, sum_ty
+
+    @staticmethod
+    def window(prefix, w, start, stop):
+        """Sums over rows [i-w, i) for i in [start, stop)."""
+        return prefix[start:stop] - prefix[start - w:stop - w]
+
+# ========== Per-window Kernels ==========
+def _sweep_rsi(p, w):
+    out = np.full(p.closes.shape, np.nan)
+    if p.n < w:
+        return out
+    avg_gain = p.window(p.gain, w, w, p.n + 1) / w
+    avg_loss = p.window(p.loss, w, w, p.n + 1) / w
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[w - 1:] = 100 - (100 / (1 + avg_gain / avg_loss))
+    return out
+
+def _sweep_slope(p, w):
+    # Window ends at row i-1, matching rolling_slope
+    out = np.full(p.closes.shape, np.nan)
+    if p.n <= w:
+        return out
+    sum_y, sum_ty = p.local(w)
+    start = np.arange(p.n - w)
+    block, offset = start // SLOPE_BLOCK, start % SLOPE_BLOCK
+    window_y = sum_y[block, offset + w] - sum_y[block, offset]
+    window_ty = sum_ty[block, offset + w] - sum_ty[block, offset]
+    sxx = w * (w * w - 1) / 12.0
+    slope = (window_ty - (offset[:, None] + (w - 1) / 2.0) * window_y) / sxx
+    slope[p.window(p.nans, w, w, p.n) > 0] = np.nan
+    out[w:] = slope
+    return out
+
+def _sweep_sma(p, w):
+    out = np.full(p.closes.shape, np.nan)
+    if p.n < w:
+        return out
+    sma = p.window(p.y, w, w, p.n + 1) / w + p.center
+    sma[p.window(p.nans, w, w, p.n + 1) > 0] = np.nan
+    out[w - 1:] = sma
+    return out
+
+def _sweep_bbw(p, w):
+    out = np.full(p.closes.shape, np.nan)
+    if p.n < w:
+        return out
+    sum_y = p.window(p.y, w, w, p.n + 1)
+    sum_yy = p.window(p.yy, w, w, p.n + 1)
+    var = np.maximum(sum_yy - sum_y * sum_y / w, 0.0) / (w - 1)
+    sma = sum_y / w + p.center
+    bbw = 4 * np.sqrt(var) / sma
+    bbw[p.window(p.nans, w, w, p.n + 1) > 0] = np.nan
+    out[w - 1:] = bbw
+    return out
+
+def _sweep_roc(p, w):
+    out = np.full(p.closes.shape, np.nan)
+    if p.n > w:
+        out[w:] = (p.closes[w:] / p.closes[:-w] - 1) * 100
+    return out
+
+SWEEP_KERNELS = {
+    "RSI": _sweep_rsi,
+    "slope": _sweep_slope,
+    "SMA": _sweep_sma,
+    "BBW": _sweep_bbw,
+    "ROC": _sweep_roc,
+}
+
+# ========== Public API ==========
+def sweep_indicators(df, windows=None, as_frame=False):
+    """
+    Evaluate many lookback windows per indicator in one pass over the closes.
+
+    `windows` maps an indicator name in SWEEP_KERNELS to an iterable of window
+    lengths. Returns {name: (windows, array[windows, rows, tickers])} plus the
+    ticker list, or a long-format frame (Date, Ticker, Indicator, Window, Value)
+    when as_frame is True. Windowed sums come from prefix sums of the centered
+    closes; slope sums restart every SLOPE_BLOCK rows, so slopes match
+    rolling_slope to rounding. Raises ValueError for an unknown indicator or
+    a window shorter than MIN_WINDOW allows.
+    """
+    windows = DEFAULT_SWEEP if windows is None else windows
+    windows = {name: list(name_windows) for name, name_windows in windows.items()}
+    for name, name_windows in windows.items():
+        if name not in SWEEP_KERNELS:
+            raise ValueError(f"Unknown sweep indicator: {name}")
+        too_short = [w for w in name_windows if w < MIN_WINDOW.get(name, 1)]
+        if too_short:
+            raise ValueError(f"{name} windows must be at least {MIN_WINDOW.get(name, 1)}: {too_short}")
+
+    bases, closes = _close_matrix(df)
+    prefix = _PrefixSums(closes, span=max(windows.get("slope") or [0]))
+
+    results = {}
+    for name, name_windows in windows.items():
+        kernel = SWEEP_KERNELS[name]
+        results[name] = (name_windows, np.stack([kernel(prefix, w) for w in name_windows]))
+
+    total = sum(len(w) for w, _ in results.values())
+    logger.info(f"Swept {total} indicator window(s) across {len(bases)} ticker(s) and {len(df)} rows.")
+
+    if not as_frame:
+        return bases, results
+    return sweep_to_frame(df["Date"].to_numpy(), bases, results)
+
+def sweep_to_frame(dates, bases, results):
+    frames = []
+    for name, (name_windows, values) in results.items():
+        n_windows, n_rows, n_tickers = values.shape
+        frames.append(pd.DataFrame({
+            "Date": np.tile(np.repeat(dates, n_tickers), n_windows),
+            "Ticker": np.tile(bases, n_windows * n_rows),
+            "Indicator": name,
+            "Window": np.repeat(name_windows, n_rows * n_tickers),
+            "Value": values.reshape(-1),
+        }))
+    if not frames:
+        return pd.DataFrame(columns=["Date", "Ticker", "Indicator", "Window", "Value"])
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,129 @@
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+from scripts.classifier_runner import CLASSIFIERS
+from scripts.column_store import open_columns
+from scripts.frame_cache import cached_frame
+from scripts.logger import get_logger
+from scripts.state_store import query_states, states_generation
+from scripts.storage import frame_exists
+
+logger = get_logger("query_index")
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+indicator_path = os.path.join(base_dir, "data", "MarketData_with_Indicators.csv")
+
+_lock = threading.Lock()
+_state_index = None
+
+def _day(value):
+    return np.datetime64(pd.Timestamp(value).normalize(), "D")
+
+# ========== States ==========
+class StateIndex:
+    """
+    One generation of the state store held in memory: per system, a sorted
+    date array and each row pre-rendered as compact JSON, so a range query is
+    two binary searches and a join of strings.
+    """
+
+    def __init__(self, generation):
+        self.generation = generation
+        df = query_states()
+        self.dates, self.rows = {}, {}
+        for system, group in df.groupby("System", sort=True):
+            self.dates[system] = group["Date"].to_numpy().astype("datetime64[D]")
+            self.rows[system] = [
+                json.dumps({"System": system, "Date": f"{date:%Y-%m-%d}", "MarketState": state,
+                            "Score": None if pd.isna(score) else float(score)}, separators=(",", ":"))
+                for date, state, score in zip(group["Date"], group["MarketState"], group["Score"])
+            ]
+        # Lower-cased aliases so ?system=june finds "June"; registered classifiers
+        # are known before their first run and just have no rows yet
+        self.systems = {system.lower(): system for system in [*CLASSIFIERS, *self.dates]}
+
+    def lookup(self, system=None, start=None, end=None):
+        """
+        Pre-rendered rows for one system (or all, by system then date) dated
+        start..end inclusive. Raises ValueError for a system that is neither
+        registered nor stored.
+        """
+        if system is None:
+            names = list(self.dates)
+        elif system.lower() in self.systems:
+            names = [self.systems[system.lower()]]
+        else:
+            raise ValueError(f"Unknown system: {system}")
+        start = None if start is None else _day(start)
+        end = None if end is None else _day(end)
+
+        rows = []
+        for name in names:
+            if name not in self.dates:
+                continue
+            dates = self.dates[name]
+            lo = 0 if start is None else int(np.searchsorted(dates, start, "left"))
+            hi = len(dates) if end is None else int(np.searchsorted(dates, end, "right"))
+            rows.extend(self.rows[name][lo:hi])
+        return rows
+
+def state_index():
+    """The in-memory StateIndex, reloaded when a classifier run has written new states."""
+    global _state_index
+    generation = states_generation()
+    with _lock:
+        if _state_index is None or _state_index.generation != generation:
+            _state_index = StateIndex(generation)
+            logger.info(f"Loaded state index generation {generation} "
+                        f"({sum(len(r) for r in _state_index.rows.values())} rows)")
+        return _state_index
+
+# ========== Indicators ==========
+def indicator_frame(columns=None, start=None, end=None, path=None):
+    """
+    Indicator rows dated start..end with the given columns (Date always kept),
+    sliced from the memory-mapped column store, which follows each publish.
+    Falls back to the cached stored frame when nothing current is published.
+    Raises ValueError for unknown columns and FileNotFoundError when there is
+    no indicator frame yet.
+    """
+    path = path or indicator_path
+    store = open_columns(path)
+    if store is not None and store.is_current(path):
+        df = None
+        known = store.columns
+    else:
+        if not frame_exists(path):
+            raise FileNotFoundError(f"{os.path.basename(path)} does not exist")
+        df = cached_frame(path, columns=columns, start=start, end=end)
+        known = df.columns
+    unknown = [c for c in columns or [] if c != "Date" and c not in known]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+    return store.frame(columns=columns, start=start, end=end) if df is None else df
+
+# ========== Rendering ==========
+def render_rows(rows, key, ndjson=False):
+    """Compact JSON ({"count": n, key: [...]}) or NDJSON, from pre-rendered row strings."""
+    if ndjson:
+        return "".join(row + "\n" for row in rows)
+    return f'{{"count":{len(rows)},"{key}":[{",".join(rows)}]}}'
+
+def _json_values(values):
+    """Column values as Python objects for json.dumps, NaN/NaT as None."""
+    return [None if pd.isna(v) else v for v in values.tolist()]
+
+def frame_rows(df):
+    """
+    A frame as compact JSON row strings, Date as YYYY-MM-DD and NaN as null.
+    Floats keep their shortest round-trip form (to_json rounds to fixed
+    decimals, which zeroes the tiny slope values).
+    """
+    if df.empty:
+        return []
+    names = list(df.columns)
+    columns = [pd.to_datetime(df["Date"]).dt.strftime("%Y-%m-%d").tolist() if name == "Date"
+               else _json_values(df[name].to_numpy()) for name in names]
+    return [json.dumps(dict(zip(names, row)), separators=(",", ":")) for row in zip(*columns)]
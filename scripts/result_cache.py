@@ -0,0 +1,137 @@
+import hashlib
+import inspect
+import os
+import threading
+import types
+import pandas as pd
+import numpy as np
+from scripts.logger import get_logger
+
+logger = get_logger("result_cache")
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+cache_dir = os.path.join(base_dir, "data", "cache", "classification")
+
+# Disk budget for cached results; least recently used entries are evicted past it
+CACHE_MAX_MB = float(os.getenv("RESULT_CACHE_MB", 256))
+
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+_lock = threading.Lock()
+
+# ========== Keys ==========
+def _fingerprint(obj):
+    # Functions hash by the source of their whole defining module, so edits to the
+    # module-level constants and helpers they look up by name also invalidate
+    if isinstance(obj, (types.FunctionType, types.MethodType)):
+        module = inspect.getmodule(obj)
+        try:
+            return f"{module.__name__}:{inspect.getsource(module)}"
+        except (TypeError, OSError):
+            # No source on disk (e.g. defined interactively); fall back to the bytecode
+            return _code_fingerprint(obj.__code__)
+    return repr(obj)
+
+def _code_fingerprint(code):
+    # Nested code objects are expanded since their repr carries a memory address
+    return repr((code.co_code, [_code_fingerprint(c) if isinstance(c, types.CodeType) else repr(c)
+                                for c in code.co_consts]))
+
+def ruleset_version(*parts):
+    """
+    Short hash of thresholds, profiles, rule tables or scoring functions. A
+    function stands for the full source of the module that defines it.
+    """
+    return hashlib.blake2b("|".join(_fingerprint(p) for p in parts).encode(), digest_size=8).hexdigest()
+
+def cache_key(name, version, df, columns, extra=None):
+    """Hash of the classifier, its ruleset version and the Date + input column values."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{name}|{version}|{extra!r}|{len(df)}".encode())
+    h.update(df["Date"].to_numpy(dtype="datetime64[ns]").tobytes())
+    for col in columns:
+        if col in df.columns:
+            h.update(col.encode())
+            h.update(np.ascontiguousarray(df[col].to_numpy(dtype=np.float64)).tobytes())
+    return h.hexdigest()
+
+# ========== Storage ==========
+def _entry_path(key):
+    return os.path.join(cache_dir, f"{key}.pkl")
+
+def _evict():
+    entries = [os.path.join(cache_dir, f) for f in os.listdir(cache_dir) if f.endswith(".pkl")]
+    entries = [(os.path.getmtime(p), os.path.getsize(p), p) for p in entries]
+    total = sum(size for _, size, _ in entries)
+    limit = CACHE_MAX_MB * 1024 ** 2
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        total -= size
+        with _lock:
+            _stats["evictions"] += 1
+
+def get_cached(key):
+    path = _entry_path(key)
+    try:
+        result = pd.read_pickle(path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Discarding unreadable cache entry {path}: {e}")
+        return None
+    try:
+        os.utime(path)  # mark as recently used
+    except FileNotFoundError:
+        pass
+    return result
+
+def put_cached(key, result):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _entry_path(key)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    result.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+    _evict()
+
+# ========== Cached Classification ==========
+def cached_classify(name, version, df, columns, classify, extra=None):
+    """
+    Return classify(df), reusing a stored result when the same classifier and
+    ruleset version already saw identical input rows. Only the columns the
+    classifier adds are stored; they are re-attached to a copy of df on a hit.
+    """
+    key = cache_key(name, version, df, columns, extra)
+    cached = get_cached(key)
+    if cached is not None:
+        with _lock:
+            _stats["hits"] += 1
+        result = df.copy()
+        for col in cached.columns:
+            result[col] = cached[col].to_numpy()
+        logger.info(f"Cache hit for {name} ({len(df)} rows, key {key[:12]}). Stats: {cache_stats()}")
+        return result
+
+    result = classify(df)
+    added = [col for col in result.columns if col not in df.columns]
+    put_cached(key, result[added].reset_index(drop=True))
+    with _lock:
+        _stats["misses"] += 1
+    logger.info(f"Cache miss for {name} ({len(df)} rows, key {key[:12]}). Stats: {cache_stats()}")
+    return result
+
+def cache_stats():
+    with _lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else None
+    return stats
+
+def clear_cache():
+    if os.path.isdir(cache_dir):
+        for f in os.listdir(cache_dir):
+            os.remove(os.path.join(cache_dir, f))
+    logger.info("Cleared classification result cache.")
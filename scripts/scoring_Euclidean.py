@@ -3,6 +3,11 @@ import pandas as pd
 import numpy as np
 import logging
 import sys
+try:
+    from scripts.txt_logs import append_state_logs
+except ModuleNotFoundError:
+    # Run directly from the scripts/ directory
+    from txt_logs import append_state_logs
 
 # ========== Logger Setup ==========
 def get_logger(name="market_state_system_a"):
@@ -23,6 +28,9 @@ def get_logger(name="market_state_system_a"):
 
 logger = get_logger()
 
+# Indicator columns read by the scoring logic (see scripts/indicator_registry.py)
+REQUIRED_INDICATORS = ["5d_pct_SP500", "20d_slope_SP500", "RSI_14_SP500", "Close_VIX", "Normalized_ATR", "BBW"]
+
 # ========== Market State Profiles ==========
 state_profiles = {
     "Steady Climb": [2, 1, 2],
@@ -32,6 +40,16 @@ state_profiles = {
     "Volatile Chop": [0, 0, -2],
 }
 
+# Bucket edges used by compute_scores_system_a_vectorized, highest first
+SYSTEM_A_THRESHOLDS = {
+    "sp500": (2.0, 0.5, -0.5, -2.0),
+    "ma20": (0.5, 0.2, -0.2, -0.5),
+    "rsi": (65, 50, 40),
+    "vix": (16, 20, 25),
+    "atr": (0.01, 0.015),
+    "bbw": (3.0, 5.0),
+}
+
 # ========== Scoring Logic ==========
 def compute_scores_system_a(row):
     trend_score = 0
@@ -68,28 +86,115 @@ def compute_scores_system_a(row):
 
     return pd.Series([trend_score, momentum_score, volatility_score])
 
+def _column(df, name):
+    return df[name].to_numpy(dtype=np.float64) if name in df.columns else np.full(len(df), np.nan)
+
+def compute_scores_system_a_vectorized(df, thresholds=None):
+    """
+    Column-wise equivalent of compute_scores_system_a: same buckets, same NaN handling
+    (NaN falls through to the final branch of each if/elif chain). thresholds
+    overrides entries of SYSTEM_A_THRESHOLDS.
+    """
+    t = SYSTEM_A_THRESHOLDS if thresholds is None else {**SYSTEM_A_THRESHOLDS, **thresholds}
+    sp500 = _column(df, "5d_pct_SP500")
+    ma20 = _column(df, "20d_slope_SP500")
+    rsi = _column(df, "RSI_14_SP500")
+    vix = _column(df, "Close_VIX")
+    atr = _column(df, "Normalized_ATR")
+    bbw = _column(df, "BBW")
+
+    def trend_buckets(x, edges):
+        e0, e1, e2, e3 = edges
+        return np.select([x > e0, (e1 <= x) & (x <= e0), (e2 <= x) & (x < e1),
+                          (e3 <= x) & (x < e2), x < e3], [2, 1, 0, -1, -2], default=0)
+
+    trend_score = trend_buckets(sp500, t["sp500"]) + trend_buckets(ma20, t["ma20"])
+    r0, r1, r2 = t["rsi"]
+    momentum_score = np.select([rsi > r0, (r1 <= rsi) & (rsi <= r0), (r2 <= rsi) & (rsi < r1)], [2, 1, 0], default=-2)
+
+    v0, v1, v2 = t["vix"]
+    vix_score = np.select([vix < v0, (v0 <= vix) & (vix <= v1), (v1 < vix) & (vix <= v2)], [1, 0, -1], default=-2)
+    a0, a1 = t["atr"]
+    atr_score = np.select([atr < a0, (a0 <= atr) & (atr <= a1)], [1, 0], default=-1)
+    b0, b1 = t["bbw"]
+    bbw_score = np.select([bbw < b0, (b0 <= bbw) & (bbw <= b1)], [1, 0], default=-1)
+    volatility_score = vix_score + atr_score + bbw_score
+
+    return pd.DataFrame({
+        "TrendScore_A": trend_score,
+        "MomentumScore_A": momentum_score,
+        "VolatilityScore_A": volatility_score,
+    }, index=df.index).astype(np.int64)
+
 # ========== Classification Function ==========
-def classify_market_states_system_a(df: pd.DataFrame) -> pd.DataFrame:
+def nearest_profiles(scores, profiles=None):
+    """
+    Distances from each (trend, momentum, volatility) row to every profile in
+    state_profiles (or the given {state: vector} dict), as a (rows x states)
+    matrix. argmin takes the first minimum, which matches min() over the dict
+    in insertion order on ties.
+    """
+    profiles = np.array(list((state_profiles if profiles is None else profiles).values()), dtype=np.float64)
+    distances = np.linalg.norm(scores[:, None, :] - profiles[None, :, :], axis=2)
+    return distances.argmin(axis=1), distances
+
+def classify_market_states_system_a(df: pd.DataFrame, compact: bool = False, include_distances: bool = False,
+                                    diagnostics: bool = False) -> pd.DataFrame:
     logger.info("Scoring and classifying market states (System A)...")
     df = df.copy()
-    df[['TrendScore_A', 'MomentumScore_A', 'VolatilityScore_A']] = df.apply(compute_scores_system_a, axis=1)
-
-    def classify_row(row):
-        vector = np.array([row['TrendScore_A'], row['MomentumScore_A'], row['VolatilityScore_A']])
-        distances = {state: np.linalg.norm(vector - np.array(profile)) for state, profile in state_profiles.items()}
-        best_state = min(distances, key=distances.get)
-        dist = distances[best_state]
-        diag = (
-            f"5d%: {row['5d_pct_SP500']:+.2f}%, MA20: {row['20d_slope_SP500']:+.2f}, "
-            f"RSI: {row['RSI_14_SP500']:.1f}, VIX: {row['Close_VIX']:.2f}, "
-            f"ATR: {row['Normalized_ATR']:.4f}, BBW: {row['BBW']:.2f}, "
-            f"Score: {[row['TrendScore_A'], row['MomentumScore_A'], row['VolatilityScore_A']]}, Dist: {dist:.2f}"
-        )
-        return pd.Series([best_state, dist, diag])
-
-    df[['MarketState_A', 'EuclideanDist_A', 'Diagnostics_A']] = df.apply(classify_row, axis=1)
+    score_cols = ['TrendScore_A', 'MomentumScore_A', 'VolatilityScore_A']
+    df[score_cols] = compute_scores_system_a_vectorized(df)
+
+    scores = df[score_cols].to_numpy()
+    best, distances = nearest_profiles(scores.astype(np.float64))
+    states = np.array(list(state_profiles), dtype=object)[best]
+    dist = distances[np.arange(len(df)), best]
+
+    df['MarketState_A'] = pd.Series(states, index=df.index, dtype=str)
+    df['EuclideanDist_A'] = dist
+    if diagnostics:
+        df['Diagnostics_A'] = render_diagnostics_system_a(df)
+
+    if include_distances:
+        for j, state in enumerate(state_profiles):
+            df[f"Dist_{state.replace(' ', '')}_A"] = distances[:, j]
+        # Confidence margin: how much closer the winner is than the runner-up
+        ordered = np.sort(distances, axis=1)
+        df['DistMargin_A'] = ordered[:, 1] - ordered[:, 0] if len(state_profiles) > 1 else np.nan
+
+    if compact:
+        # Imported lazily so the module still runs as a standalone script
+        from scripts.compact_frames import compact_frame
+        df = compact_frame(df, label="classified states")
     return df
 
+# ========== Diagnostics ==========
+def _fmt(values, spec):
+    return np.strings.mod(spec, np.asarray(values, dtype=np.float64))
+
+def _assemble(*parts):
+    """Element-wise concatenation of literal strings and string arrays."""
+    out = parts[0]
+    for part in parts[1:]:
+        out = np.strings.add(out, part)
+    return out
+
+def render_diagnostics_system_a(df: pd.DataFrame) -> pd.Series:
+    """
+    Build the Diagnostics_A text from the stored indicator, score and distance
+    columns. Classification leaves it out; writers render just the rows they emit.
+    """
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=str)
+    text = _assemble(
+        "5d%: ", _fmt(df['5d_pct_SP500'], "%+.2f"), "%, MA20: ", _fmt(df['20d_slope_SP500'], "%+.2f"),
+        ", RSI: ", _fmt(df['RSI_14_SP500'], "%.1f"), ", VIX: ", _fmt(df['Close_VIX'], "%.2f"),
+        ", ATR: ", _fmt(df['Normalized_ATR'], "%.4f"), ", BBW: ", _fmt(df['BBW'], "%.2f"),
+        ", Score: [", _fmt(df['TrendScore_A'], "%d"), ", ", _fmt(df['MomentumScore_A'], "%d"),
+        ", ", _fmt(df['VolatilityScore_A'], "%d"), "], Dist: ", _fmt(df['EuclideanDist_A'], "%.2f"),
+    )
+    return pd.Series(text, index=df.index, dtype=str)
+
 # ========== Write to .txt Logs ==========
 def append_to_txt_logs_system_a(df: pd.DataFrame, data_dir: str, logger=None):
     if logger:
@@ -97,23 +202,8 @@ def append_to_txt_logs_system_a(df: pd.DataFrame, data_dir: str, logger=None):
 
     states_txt = os.path.join(data_dir, "MarketStates_System_A.txt")
     diag_txt = os.path.join(data_dir, "MarketStates_Diagnostics_System_A.txt")
-
-    existing_dates = set()
-    if os.path.exists(states_txt):
-        with open(states_txt, 'r') as f:
-            existing_dates = {line.split(",")[0].strip() for line in f.readlines()}
-
-    new_rows = 0
-    with open(states_txt, 'a') as f1, open(diag_txt, 'a') as f2:
-        for _, row in df.iterrows():
-            if pd.isna(row['Date']):
-                continue
-            date_str = pd.to_datetime(row['Date']).strftime('%Y-%m-%d')
-            if date_str in existing_dates:
-                continue
-            f1.write(f"{date_str}, {row['MarketState_A']}\n")
-            f2.write(f"{date_str}, {row['MarketState_A']}, {row['Diagnostics_A']}\n")
-            new_rows += 1
+    # Only rows after each log's last date are written; diagnostics are rendered for those rows only
+    new_rows = append_state_logs(df, states_txt, diag_txt, "MarketState_A", "Diagnostics_A", render_diagnostics_system_a)
 
     if logger:
         logger.info(f"Appended {new_rows} new rows to System A txt logs.")
@@ -126,7 +216,8 @@ if __name__ == "__main__":
         output_path = os.path.join(base_dir, "data", "MarketData_with_States_System_A.csv")
 
         df = pd.read_csv(input_path, parse_dates=["Date"])
-        df_classified = classify_market_states_system_a(df)
+        # Standalone runs keep the text in the CSV so downloads of it need no renderer
+        df_classified = classify_market_states_system_a(df, diagnostics=True)
         df_classified.to_csv(output_path, index=False)
 
         append_to_txt_logs_system_a(df_classified, os.path.join(base_dir, "data"), logger)
@@ -3,6 +3,11 @@ import pandas as pd
 import numpy as np
 import logging
 import sys
+try:
+    from scripts.txt_logs import append_state_logs
+except ModuleNotFoundError:
+    # Run directly from the scripts/ directory
+    from txt_logs import append_state_logs
 
 # ========== Logger Setup ==========
 def get_logger(name="market_state_system_b"):
@@ -23,6 +28,42 @@ def get_logger(name="market_state_system_b"):
 
 logger = get_logger()
 
+# Indicator columns read by the scoring logic (see scripts/indicator_registry.py)
+REQUIRED_INDICATORS = ["5d_pct_SP500", "RSI_14_SP500", "Close_VIX", "Normalized_ATR", "BBW"]
+
+# Bucket edges used by score_matrix_system_b, keyed by state and indicator.
+# ATR edges are in percent (Normalized_ATR * 100).
+SYSTEM_B_THRESHOLDS = {
+    "steady_climb_sp500": (1.5, 0.5),
+    "steady_climb_rsi": (50, 70),
+    "steady_climb_vix": 16,
+    "steady_climb_atr": 1.2,
+    "steady_climb_bbw": 4.0,
+    "trend_pullback_sp500": (-2.0, -0.2, 0.5),
+    "trend_pullback_rsi": (45, 60),
+    "trend_pullback_vix": 20,
+    "trend_pullback_atr": 1.6,
+    "trend_pullback_bbw": 5.5,
+    "orderly_decline_sp500": (-3.5, -0.5, -5.0),
+    "orderly_decline_rsi": (35, 50),
+    "orderly_decline_vix": (15, 22),
+    "orderly_decline_atr": 1.0,
+    "orderly_decline_bbw": 4.0,
+    "sharp_decline_sp500": (-3.5, -2.0),
+    "sharp_decline_rsi": 40,
+    "sharp_decline_vix": 22,
+    "sharp_decline_atr": 1.5,
+    "sharp_decline_bbw": 5.0,
+    "volatile_chop_sp500": (-1.0, 1.0),
+    "volatile_chop_rsi": (45, 55),
+    "volatile_chop_vix": (16, 24),
+    "volatile_chop_atr": (1.0, 1.7),
+    "volatile_chop_bbw": (4.0, 6.0),
+}
+
+# Points a challenger must lead the last sustained state by to replace it
+SYSTEM_B_GAP = 2
+
 # ========== Scoring Logic for System B ==========
 def score_row_system_b(row, last_sustained_state):
     sp500 = row.get("5d_pct_SP500", np.nan)
@@ -81,41 +122,234 @@ def score_row_system_b(row, last_sustained_state):
 
     return scores
 
+# ========== Vectorized Scoring ==========
+STATES_B = ["Steady Climb", "Trend Pullback", "Orderly Decline", "Sharp Decline", "Volatile Chop"]
+STEADY_CLIMB, TREND_PULLBACK = 0, 1
+
+def _column(df, name):
+    return df[name].to_numpy(dtype=np.float64) if name in df.columns else np.full(len(df), np.nan)
+
+def score_matrix_system_b(df, thresholds=None):
+    """
+    Scores for every row and state as an int (rows x 5) matrix in STATES_B order.
+
+    Same thresholds as score_row_system_b. The Trend Pullback column is always
+    filled; whether it may compete depends on the previous sustained state and
+    is applied by the sticky-state kernel. thresholds overrides entries of
+    SYSTEM_B_THRESHOLDS.
+    """
+    t = SYSTEM_B_THRESHOLDS if thresholds is None else {**SYSTEM_B_THRESHOLDS, **thresholds}
+    sp500 = _column(df, "5d_pct_SP500")
+    rsi = _column(df, "RSI_14_SP500")
+    vix = _column(df, "Close_VIX")
+    atr = _column(df, "Normalized_ATR") * 100  # convert to %
+    bbw = _column(df, "BBW")
+
+    def pts(mask, value=2):
+        return np.where(mask, value, 0)
+
+    sp_hi, sp_lo = t["steady_climb_sp500"]
+    rsi_lo, rsi_hi = t["steady_climb_rsi"]
+    steady_climb = (
+        np.select([sp500 > sp_hi, (sp_lo < sp500) & (sp500 <= sp_hi)], [4, 2], default=0)
+        + pts((rsi_lo <= rsi) & (rsi <= rsi_hi)) + pts(vix < t["steady_climb_vix"])
+        + pts(atr < t["steady_climb_atr"]) + pts(bbw < t["steady_climb_bbw"])
+    )
+    sp_lo, sp_mid, sp_hi = t["trend_pullback_sp500"]
+    rsi_lo, rsi_hi = t["trend_pullback_rsi"]
+    trend_pullback = (
+        np.select([(sp_lo <= sp500) & (sp500 <= sp_mid), (sp_mid < sp500) & (sp500 <= sp_hi)], [4, 2], default=0)
+        + pts((rsi_lo <= rsi) & (rsi <= rsi_hi)) + pts(vix <= t["trend_pullback_vix"])
+        + pts(atr < t["trend_pullback_atr"]) + pts(bbw < t["trend_pullback_bbw"])
+    )
+    sp_lo, sp_hi, sp_floor = t["orderly_decline_sp500"]
+    rsi_lo, rsi_hi = t["orderly_decline_rsi"]
+    vix_lo, vix_hi = t["orderly_decline_vix"]
+    orderly_decline = (
+        np.select([(sp_lo <= sp500) & (sp500 <= sp_hi), (sp_floor <= sp500) & (sp500 < sp_lo)], [4, 2], default=0)
+        + pts((rsi_lo <= rsi) & (rsi <= rsi_hi)) + pts((vix_lo <= vix) & (vix <= vix_hi))
+        + pts(atr > t["orderly_decline_atr"]) + pts(bbw >= t["orderly_decline_bbw"])
+    )
+    sp_lo, sp_hi = t["sharp_decline_sp500"]
+    sharp_decline = (
+        np.select([sp500 < sp_lo, (sp_lo <= sp500) & (sp500 <= sp_hi)], [4, 2], default=0)
+        + pts(rsi < t["sharp_decline_rsi"]) + pts(vix > t["sharp_decline_vix"])
+        + pts(atr > t["sharp_decline_atr"]) + pts(bbw > t["sharp_decline_bbw"])
+    )
+    (sp_lo, sp_hi), (rsi_lo, rsi_hi) = t["volatile_chop_sp500"], t["volatile_chop_rsi"]
+    (vix_lo, vix_hi), (atr_lo, atr_hi), (bbw_lo, bbw_hi) = t["volatile_chop_vix"], t["volatile_chop_atr"], t["volatile_chop_bbw"]
+    volatile_chop = (
+        pts((sp_lo <= sp500) & (sp500 <= sp_hi), 4)
+        + pts((rsi_lo <= rsi) & (rsi <= rsi_hi)) + pts((vix_lo <= vix) & (vix <= vix_hi))
+        + pts((atr_lo <= atr) & (atr <= atr_hi)) + pts((bbw_lo <= bbw) & (bbw <= bbw_hi))
+    )
+    return np.column_stack([steady_climb, trend_pullback, orderly_decline, sharp_decline, volatile_chop]).astype(np.int64)
+
+def _sticky_kernel(scores, best_with, best_without, initial_state, gap, states, best_scores, prev_states):
+    last = initial_state
+    for i in range(len(scores)):
+        # Trend Pullback only competes when the last sustained state was Steady Climb
+        pullback_allowed = last == STEADY_CLIMB
+        best = best_with[i] if pullback_allowed else best_without[i]
+        best_score = scores[i][best]
+
+        # Enforce the gap rule (2 points by default) against the last sustained state
+        if last >= 0:
+            current = scores[i][last] if (last != TREND_PULLBACK or pullback_allowed) else 0
+            if best_score - current < gap:
+                best, best_score = last, current
+
+        prev_states[i] = last
+        states[i] = best
+        best_scores[i] = best_score
+        last = best
+
+def _sticky_table(scores, best_with, best_without, gap):
+    """
+    _sticky_kernel's step for every row and every possible last state.
+
+    Yields (last state, next state, score) per last state from -1 (none) to the
+    last STATES_B code, each outcome an array over all rows.
+    """
+    n, n_states = scores.shape
+    rows = np.arange(n)
+    with_score, without_score = scores[rows, best_with], scores[rows, best_without]
+    yield -1, best_without, without_score
+    for last in range(n_states):
+        # Trend Pullback only competes after Steady Climb, so it cannot defend itself
+        best, best_score = (best_with, with_score) if last == STEADY_CLIMB else (best_without, without_score)
+        current = 0 if last == TREND_PULLBACK else scores[:, last]
+        stay = best_score - current < gap
+        yield last, np.where(stay, last, best), np.where(stay, current, best_score)
+
+def _sticky_blocks(scores, best_with, best_without, initial_state, gap):
+    """
+    NumPy equivalent of _sticky_kernel, used when numba is not installed.
+
+    Every row's outcome is tabulated for each possible last state, and the rows
+    are cut into ~sqrt(n) blocks. A first pass runs all blocks from every
+    entry state side by side, giving the state each block hands on; chaining
+    those fixes the real entry states, and a second pass replays all blocks
+    together from them. Both passes loop over the rows of one block only.
+    """
+    n, n_states = scores.shape
+    if n == 0:
+        return tuple(np.empty(0, dtype=np.int64) for _ in range(3))
+    width = n_states + 1
+    size = max(1, int(np.sqrt(n)))
+    n_blocks = -(-n // size)
+
+    # Block-major tables: step r reads row r of every block from one contiguous slice,
+    # entry [r, block, last + 1]. Padding rows only follow the last block, whose exit is never used.
+    next_state = np.zeros((size, n_blocks, width), dtype=np.int8)
+    next_score = np.zeros((size, n_blocks, width), dtype=np.int64)
+    padded = np.zeros(n_blocks * size, dtype=np.int64)
+    for last, state, score in _sticky_table(scores, best_with, best_without, gap):
+        for table, values in ((next_state, state), (next_score, score)):
+            padded[:n] = values
+            table[:, :, last + 1] = padded.reshape(n_blocks, size).T
+    next_state, next_score = next_state.reshape(size, -1), next_score.reshape(size, -1)
+    offsets = np.arange(n_blocks) * width + 1
+
+    exit_states = np.broadcast_to(np.arange(-1, n_states, dtype=np.int8), (n_blocks, width))
+    for r in range(size):
+        exit_states = next_state[r][offsets[:, None] + exit_states]
+
+    entry = np.empty(n_blocks, dtype=np.int64)
+    last = initial_state
+    for block, exits in enumerate(exit_states.tolist()):
+        entry[block] = last
+        last = exits[last + 1]
+
+    states, best_scores, prev_states = (np.empty((size, n_blocks), dtype=np.int64) for _ in range(3))
+    last = entry
+    for r in range(size):
+        prev_states[r] = last
+        idx = offsets + last
+        best_scores[r] = next_score[r][idx]
+        last = states[r] = next_state[r][idx]
+    return tuple(a.T.ravel()[:n] for a in (states, best_scores, prev_states))
+
+# Optional JIT for very long (e.g. intraday) histories; _sticky_blocks is used otherwise
+try:
+    import numba
+    _sticky_kernel_jit = numba.njit(cache=True)(_sticky_kernel)
+except ImportError:
+    _sticky_kernel_jit = None
+
+def _sticky_states(scores, initial_state=-1, gap=SYSTEM_B_GAP):
+    """
+    Apply the Trend Pullback gate and the gap rule row by row.
+
+    States are integer codes into STATES_B, -1 meaning no prior state. Returns
+    (state, score, previous state) int arrays.
+    """
+    n = len(scores)
+    # First maximum in STATES_B order, as sorted(..., reverse=True) is stable
+    best_with = scores.argmax(axis=1)
+    without = scores.copy()
+    without[:, TREND_PULLBACK] = np.iinfo(np.int64).min
+    best_without = without.argmax(axis=1)
+
+    if _sticky_kernel_jit is not None:
+        states, best_scores, prev_states = (np.empty(n, dtype=np.int64) for _ in range(3))
+        _sticky_kernel_jit(np.ascontiguousarray(scores, dtype=np.int64), best_with, best_without,
+                           initial_state, gap, states, best_scores, prev_states)
+        return states, best_scores, prev_states
+
+    return _sticky_blocks(np.asarray(scores, dtype=np.int64), best_with, best_without, initial_state, gap)
+
 # ========== Classification Function ==========
-def classify_market_states_system_b(df: pd.DataFrame) -> pd.DataFrame:
+def classify_market_states_system_b(df: pd.DataFrame, compact: bool = False, diagnostics: bool = False,
+                                    initial_state: str = None, thresholds: dict = None,
+                                    gap: int = SYSTEM_B_GAP) -> pd.DataFrame:
+    """
+    initial_state is the sustained state before df's first row (a STATES_B name),
+    so a run can continue from a checkpoint instead of replaying the history.
+    """
     logger.info("Scoring and classifying market states (System B)...")
     df = df.copy()
-    results = []
-    last_sustained_state = None
-
-    for _, row in df.iterrows():
-        scores = score_row_system_b(row, last_sustained_state)
-        if not scores:
-            results.append((None, 0, "No state qualified"))
-            continue
-
-        sorted_scores = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-        best_state, best_score = sorted_scores[0]
-        prev_state = last_sustained_state or "None"
-
-        # Enforce 2-point gap rule
-        if last_sustained_state:
-            current_score = scores.get(last_sustained_state, 0)
-            if best_score - current_score < 2:
-                best_state = last_sustained_state
-                best_score = current_score
-
-        last_sustained_state = best_state
-
-        diag = (
-            f"SP500: {row['5d_pct_SP500']:+.2f}%, RSI: {row['RSI_14_SP500']:.1f}, VIX: {row['Close_VIX']:.2f}, "
-            f"ATR: {row['Normalized_ATR']:.4f}, BBW: {row['BBW']:.2f}, PrevState: {prev_state}, Score: {best_score}"
-        )
-        results.append((best_state, best_score, diag))
-
-    df[['MarketState_B', 'Score_B', 'Diagnostics_B']] = pd.DataFrame(results, index=df.index)
+    initial_code = STATES_B.index(initial_state) if initial_state not in (None, "None") else -1
+    states, best_scores, prev_states = _sticky_states(score_matrix_system_b(df, thresholds), initial_code, gap)
+
+    names = np.array(STATES_B + ["None"], dtype=object)
+    df['MarketState_B'] = pd.Series(names[states], index=df.index, dtype=str)
+    df['Score_B'] = best_scores
+    df['PrevState_B'] = pd.Series(names[prev_states], index=df.index, dtype=str)  # -1 maps to "None"
+    if diagnostics:
+        df['Diagnostics_B'] = render_diagnostics_system_b(df)
+    if compact:
+        # Imported lazily so the module still runs as a standalone script
+        from scripts.compact_frames import compact_frame
+        df = compact_frame(df, label="classified states")
     return df
 
+# ========== Diagnostics ==========
+def _fmt(values, spec):
+    return np.strings.mod(spec, np.asarray(values, dtype=np.float64))
+
+def _assemble(*parts):
+    """Element-wise concatenation of literal strings and string arrays."""
+    out = parts[0]
+    for part in parts[1:]:
+        out = np.strings.add(out, part)
+    return out
+
+def render_diagnostics_system_b(df: pd.DataFrame) -> pd.Series:
+    """
+    Build the Diagnostics_B text from the stored indicator, PrevState_B and
+    Score_B columns. Classification leaves it out; writers render just the rows they emit.
+    """
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=str)
+    text = _assemble(
+        "SP500: ", _fmt(df['5d_pct_SP500'], "%+.2f"), "%, RSI: ", _fmt(df['RSI_14_SP500'], "%.1f"),
+        ", VIX: ", _fmt(df['Close_VIX'], "%.2f"), ", ATR: ", _fmt(df['Normalized_ATR'], "%.4f"),
+        ", BBW: ", _fmt(df['BBW'], "%.2f"), ", PrevState: ", df['PrevState_B'].to_numpy(dtype=str),
+        ", Score: ", _fmt(df['Score_B'], "%d"),
+    )
+    return pd.Series(text, index=df.index, dtype=str)
+
 # ========== Write to .txt Logs ==========
 def append_to_txt_logs_system_b(df: pd.DataFrame, data_dir: str, logger=None):
     if logger:
@@ -123,23 +357,8 @@ def append_to_txt_logs_system_b(df: pd.DataFrame, data_dir: str, logger=None):
 
     states_txt = os.path.join(data_dir, "MarketStates_System_B.txt")
     diag_txt = os.path.join(data_dir, "MarketStates_Diagnostics_System_B.txt")
-
-    existing_dates = set()
-    if os.path.exists(states_txt):
-        with open(states_txt, 'r') as f:
-            existing_dates = {line.split(",")[0].strip() for line in f.readlines()}
-
-    new_rows = 0
-    with open(states_txt, 'a') as f1, open(diag_txt, 'a') as f2:
-        for _, row in df.iterrows():
-            if pd.isna(row['Date']):
-                continue
-            date_str = pd.to_datetime(row['Date']).strftime('%Y-%m-%d')
-            if date_str in existing_dates:
-                continue
-            f1.write(f"{date_str}, {row['MarketState_B']}\n")
-            f2.write(f"{date_str}, {row['MarketState_B']}, {row['Diagnostics_B']}\n")
-            new_rows += 1
+    # Only rows after each log's last date are written; diagnostics are rendered for those rows only
+    new_rows = append_state_logs(df, states_txt, diag_txt, "MarketState_B", "Diagnostics_B", render_diagnostics_system_b)
 
     if logger:
         logger.info(f"Appended {new_rows} new rows to System B txt logs.")
@@ -1,7 +1,14 @@
 import pandas as pd
 import numpy as np
 import os
-from logger import get_logger
+from collections import namedtuple
+try:
+    from scripts.logger import get_logger
+    from scripts.txt_logs import append_state_logs
+except ModuleNotFoundError:
+    # Run directly as scripts/scoring_system_june.py
+    from logger import get_logger
+    from txt_logs import append_state_logs
 
 # Initialize logger
 logger = get_logger("market_state_classifier")
@@ -13,194 +20,300 @@ output_csv = os.path.join(base_dir, 'data', 'MarketData_with_States.csv')
 states_txt = os.path.join(base_dir, 'data', 'MarketStates.txt')
 diag_txt = os.path.join(base_dir, 'data', 'MarketStates_Diagnostics.txt')
 
-# Load data
-try:
-    df = pd.read_csv(data_path)
-    logger.info(f"Loaded data from {data_path} with {len(df)} rows.")
-except Exception as e:
-    logger.error(f"Failed to load {data_path}: {e}")
-    raise
-
-# Market state classification logic
-def classify_market_state(row):
-    scores = {
-        "Bullish Momentum": 0,
-        "Steady Climb": 0,
-        "Trend Pullback": 0,
-        "Bearish Collapse": 0,
-        "Stagnant Drift": 0,
-        "Volatile Chop": 0,
-        "Volatile Drop": 0,
-    }
-
-    # Indicator mapping
-    sp500 = row.get("5d_pct_SP500", np.nan)
-    yield_ = row.get("5d_pct_Yield", np.nan)
-    dxy = row.get("5d_pct_DXY", np.nan)
-    oil = row.get("5d_pct_Oil", np.nan)
-    copper = row.get("5d_pct_Copper", np.nan)
-    gold = row.get("5d_pct_Gold", np.nan)
-    vix = row.get("Close_VIX", np.nan)
-    ma = row.get("20d_slope_SP500", np.nan)
-    rsi = row.get("RSI_14_SP500", np.nan)
-    atr = row.get("5d_Slope_SP500", np.nan)
-    bbw = row.get("BBW", np.nan)
-    ad = row.get("Close_NYAD", np.nan)
-    nymo = row.get("Close_NYMO", np.nan)
-    rsp_spy = row.get("RSP/SPY_Ratio", 1)
+# ========== Rule Table ==========
+# One row per condition: the state earns `weight` when lower <= indicator <= upper.
+# None leaves a side unbounded; `bounds` marks open ends, e.g. "(]" for lower < x.
+# Rows sharing a `group` form one condition, combined with `combine` ("all"/"any").
+# Indicators prefixed "abs:" use the absolute value of the column.
+Rule = namedtuple("Rule", "state indicator lower upper weight bounds group combine",
+                  defaults=("[]", None, "all"))
 
+RULES = [
     # Bullish Momentum
-    if sp500 > 3: scores["Bullish Momentum"] += 4
-    if -0.2 <= yield_ <= -0.1: scores["Bullish Momentum"] += 2
-    if dxy <= -1: scores["Bullish Momentum"] += 2
-    if oil >= 3 and copper >= 3: scores["Bullish Momentum"] += 2
-    if gold < 20: scores["Bullish Momentum"] += 2
-    if 15 <= vix <= 25: scores["Bullish Momentum"] += 2
-    if rsp_spy > 2: scores["Bullish Momentum"] += 2
-    if 0.003 <= ma <= 0.01: scores["Bullish Momentum"] += 2
-    if 60 <= rsi <= 75: scores["Bullish Momentum"] += 2
-    if 1 <= atr <= 2: scores["Bullish Momentum"] += 2
-    if 2 <= bbw <= 3: scores["Bullish Momentum"] += 2
-    if ad >= 2: scores["Bullish Momentum"] += 2
-    if 60 <= nymo <= 100: scores["Bullish Momentum"] += 2
+    Rule("Bullish Momentum", "5d_pct_SP500", 3, None, 4, "(]"),
+    Rule("Bullish Momentum", "5d_pct_Yield", -0.2, -0.1, 2),
+    Rule("Bullish Momentum", "5d_pct_DXY", None, -1, 2),
+    Rule("Bullish Momentum", "5d_pct_Oil", 3, None, 2, group="oil_copper"),
+    Rule("Bullish Momentum", "5d_pct_Copper", 3, None, 2, group="oil_copper"),
+    Rule("Bullish Momentum", "5d_pct_Gold", None, 20, 2, "[)"),
+    Rule("Bullish Momentum", "Close_VIX", 15, 25, 2),
+    Rule("Bullish Momentum", "RSP/SPY_Ratio", 2, None, 2, "(]"),
+    Rule("Bullish Momentum", "20d_slope_SP500", 0.003, 0.01, 2),
+    Rule("Bullish Momentum", "RSI_14_SP500", 60, 75, 2),
+    Rule("Bullish Momentum", "5d_Slope_SP500", 1, 2, 2),
+    Rule("Bullish Momentum", "BBW", 2, 3, 2),
+    Rule("Bullish Momentum", "Close_NYAD", 2, None, 2),
+    Rule("Bullish Momentum", "Close_NYMO", 60, 100, 2),
 
     # Steady Climb
-    if 0.5 <= sp500 <= 3: scores["Steady Climb"] += 4
-    if -0.2 <= yield_ <= 0.2: scores["Steady Climb"] += 2
-    if -1 <= dxy <= 1: scores["Steady Climb"] += 2
-    if -3 <= oil <= 3 and 1 <= copper <= 3: scores["Steady Climb"] += 2
-    if -30 <= gold <= 30: scores["Steady Climb"] += 2
-    if 12 <= vix <= 20: scores["Steady Climb"] += 2
-    if 1.5 <= rsp_spy <= 2.5: scores["Steady Climb"] += 2
-    if 0.003 <= ma <= 0.01: scores["Steady Climb"] += 2
-    if 50 <= rsi <= 65: scores["Steady Climb"] += 2
-    if 0.5 <= atr <= 1.5: scores["Steady Climb"] += 2
-    if 1.5 <= bbw <= 2.5: scores["Steady Climb"] += 2
-    if 1.5 <= ad <= 2.0: scores["Steady Climb"] += 2
-    if 30 <= nymo <= 60: scores["Steady Climb"] += 2
+    Rule("Steady Climb", "5d_pct_SP500", 0.5, 3, 4),
+    Rule("Steady Climb", "5d_pct_Yield", -0.2, 0.2, 2),
+    Rule("Steady Climb", "5d_pct_DXY", -1, 1, 2),
+    Rule("Steady Climb", "5d_pct_Oil", -3, 3, 2, group="oil_copper"),
+    Rule("Steady Climb", "5d_pct_Copper", 1, 3, 2, group="oil_copper"),
+    Rule("Steady Climb", "5d_pct_Gold", -30, 30, 2),
+    Rule("Steady Climb", "Close_VIX", 12, 20, 2),
+    Rule("Steady Climb", "RSP/SPY_Ratio", 1.5, 2.5, 2),
+    Rule("Steady Climb", "20d_slope_SP500", 0.003, 0.01, 2),
+    Rule("Steady Climb", "RSI_14_SP500", 50, 65, 2),
+    Rule("Steady Climb", "5d_Slope_SP500", 0.5, 1.5, 2),
+    Rule("Steady Climb", "BBW", 1.5, 2.5, 2),
+    Rule("Steady Climb", "Close_NYAD", 1.5, 2.0, 2),
+    Rule("Steady Climb", "Close_NYMO", 30, 60, 2),
 
     # Trend Pullback
-    if -5 <= sp500 <= -1: scores["Trend Pullback"] += 4
-    if 4 <= yield_ <= 4.5: scores["Trend Pullback"] += 2
-    if -1 <= dxy <= 1: scores["Trend Pullback"] += 2
-    if -5 <= oil <= -2 and -5 <= copper <= -2: scores["Trend Pullback"] += 2
-    if 20 <= gold <= 40: scores["Trend Pullback"] += 2
-    if 18 <= vix <= 25: scores["Trend Pullback"] += 2
-    if rsp_spy < 2: scores["Trend Pullback"] += 2
-    if ma < 0.002: scores["Trend Pullback"] += 2
-    if 40 <= rsi <= 60: scores["Trend Pullback"] += 2
-    if 1.5 <= atr <= 2.5: scores["Trend Pullback"] += 2
-    if 2 <= bbw <= 3: scores["Trend Pullback"] += 2
-    if 1 <= ad <= 1.5: scores["Trend Pullback"] += 2
-    if -40 <= nymo <= 20: scores["Trend Pullback"] += 2
+    Rule("Trend Pullback", "5d_pct_SP500", -5, -1, 4),
+    Rule("Trend Pullback", "5d_pct_Yield", 4, 4.5, 2),
+    Rule("Trend Pullback", "5d_pct_DXY", -1, 1, 2),
+    Rule("Trend Pullback", "5d_pct_Oil", -5, -2, 2, group="oil_copper"),
+    Rule("Trend Pullback", "5d_pct_Copper", -5, -2, 2, group="oil_copper"),
+    Rule("Trend Pullback", "5d_pct_Gold", 20, 40, 2),
+    Rule("Trend Pullback", "Close_VIX", 18, 25, 2),
+    Rule("Trend Pullback", "RSP/SPY_Ratio", None, 2, 2, "[)"),
+    Rule("Trend Pullback", "20d_slope_SP500", None, 0.002, 2, "[)"),
+    Rule("Trend Pullback", "RSI_14_SP500", 40, 60, 2),
+    Rule("Trend Pullback", "5d_Slope_SP500", 1.5, 2.5, 2),
+    Rule("Trend Pullback", "BBW", 2, 3, 2),
+    Rule("Trend Pullback", "Close_NYAD", 1, 1.5, 2),
+    Rule("Trend Pullback", "Close_NYMO", -40, 20, 2),
 
     # Bearish Collapse
-    if sp500 <= -3: scores["Bearish Collapse"] += 4
-    if abs(yield_) >= 0.3 or row['Close_Yield'] >= 4.5 or row['Close_Yield'] <= 3: scores["Bearish Collapse"] += 2
-    if dxy >= 1: scores["Bearish Collapse"] += 2
-    if oil <= -5 and copper <= -5: scores["Bearish Collapse"] += 2
-    if gold >= 50: scores["Bearish Collapse"] += 2
-    if vix > 30: scores["Bearish Collapse"] += 2
-    if rsp_spy < 0.5: scores["Bearish Collapse"] += 2
-    if ma < -0.01: scores["Bearish Collapse"] += 2
-    if rsi < 40: scores["Bearish Collapse"] += 2
-    if atr > 3: scores["Bearish Collapse"] += 2
-    if bbw > 4: scores["Bearish Collapse"] += 2
-    if ad < 0.8: scores["Bearish Collapse"] += 2
-    if nymo < -100: scores["Bearish Collapse"] += 2
+    Rule("Bearish Collapse", "5d_pct_SP500", None, -3, 4),
+    Rule("Bearish Collapse", "abs:5d_pct_Yield", 0.3, None, 2, group="yield_stress", combine="any"),
+    Rule("Bearish Collapse", "Close_Yield", 4.5, None, 2, group="yield_stress", combine="any"),
+    Rule("Bearish Collapse", "Close_Yield", None, 3, 2, group="yield_stress", combine="any"),
+    Rule("Bearish Collapse", "5d_pct_DXY", 1, None, 2),
+    Rule("Bearish Collapse", "5d_pct_Oil", None, -5, 2, group="oil_copper"),
+    Rule("Bearish Collapse", "5d_pct_Copper", None, -5, 2, group="oil_copper"),
+    Rule("Bearish Collapse", "5d_pct_Gold", 50, None, 2),
+    Rule("Bearish Collapse", "Close_VIX", 30, None, 2, "(]"),
+    Rule("Bearish Collapse", "RSP/SPY_Ratio", None, 0.5, 2, "[)"),
+    Rule("Bearish Collapse", "20d_slope_SP500", None, -0.01, 2, "[)"),
+    Rule("Bearish Collapse", "RSI_14_SP500", None, 40, 2, "[)"),
+    Rule("Bearish Collapse", "5d_Slope_SP500", 3, None, 2, "(]"),
+    Rule("Bearish Collapse", "BBW", 4, None, 2, "(]"),
+    Rule("Bearish Collapse", "Close_NYAD", None, 0.8, 2, "[)"),
+    Rule("Bearish Collapse", "Close_NYMO", None, -100, 2, "[)"),
 
     # Stagnant Drift
-    if -1 <= sp500 <= 1: scores["Stagnant Drift"] += 4
-    if abs(yield_) < 0.1: scores["Stagnant Drift"] += 2
-    if abs(dxy) <= 0.5: scores["Stagnant Drift"] += 2
-    if abs(oil) <= 2 and abs(copper) <= 2: scores["Stagnant Drift"] += 2
-    if abs(gold) <= 20: scores["Stagnant Drift"] += 2
-    if 15 <= vix <= 20: scores["Stagnant Drift"] += 2
-    if rsp_spy < 1.5: scores["Stagnant Drift"] += 2
-    if abs(ma) < 0.005: scores["Stagnant Drift"] += 2
-    if 45 <= rsi <= 55: scores["Stagnant Drift"] += 2
-    if atr < 1: scores["Stagnant Drift"] += 2
-    if bbw < 1.5: scores["Stagnant Drift"] += 2
-    if 1.0 <= ad <= 1.2: scores["Stagnant Drift"] += 2
-    if -10 <= nymo <= 10: scores["Stagnant Drift"] += 2
+    Rule("Stagnant Drift", "5d_pct_SP500", -1, 1, 4),
+    Rule("Stagnant Drift", "abs:5d_pct_Yield", None, 0.1, 2, "[)"),
+    Rule("Stagnant Drift", "abs:5d_pct_DXY", None, 0.5, 2),
+    Rule("Stagnant Drift", "abs:5d_pct_Oil", None, 2, 2, group="oil_copper"),
+    Rule("Stagnant Drift", "abs:5d_pct_Copper", None, 2, 2, group="oil_copper"),
+    Rule("Stagnant Drift", "abs:5d_pct_Gold", None, 20, 2),
+    Rule("Stagnant Drift", "Close_VIX", 15, 20, 2),
+    Rule("Stagnant Drift", "RSP/SPY_Ratio", None, 1.5, 2, "[)"),
+    Rule("Stagnant Drift", "abs:20d_slope_SP500", None, 0.005, 2, "[)"),
+    Rule("Stagnant Drift", "RSI_14_SP500", 45, 55, 2),
+    Rule("Stagnant Drift", "5d_Slope_SP500", None, 1, 2, "[)"),
+    Rule("Stagnant Drift", "BBW", None, 1.5, 2, "[)"),
+    Rule("Stagnant Drift", "Close_NYAD", 1.0, 1.2, 2),
+    Rule("Stagnant Drift", "Close_NYMO", -10, 10, 2),
 
     # Volatile Chop
-    if -2 <= sp500 <= 2: scores["Volatile Chop"] += 4
-    if 0.1 <= abs(yield_) <= 0.3: scores["Volatile Chop"] += 2
-    if -1 <= dxy <= 1: scores["Volatile Chop"] += 2
-    if -5 <= oil <= 5 and -5 <= copper <= 5: scores["Volatile Chop"] += 2
-    if -50 <= gold <= 50: scores["Volatile Chop"] += 2
-    if 20 <= vix <= 30: scores["Volatile Chop"] += 2
-    if rsp_spy < 2: scores["Volatile Chop"] += 2
-    if abs(ma) <= 0.005: scores["Volatile Chop"] += 2
-    if 40 <= rsi <= 60: scores["Volatile Chop"] += 2
-    if 2 <= atr <= 3: scores["Volatile Chop"] += 2
-    if 3 <= bbw <= 4: scores["Volatile Chop"] += 2
-    if 0.8 <= ad <= 1.3: scores["Volatile Chop"] += 2
-    if -20 <= nymo <= 20: scores["Volatile Chop"] += 2
+    Rule("Volatile Chop", "5d_pct_SP500", -2, 2, 4),
+    Rule("Volatile Chop", "abs:5d_pct_Yield", 0.1, 0.3, 2),
+    Rule("Volatile Chop", "5d_pct_DXY", -1, 1, 2),
+    Rule("Volatile Chop", "5d_pct_Oil", -5, 5, 2, group="oil_copper"),
+    Rule("Volatile Chop", "5d_pct_Copper", -5, 5, 2, group="oil_copper"),
+    Rule("Volatile Chop", "5d_pct_Gold", -50, 50, 2),
+    Rule("Volatile Chop", "Close_VIX", 20, 30, 2),
+    Rule("Volatile Chop", "RSP/SPY_Ratio", None, 2, 2, "[)"),
+    Rule("Volatile Chop", "abs:20d_slope_SP500", None, 0.005, 2),
+    Rule("Volatile Chop", "RSI_14_SP500", 40, 60, 2),
+    Rule("Volatile Chop", "5d_Slope_SP500", 2, 3, 2),
+    Rule("Volatile Chop", "BBW", 3, 4, 2),
+    Rule("Volatile Chop", "Close_NYAD", 0.8, 1.3, 2),
+    Rule("Volatile Chop", "Close_NYMO", -20, 20, 2),
 
     # Volatile Drop
-    if -4 <= sp500 <= -2: scores["Volatile Drop"] += 4
-    if -0.2 <= yield_ <= 0.2: scores["Volatile Drop"] += 2
-    if -1 <= dxy <= 1: scores["Volatile Drop"] += 2
-    if -5 <= oil <= -2 and -5 <= copper <= -2: scores["Volatile Drop"] += 2
-    if 10 <= gold <= 40: scores["Volatile Drop"] += 2
-    if 20 <= vix <= 28: scores["Volatile Drop"] += 2
-    if rsp_spy < 0.5: scores["Volatile Drop"] += 2
-    if -0.01 <= ma <= -0.005: scores["Volatile Drop"] += 2
-    if 35 <= rsi <= 50: scores["Volatile Drop"] += 2
-    if 2 <= atr <= 3: scores["Volatile Drop"] += 2
-    if 3 <= bbw <= 4: scores["Volatile Drop"] += 2
-    if ad < 1.0: scores["Volatile Drop"] += 2
-    if -100 <= nymo <= -40: scores["Volatile Drop"] += 2
-
-    # Evaluate scores
-    top_state = max(scores, key=scores.get)
-    score = scores[top_state]
-
-    # Diagnostics string
-    sp500_str = f"{sp500:+.2f}%" if pd.notna(sp500) else "N/A"
-    rsp_str = f"{(rsp_spy - 1):+.2f}%" if pd.notna(rsp_spy) else "N/A"
-    vix_str = f"{vix:.2f}" if pd.notna(vix) else "N/A"
-    rsi_str = f"{rsi:.0f}" if pd.notna(rsi) else "N/A"
-    ad_str = f"{ad:.0f}" if pd.notna(ad) else "N/A"
-    nymo_str = f"{nymo:.0f}" if pd.notna(nymo) else "N/A"
-
-    diag = (
-        f"S&P 5-day {sp500_str}, RSP Divergence {rsp_str}, VIX {vix_str}, "
-        f"RSI ~{rsi_str}, Net Advances {ad_str}, McClellan {nymo_str}, Score: {score}/39"
+    Rule("Volatile Drop", "5d_pct_SP500", -4, -2, 4),
+    Rule("Volatile Drop", "5d_pct_Yield", -0.2, 0.2, 2),
+    Rule("Volatile Drop", "5d_pct_DXY", -1, 1, 2),
+    Rule("Volatile Drop", "5d_pct_Oil", -5, -2, 2, group="oil_copper"),
+    Rule("Volatile Drop", "5d_pct_Copper", -5, -2, 2, group="oil_copper"),
+    Rule("Volatile Drop", "5d_pct_Gold", 10, 40, 2),
+    Rule("Volatile Drop", "Close_VIX", 20, 28, 2),
+    Rule("Volatile Drop", "RSP/SPY_Ratio", None, 0.5, 2, "[)"),
+    Rule("Volatile Drop", "20d_slope_SP500", -0.01, -0.005, 2),
+    Rule("Volatile Drop", "RSI_14_SP500", 35, 50, 2),
+    Rule("Volatile Drop", "5d_Slope_SP500", 2, 3, 2),
+    Rule("Volatile Drop", "BBW", 3, 4, 2),
+    Rule("Volatile Drop", "Close_NYAD", None, 1.0, 2, "[)"),
+    Rule("Volatile Drop", "Close_NYMO", -100, -40, 2),
+]
+
+# Denominator printed in the diagnostics string, unchanged from the original output
+DIAGNOSTIC_SCORE_SCALE = 39
+
+# Values used when an indicator column is absent from the frame (otherwise NaN)
+INDICATOR_DEFAULTS = {"RSP/SPY_Ratio": 1.0}
+
+def load_rules(path):
+    """Read a rule table from CSV with the Rule field names as the header."""
+    table = pd.read_csv(path).astype(object)
+    table = table.where(pd.notna(table), None)
+    return [Rule(**{k: v for k, v in row.items() if v is not None or k in ("lower", "upper")})
+            for row in table.to_dict("records")]
+
+# ========== Rule Compiler ==========
+CompiledRules = namedtuple("CompiledRules", "states columns lower upper lower_open upper_open membership group_any weights")
+
+def compile_rules(rules):
+    """
+    Turn a rule table into arrays: one bound pair per rule row, a (rows x groups)
+    membership matrix, and a (groups x states) weight matrix. States keep their
+    first-appearance order, which decides ties.
+    """
+    states = list(dict.fromkeys(rule.state for rule in rules))
+    group_keys = list(dict.fromkeys(
+        (rule.state, rule.group if rule.group is not None else f"#{i}") for i, rule in enumerate(rules)
+    ))
+
+    membership = np.zeros((len(rules), len(group_keys)), dtype=np.int64)
+    group_any = np.zeros(len(group_keys), dtype=bool)
+    weights = np.zeros((len(group_keys), len(states)), dtype=np.int64)
+    for i, rule in enumerate(rules):
+        g = group_keys.index((rule.state, rule.group if rule.group is not None else f"#{i}"))
+        membership[i, g] = 1
+        group_any[g] = rule.combine == "any"
+        weights[g, states.index(rule.state)] = rule.weight
+
+    return CompiledRules(
+        states=states,
+        columns=[rule.indicator for rule in rules],
+        lower=np.array([-np.inf if rule.lower is None else rule.lower for rule in rules], dtype=np.float64),
+        upper=np.array([np.inf if rule.upper is None else rule.upper for rule in rules], dtype=np.float64),
+        lower_open=np.array([rule.bounds[0] == "(" or rule.lower is None for rule in rules]),
+        upper_open=np.array([rule.bounds[1] == ")" or rule.upper is None for rule in rules]),
+        membership=membership,
+        group_any=group_any,
+        weights=weights,
     )
-    return pd.Series([top_state, score, diag])
 
-try:
-    logger.info("Applying market state classification...")
-    df[['MarketState', 'Score', 'Diagnostics']] = df.apply(classify_market_state, axis=1)
-
-    if os.path.exists(output_csv):
-        df_old = pd.read_csv(output_csv, parse_dates=["Date"])
-        df = pd.concat([df_old, df], ignore_index=True).drop_duplicates(subset=["Date"]).sort_values("Date")
-    df.to_csv(output_csv, index=False)
-    logger.info(f"Appended to classified dataset at {output_csv}")
-
-    existing_dates = set()
-    if os.path.exists(states_txt):
-        with open(states_txt, 'r') as f:
-            existing_dates = {line.split(",")[0].strip() for line in f.readlines()}
-
-    with open(states_txt, 'a') as f1, open(diag_txt, 'a') as f2:
-        new_count = 0
-        for _, row in df.iterrows():
-            date_str = pd.to_datetime(row['Date']).strftime('%Y-%m-%d')
-            if date_str in existing_dates:
-                continue
-            f1.write(f"{date_str}, {row['MarketState']}\n")
-            f2.write(f"{date_str}, {row['MarketState']}, {row['Diagnostics']}\n")
-            new_count += 1
-        logger.info(f"Appended {new_count} new rows to {states_txt} and {diag_txt}")
-
-    logger.info("✅ Market state classification completed successfully.")
-
-except Exception as e:
-    logger.error(f"Error during classification or file writing: {e}")
-    raise SystemExit(1)
+def rule_inputs(rules):
+    """Frame columns a rule table reads, without the abs: prefix."""
+    return list(dict.fromkeys(rule.indicator.removeprefix("abs:") for rule in rules))
+
+def _indicator_matrix(df, columns):
+    cache = {}
+    for name in dict.fromkeys(columns):
+        base = name.removeprefix("abs:")
+        if base in df.columns:
+            values = df[base].to_numpy(dtype=np.float64)
+        else:
+            values = np.full(len(df), INDICATOR_DEFAULTS.get(base, np.nan))
+        cache[name] = np.abs(values) if name.startswith("abs:") else values
+    return np.column_stack([cache[name] for name in columns]) if columns else np.empty((len(df), 0))
+
+def score_rules(df, compiled):
+    """Evaluate every rule row for every frame row, returning (rows x states) int scores."""
+    values = _indicator_matrix(df, compiled.columns)
+    with np.errstate(invalid="ignore"):
+        # Unbounded sides pass for any non-NaN value, including +/-inf
+        above = np.where(compiled.lower_open, values > compiled.lower, values >= compiled.lower)
+        below = np.where(compiled.upper_open, values < compiled.upper, values <= compiled.upper)
+        above |= np.isinf(compiled.lower) & ~np.isnan(values)
+        below |= np.isinf(compiled.upper) & ~np.isnan(values)
+    hits = (above & below).astype(np.int64) @ compiled.membership
+
+    group_size = compiled.membership.sum(axis=0)
+    satisfied = np.where(compiled.group_any, hits > 0, hits == group_size)
+    return satisfied.astype(np.int64) @ compiled.weights
+
+COMPILED_RULES = compile_rules(RULES)
+
+# Frame columns the June rules read (see scripts/indicator_registry.py)
+REQUIRED_INDICATORS = [c for c in rule_inputs(RULES) if c not in INDICATOR_DEFAULTS]
+
+# ========== Classification ==========
+def classify_market_states_june(df, compiled=None, diagnostics=False):
+    """Score all states at once and keep the first maximum, as max() over the scores dict did."""
+    compiled = COMPILED_RULES if compiled is None else compiled
+    df = df.copy()
+    scores = score_rules(df, compiled)
+    best = scores.argmax(axis=1) if len(df) else np.zeros(0, dtype=np.int64)
+    top_scores = scores[np.arange(len(df)), best]
+
+    df['MarketState'] = pd.Series(np.array(compiled.states, dtype=object)[best], index=df.index, dtype=str)
+    df['Score'] = top_scores
+    if diagnostics:
+        df['Diagnostics'] = render_diagnostics_june(df)
+    return df
+
+# ========== Diagnostics ==========
+def _fmt(values, spec, suffix=""):
+    text = np.strings.add(np.strings.mod(spec, values), suffix)
+    return np.where(np.isnan(values), "N/A", text)
+
+def _assemble(*parts):
+    """Element-wise concatenation of literal strings and string arrays."""
+    out = parts[0]
+    for part in parts[1:]:
+        out = np.strings.add(out, part)
+    return out
+
+def render_diagnostics_june(df):
+    """
+    Build the Diagnostics text from the stored indicator and Score columns.
+    Classification leaves it out; writers render just the rows they emit.
+    """
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=str)
+
+    def col(name):
+        return _indicator_matrix(df, [name])[:, 0]
+
+    text = _assemble(
+        "S&P 5-day ", _fmt(col("5d_pct_SP500"), "%+.2f", "%"),
+        ", RSP Divergence ", _fmt(col("RSP/SPY_Ratio") - 1, "%+.2f", "%"),
+        ", VIX ", _fmt(col("Close_VIX"), "%.2f"), ", RSI ~", _fmt(col("RSI_14_SP500"), "%.0f"),
+        ", Net Advances ", _fmt(col("Close_NYAD"), "%.0f"), ", McClellan ", _fmt(col("Close_NYMO"), "%.0f"),
+        ", Score: ", np.strings.mod("%d", df['Score'].to_numpy()), f"/{DIAGNOSTIC_SCORE_SCALE}",
+    )
+    return pd.Series(text, index=df.index, dtype=str)
+
+# ========== Write to .txt Logs ==========
+def append_to_txt_logs_june(df, data_dir, logger=None):
+    if logger:
+        logger.info("Appending June system logs to txt files...")
+
+    states_txt = os.path.join(data_dir, "MarketStates.txt")
+    diag_txt = os.path.join(data_dir, "MarketStates_Diagnostics.txt")
+
+    # Only rows after each log's last date are written; diagnostics are rendered for those rows only
+    new_rows = append_state_logs(df, states_txt, diag_txt, "MarketState", "Diagnostics", render_diagnostics_june)
+
+    if logger:
+        logger.info(f"Appended {new_rows} new rows to {states_txt} and {diag_txt}")
+
+def main():
+    try:
+        df = pd.read_csv(data_path)
+        logger.info(f"Loaded data from {data_path} with {len(df)} rows.")
+    except Exception as e:
+        logger.error(f"Failed to load {data_path}: {e}")
+        raise
+
+    try:
+        logger.info("Applying market state classification...")
+        df = classify_market_states_june(df)
+
+        if os.path.exists(output_csv):
+            # Diagnostics are no longer stored; older files may still carry the column
+            df_old = pd.read_csv(output_csv, parse_dates=["Date"]).drop(columns=["Diagnostics"], errors="ignore")
+            df = pd.concat([df_old, df], ignore_index=True).drop_duplicates(subset=["Date"]).sort_values("Date")
+        df.to_csv(output_csv, index=False)
+        logger.info(f"Appended to classified dataset at {output_csv}")
+
+        append_to_txt_logs_june(df, os.path.dirname(states_txt), logger)
+
+        logger.info("✅ Market state classification completed successfully.")
+
+    except Exception as e:
+        logger.error(f"Error during classification or file writing: {e}")
+        raise SystemExit(1)
 
+if __name__ == "__main__":
+    main()
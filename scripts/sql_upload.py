@@ -34,7 +34,24 @@ def get_sql_connection():
     database = os.getenv("SQL_DATABASE_MS")
     return pymssql.connect(server=server, user=user, password=password, database=database)
 
-def upload_market_states(txt_file_path, list_id, list_name, list_description):
+def _load_states(txt_file_path, system=None):
+    """System states from the SQLite state store, or the txt log if the store has none yet."""
+    if system is not None:
+        try:
+            from scripts.state_store import query_states
+        except ModuleNotFoundError:
+            # Run directly from the scripts/ directory
+            from state_store import query_states
+        df = query_states(system)
+        if len(df):
+            return df[["Date", "MarketState"]]
+        logger.info(f"No {system} states in the state store yet. Reading {txt_file_path}.")
+    df = pd.read_csv(txt_file_path, names=["Date", "MarketState"])
+    df["Date"] = pd.to_datetime(df["Date"].str.strip(), errors="coerce")
+    df["MarketState"] = df["MarketState"].astype(str).str.strip()
+    return df
+
+def upload_market_states(txt_file_path, list_id, list_name, list_description, system=None):
     try:
         conn = get_sql_connection()
         cursor = conn.cursor()
@@ -57,9 +74,7 @@ def upload_market_states(txt_file_path, list_id, list_name, list_description):
         for row in cursor.fetchall():
             market_state_mapping[row[1].strip()] = row[0]
 
-        df_split = pd.read_csv(txt_file_path, names=["Date", "MarketState"])
-        df_split["Date"] = pd.to_datetime(df_split["Date"].str.strip(), errors="coerce")
-        df_split["MarketState"] = df_split["MarketState"].astype(str).str.strip()
+        df_split = _load_states(txt_file_path, system)
 
         cursor.execute("SELECT Date FROM dbo.MarketStateDirection WHERE MarketStateId = %s", (list_id,))
         existing_dates = {row[0].date() for row in cursor.fetchall()}
@@ -97,7 +112,8 @@ def upload_market_states_system_a():
         txt_file_path="data/MarketStates_System_A.txt",
         list_id=1,
         list_name="Market States 2005-Present Original Scoring",
-        list_description="Market States List 7-9 Original Scoring"
+        list_description="Market States List 7-9 Original Scoring",
+        system="A",
     )
 
 def upload_market_states_system_b():
@@ -105,5 +121,6 @@ def upload_market_states_system_b():
         txt_file_path="data/MarketStates_System_B.txt",
         list_id=2,
         list_name="Market States 2005-Present Original Scoring",
-        list_description="Market States List 7-9 Original Scoring"
+        list_description="Market States List 7-9 Original Scoring",
+        system="B",
     )
@@ -0,0 +1,171 @@
+import json
+import os
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+from scripts.logger import get_logger
+
+logger = get_logger("state_store")
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+db_path = os.getenv("STATE_DB_PATH", os.path.join(base_dir, "data", "market_states.db"))
+
+# Rows per executemany call inside one write transaction
+BATCH_SIZE = 5000
+
+_local = threading.local()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS states (
+    system TEXT NOT NULL,
+    date   TEXT NOT NULL,
+    state  TEXT NOT NULL,
+    score  REAL,
+    PRIMARY KEY (system, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS states_by_date ON states (date);
+CREATE TABLE IF NOT EXISTS frame_rows (
+    frame TEXT NOT NULL,
+    date  TEXT NOT NULL,
+    data  TEXT NOT NULL,
+    PRIMARY KEY (frame, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# ========== Connection ==========
+def connect(path=None):
+    """
+    Per-thread connection in WAL mode, so API readers never block on a
+    classification run that is writing.
+    """
+    path = path or db_path
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        connections[path] = conn
+    return conn
+
+def _date_strings(dates):
+    return pd.to_datetime(dates).dt.strftime("%Y-%m-%d")
+
+def _range_clause(start, end):
+    clause, params = "", []
+    if start is not None:
+        clause += " AND date >= ?"
+        params.append(pd.Timestamp(start).strftime("%Y-%m-%d"))
+    if end is not None:
+        clause += " AND date <= ?"
+        params.append(pd.Timestamp(end).strftime("%Y-%m-%d"))
+    return clause, params
+
+def _executemany(conn, sql, rows):
+    for i in range(0, len(rows), BATCH_SIZE):
+        conn.executemany(sql, rows[i:i + BATCH_SIZE])
+
+# ========== States ==========
+def write_states(system, df, state_column, score_column=None, replace_from=None, full=False, path=None):
+    """
+    Upsert one system's classified rows in a single transaction. full=True
+    replaces the system's whole history; replace_from drops its rows from
+    that date on first, as a re-run does.
+    """
+    rows = df[df["Date"].notna()]
+    dates = _date_strings(rows["Date"])
+    scores = rows[score_column].astype(float) if score_column and score_column in rows.columns else None
+    records = list(zip(
+        [system] * len(rows), dates, rows[state_column].astype(str),
+        [None] * len(rows) if scores is None else [None if np.isnan(s) else s for s in scores],
+    ))
+
+    conn = connect(path)
+    with conn:
+        if full:
+            conn.execute("DELETE FROM states WHERE system = ?", (system,))
+        elif replace_from is not None:
+            conn.execute("DELETE FROM states WHERE system = ? AND date >= ?",
+                         (system, pd.Timestamp(replace_from).strftime("%Y-%m-%d")))
+        _executemany(conn, "INSERT OR REPLACE INTO states (system, date, state, score) VALUES (?, ?, ?, ?)", records)
+        conn.execute("INSERT INTO meta (key, value) VALUES ('states_generation', 1) "
+                      "ON CONFLICT (key) DO UPDATE SET value = value + 1")
+    logger.info(f"Stored {len(records)} {system} state row(s) in {path or db_path}")
+    return len(records)
+
+def query_states(system=None, start=None, end=None, path=None):
+    """States as a DataFrame (System, Date, MarketState, Score), filtered by system and inclusive date range."""
+    clause, params = _range_clause(start, end)
+    if system is not None:
+        clause += " AND system = ?"
+        params.append(system)
+    cursor = connect(path).execute(
+        f"SELECT system, date, state, score FROM states WHERE 1 = 1{clause} ORDER BY system, date", params)
+    df = pd.DataFrame(cursor.fetchall(), columns=["System", "Date", "MarketState", "Score"])
+    df["Date"] = pd.to_datetime(df["Date"])
+    return df
+
+def state_systems(path=None):
+    return [row[0] for row in connect(path).execute("SELECT DISTINCT system FROM states ORDER BY system")]
+
+# ========== Generations ==========
+# Counters in the meta table that in-memory copies compare to decide when to reload
+def _meta_value(key, path=None):
+    row = connect(path).execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else 0
+
+def states_generation(path=None):
+    """Bumped by every write_states commit."""
+    return _meta_value("states_generation", path)
+
+def data_generation(path=None):
+    """Bumped by the pipeline when a data retrieval or classification run finishes."""
+    return _meta_value("data_generation", path)
+
+def bump_data_generation(path=None):
+    conn = connect(path)
+    with conn:
+        conn.execute("INSERT INTO meta (key, value) VALUES ('data_generation', 1) "
+                     "ON CONFLICT (key) DO UPDATE SET value = value + 1")
+    return data_generation(path)
+
+# ========== Market Data and Indicators ==========
+def write_frame_rows(frame, df, full=False, path=None):
+    """
+    Upsert rows of a wide frame (market data, indicators) keyed by date. Each
+    row is stored as a JSON object of its non-Date columns, NaN as null.
+    """
+    rows = df[df["Date"].notna()]
+    values = rows.drop(columns=["Date"])
+    values = values.astype(object).where(values.notna(), None)
+    payloads = [json.dumps(dict(zip(values.columns, row)), default=lambda v: v.item())
+                for row in values.itertuples(index=False, name=None)]
+    records = list(zip([frame] * len(rows), _date_strings(rows["Date"]), payloads))
+
+    conn = connect(path)
+    with conn:
+        if full:
+            conn.execute("DELETE FROM frame_rows WHERE frame = ?", (frame,))
+        _executemany(conn, "INSERT OR REPLACE INTO frame_rows (frame, date, data) VALUES (?, ?, ?)", records)
+    logger.info(f"Stored {len(records)} {frame} row(s) in {path or db_path}")
+    return len(records)
+
+def query_frame_rows(frame, start=None, end=None, columns=None, path=None):
+    """Rows of a stored frame within an inclusive date range, optionally limited to some columns."""
+    clause, params = _range_clause(start, end)
+    cursor = connect(path).execute(
+        f"SELECT date, data FROM frame_rows WHERE frame = ?{clause} ORDER BY date", [frame, *params])
+    rows = cursor.fetchall()
+    records = [json.loads(data) for _, data in rows]
+    df = pd.DataFrame.from_records(records, columns=columns)
+    df.insert(0, "Date", pd.to_datetime([date for date, _ in rows]))
+    return df
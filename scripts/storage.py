@@ -0,0 +1,612 @@
+import io
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+import pandas as pd
+from scripts.logger import get_logger
+
+logger = get_logger("storage")
+
+# "csv" keeps the historical flat files; "parquet" stores each frame as a
+# year-partitioned dataset under data/parquet/ and keeps the CSV as an export
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "csv").lower()
+
+# Stored rows, counted from the end, that corrections may touch in place.
+# Anything older needs a full rewrite through write_frame.
+CORRECTION_WINDOW = int(os.getenv("CORRECTION_WINDOW", 260))
+
+_TAIL_BLOCK = 1 << 16
+
+class _FrameLock:
+    """
+    Shared/exclusive lock over the stored frames. Readers share it; a writer
+    holds it alone and may re-enter it, or read, while holding it.
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._owner = None
+        self._depth = 0
+
+    @contextmanager
+    def shared(self):
+        me = threading.get_ident()
+        with self._cond:
+            nested = self._owner == me
+            while not nested and self._owner is not None:
+                self._cond.wait()
+            if not nested:
+                self._readers += 1
+        try:
+            yield
+        finally:
+            if not nested:
+                with self._cond:
+                    self._readers -= 1
+                    self._cond.notify_all()
+
+    @contextmanager
+    def exclusive(self):
+        me = threading.get_ident()
+        with self._cond:
+            while self._owner not in (None, me) or (self._owner is None and self._readers):
+                self._cond.wait()
+            self._owner = me
+            self._depth += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._depth -= 1
+                if not self._depth:
+                    self._owner = None
+                    self._cond.notify_all()
+
+# Writers hold it exclusively while they change a frame in place; readers share it
+_frame_lock = _FrameLock()
+
+# ========== CSV Backend ==========
+class CsvBackend:
+    """
+    Plain CSV files. Appends and tail corrections touch only the end of the
+    file, in place: the bytes being replaced and the old size are first saved
+    to <file>.undo, which is removed once the new bytes are synced. Full
+    rewrites go through a temp file and a rename. Writers hold _frame_lock
+    exclusively and readers share it, so no reader sees a half-written tail.
+    An undo record left by a crash is rolled back, under the exclusive lock,
+    the first time the process touches the file.
+    """
+    name = "csv"
+
+    def __init__(self):
+        self._recovered = set()
+
+    def exists(self, csv_path):
+        return os.path.exists(csv_path)
+
+    def columns(self, csv_path):
+        return list(pd.read_csv(csv_path, nrows=0).columns)
+
+    def read(self, csv_path, columns=None, start=None, end=None):
+        self._recover(csv_path)
+        usecols = None if columns is None else (lambda col: col == "Date" or col in columns)
+        with _frame_lock.shared():
+            df = pd.read_csv(csv_path, parse_dates=["Date"], usecols=usecols, float_precision="round_trip")
+        return _date_slice(df, start, end)
+
+    def write(self, df, csv_path):
+        with _frame_lock.exclusive():
+            self._recover(csv_path)
+            tmp_path = csv_path + ".tmp"
+            df.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, csv_path)
+
+    # ---------- Tail access ----------
+    def _tail(self, csv_path, n_rows):
+        """(header bytes, byte offset of the last n_rows lines, those lines' bytes)."""
+        with open(csv_path, "rb") as f:
+            header = f.readline()
+            header_end = f.tell()
+            end = f.seek(0, os.SEEK_END)
+            data, pos = b"", end
+            while pos > header_end:
+                step = min(_TAIL_BLOCK, pos - header_end)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+                cut = _nth_line_start(data, n_rows)
+                if cut is not None:
+                    return header, pos + cut, data[cut:]
+            return header, header_end, data
+
+    def _parse(self, header, body):
+        return pd.read_csv(io.BytesIO(header + body), parse_dates=["Date"], float_precision="round_trip")
+
+    def read_tail(self, csv_path, n_rows):
+        self._recover(csv_path)
+        with _frame_lock.shared():
+            header, _, body = self._tail(csv_path, n_rows)
+        return self._parse(header, body)
+
+    def _rewrite_tail(self, csv_path, offset, new_bytes):
+        """Replace everything from offset on with new_bytes, in place. Caller holds the exclusive lock."""
+        undo = csv_path + ".undo"
+        with open(csv_path, "rb") as f:
+            f.seek(offset)
+            old_bytes = f.read()
+        tmp_path = undo + ".tmp"
+        with open(tmp_path, "wb") as u:
+            u.write(f"{offset}\n".encode())
+            u.write(old_bytes)
+            u.flush()
+            os.fsync(u.fileno())
+        os.replace(tmp_path, undo)
+
+        self._write_at(csv_path, offset, new_bytes)
+        os.remove(undo)
+
+    @staticmethod
+    def _write_at(csv_path, offset, data):
+        with open(csv_path, "r+b") as f:
+            f.truncate(offset)
+            f.seek(offset)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _recover(self, csv_path):
+        """Roll back what an interrupted writer left behind, once per file and process."""
+        if csv_path in self._recovered:
+            return
+        with _frame_lock.exclusive():
+            if csv_path in self._recovered:
+                return
+            self._recovered.add(csv_path)
+            for leftover in (csv_path + ".tmp", csv_path + ".undo.tmp"):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+            undo = csv_path + ".undo"
+            if os.path.exists(undo):
+                with open(undo, "rb") as u:
+                    offset = int(u.readline())
+                    old_bytes = u.read()
+                self._write_at(csv_path, offset, old_bytes)
+                os.remove(undo)
+                logger.warning(f"Rolled back an interrupted write to {csv_path}")
+
+    # ---------- Row updates ----------
+    def append(self, rows, csv_path):
+        """Append rows under the existing header (absent columns left empty), or rewrite if rows add columns."""
+        with _frame_lock.exclusive():
+            if not self.exists(csv_path):
+                self.write(rows, csv_path)
+                return
+            self._recover(csv_path)
+            header = self.columns(csv_path)
+            if set(rows.columns) - set(header):
+                self.write(pd.concat([self.read(csv_path), rows], ignore_index=True), csv_path)
+                return
+            _check_after(rows, self.last_date(csv_path), csv_path)
+            size = os.path.getsize(csv_path)
+            with open(csv_path, "rb") as f:
+                f.seek(max(size - 1, 0))
+                newline = b"" if f.read(1) in (b"\n", b"") else b"\n"
+            body = rows.reindex(columns=header).to_csv(index=False, header=False).encode()
+            self._rewrite_tail(csv_path, size, newline + body)
+
+    def correct(self, rows, csv_path, partial=False, window=CORRECTION_WINDOW):
+        """Merge rows into the last `window` stored rows, rewriting only from the first affected line."""
+        with _frame_lock.exclusive():
+            self._recover(csv_path)
+            header, offset, body = self._tail(csv_path, window)
+            tail = self._parse(header, body)
+            if set(rows.columns) - set(tail.columns):
+                return False
+            whole_file = offset == len(header)
+            first = rows["Date"].min()
+            if not whole_file and (not len(tail) or first < tail["Date"].iloc[0]):
+                return False
+
+            keep = int((tail["Date"] < first).sum())
+            offset += _line_offset(body, keep)
+            merged = _merge_rows(tail, rows, partial).iloc[keep:]
+            self._rewrite_tail(csv_path, offset, merged[list(tail.columns)].to_csv(index=False, header=False).encode())
+            return True
+
+    def upsert(self, df_new, csv_path, partial=False):
+        with _frame_lock.exclusive():
+            if not self.exists(csv_path):
+                self.write(df_new.sort_values("Date"), csv_path)
+                return
+            self.write(_merge_rows(self.read(csv_path), df_new, partial), csv_path)
+
+    def truncate(self, csv_path, from_date, window=CORRECTION_WINDOW):
+        """Drop rows from from_date on; cuts inside the last `window` rows only touch the tail."""
+        with _frame_lock.exclusive():
+            if not self.exists(csv_path):
+                return
+            from_date = pd.Timestamp(from_date)
+            self._recover(csv_path)
+            header, offset, body = self._tail(csv_path, window)
+            tail = self._parse(header, body)
+            if offset == len(header) or (len(tail) and from_date >= tail["Date"].iloc[0]):
+                keep = int((tail["Date"] < from_date).sum())
+                self._rewrite_tail(csv_path, offset + _line_offset(body, keep), b"")
+            else:
+                df = self.read(csv_path)
+                self.write(df[df["Date"] < from_date], csv_path)
+
+    def last_date(self, csv_path):
+        tail = self.read_tail(csv_path, 1)
+        return tail["Date"].iloc[-1] if len(tail) else None
+
+    def export_csv(self, csv_path):
+        return csv_path
+
+# ========== Parquet Backend ==========
+class ParquetBackend:
+    """
+    One directory per frame, data/parquet/<csv stem>/year=YYYY/part-0.parquet.
+    All partitions share one Arrow schema, so reads can project columns and
+    prune years before any row is decoded. Appends and upserts rewrite only
+    the years they touch. Like the CSV backend, mutations hold _frame_lock
+    exclusively and reads share it, so a read never mixes partitions from
+    before and after an upsert.
+    """
+    name = "parquet"
+
+    def __init__(self):
+        # Imported here so the CSV backend works without pyarrow installed
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+        self.pa, self.ds, self.pq = pa, ds, pq
+
+    @staticmethod
+    def dataset_dir(csv_path):
+        root, _ = os.path.splitext(os.path.basename(csv_path))
+        return os.path.join(os.path.dirname(csv_path), "parquet", root)
+
+    def exists(self, csv_path):
+        return os.path.isdir(self.dataset_dir(csv_path))
+
+    def _dataset(self, csv_path):
+        return self.ds.dataset(self.dataset_dir(csv_path), format="parquet", partitioning="hive")
+
+    def _schema(self, csv_path):
+        schema = self._dataset(csv_path).schema
+        return schema.remove(schema.get_field_index("year"))
+
+    def columns(self, csv_path):
+        with _frame_lock.shared():
+            return [name for name in self._dataset(csv_path).schema.names if name != "year"]
+
+    def read(self, csv_path, columns=None, start=None, end=None):
+        if not self.exists(csv_path):
+            # Outside the shared lock: the CSV backend may take it exclusively to recover the file
+            if os.path.exists(csv_path):
+                logger.info(f"No Parquet dataset for {csv_path} yet. Reading the CSV instead.")
+                return CsvBackend().read(csv_path, columns, start, end)
+            raise FileNotFoundError(self.dataset_dir(csv_path))
+
+        with _frame_lock.shared():
+            dataset = self._dataset(csv_path)
+            names = [name for name in dataset.schema.names if name != "year"]
+            if columns is not None:
+                names = [name for name in names if name == "Date" or name in columns]
+
+            field = self.ds.field
+            predicate = None
+            for bound, op in ((start, "ge"), (end, "le")):
+                if bound is None:
+                    continue
+                bound = pd.Timestamp(bound)
+                year_test = field("year") >= bound.year if op == "ge" else field("year") <= bound.year
+                date_test = field("Date") >= bound if op == "ge" else field("Date") <= bound
+                clause = year_test & date_test
+                predicate = clause if predicate is None else predicate & clause
+
+            table = dataset.to_table(columns=names, filter=predicate)
+            df = table.to_pandas()
+            return df.sort_values("Date", kind="stable").reset_index(drop=True)
+
+    def read_tail(self, csv_path, n_rows):
+        if not self.exists(csv_path):
+            return CsvBackend().read_tail(csv_path, n_rows)
+        with _frame_lock.shared():
+            years = sorted((int(d.split("=")[1]) for d in os.listdir(self.dataset_dir(csv_path))
+                            if d.startswith("year=")), reverse=True)
+            parts, rows = [], 0
+            for year in years:
+                part = self.read(csv_path, start=f"{year}-01-01", end=f"{year}-12-31 23:59:59")
+                parts.insert(0, part)
+                rows += len(part)
+                if rows >= n_rows:
+                    break
+            if not parts:
+                return self.read(csv_path)
+            return pd.concat(parts, ignore_index=True).tail(n_rows).reset_index(drop=True)
+
+    def last_date(self, csv_path):
+        tail = self.read_tail(csv_path, 1)
+        return tail["Date"].iloc[-1] if len(tail) else None
+
+    def _write_years(self, table, target_dir, years):
+        year_values = self.pa.compute.year(table["Date"])
+        for year in years:
+            part = table.filter(self.pa.compute.equal(year_values, year))
+            part_dir = os.path.join(target_dir, f"year={year}")
+            os.makedirs(part_dir, exist_ok=True)
+            path = os.path.join(part_dir, "part-0.parquet")
+            tmp_path = path + ".tmp"
+            self.pq.write_table(part, tmp_path)
+            os.replace(tmp_path, path)
+
+    def _table(self, df, schema=None):
+        df = df.copy()
+        df["Date"] = pd.to_datetime(df["Date"])
+        return self.pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+    def write(self, df, csv_path):
+        with _frame_lock.exclusive():
+            target = self.dataset_dir(csv_path)
+            tmp_dir, old_dir = target + ".tmp", target + ".old"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            table = self._table(df.sort_values("Date"))
+            years = sorted(set(pd.to_datetime(df["Date"]).dt.year.dropna().astype(int)))
+            # An empty frame still gets one (empty) partition so its schema survives
+            self._write_years(table, tmp_dir, years or [0])
+
+            # Swap the whole dataset so readers never see a half-written mix
+            shutil.rmtree(old_dir, ignore_errors=True)
+            if os.path.isdir(target):
+                os.replace(target, old_dir)
+            os.replace(tmp_dir, target)
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+    def append(self, rows, csv_path):
+        with _frame_lock.exclusive():
+            if self.exists(csv_path):
+                _check_after(rows, self.last_date(csv_path), csv_path)
+            self.upsert(rows, csv_path)
+
+    def correct(self, rows, csv_path, partial=False, window=CORRECTION_WINDOW):
+        with _frame_lock.exclusive():
+            tail = self.read_tail(csv_path, window)
+            if set(rows.columns) - set(tail.columns) or not len(tail):
+                return False
+            if rows["Date"].min() < tail["Date"].iloc[0] and len(tail) >= window:
+                return False
+            self.upsert(rows, csv_path, partial)
+            return True
+
+    def upsert(self, df_new, csv_path, partial=False):
+        with _frame_lock.exclusive():
+            if not self.exists(csv_path):
+                existing = CsvBackend().read(csv_path) if os.path.exists(csv_path) else None
+                self.write(df_new if existing is None else _merge_rows(existing, df_new, partial), csv_path)
+                return
+
+            schema = self._schema(csv_path)
+            if set(df_new.columns) - set(schema.names):
+                # New columns change the shared schema, so every partition is rewritten
+                self.write(_merge_rows(self.read(csv_path), df_new, partial), csv_path)
+                return
+
+            years = sorted(set(pd.to_datetime(df_new["Date"]).dt.year.dropna().astype(int)))
+            touched = [self.read(csv_path, start=f"{y}-01-01", end=f"{y}-12-31 23:59:59") for y in years]
+            merged = _merge_rows(pd.concat(touched, ignore_index=True), df_new, partial)
+            try:
+                table = self._table(merged[schema.names], schema)
+            except (self.pa.ArrowInvalid, self.pa.ArrowTypeError):
+                # Values no longer fit the stored types; rewrite with a fresh schema
+                self.write(_merge_rows(self.read(csv_path), df_new, partial), csv_path)
+                return
+            self._write_years(table, self.dataset_dir(csv_path), years)
+
+    def truncate(self, csv_path, from_date):
+        """Rewrite the partition holding from_date, then drop the later years."""
+        with _frame_lock.exclusive():
+            if not self.exists(csv_path):
+                return
+            from_date = pd.Timestamp(from_date)
+            target = self.dataset_dir(csv_path)
+            kept = self.read(csv_path, start=f"{from_date.year}-01-01", end=from_date - pd.Timedelta(microseconds=1))
+            self._write_years(self._table(kept, self._schema(csv_path)), target, [from_date.year])
+            for name in os.listdir(target):
+                if name.startswith("year=") and int(name.split("=")[1]) > from_date.year:
+                    shutil.rmtree(os.path.join(target, name))
+
+    def export_csv(self, csv_path):
+        """
+        Refresh the CSV copy from the partitions written after it. Rows before
+        the earliest changed year are kept; the rest are truncated and re-appended.
+        """
+        with _frame_lock.exclusive():
+            target = self.dataset_dir(csv_path)
+            if not os.path.isdir(target):
+                return csv_path
+            csv = CsvBackend()
+            exported = os.path.getmtime(csv_path) if os.path.exists(csv_path) else None
+            stale = [
+                int(name.split("=")[1]) for name in os.listdir(target)
+                if name.startswith("year=") and (exported is None or os.path.getmtime(
+                    os.path.join(target, name, "part-0.parquet")) > exported)
+            ]
+            if not stale:
+                return csv_path
+
+            if exported is None or csv.columns(csv_path) != self.columns(csv_path):
+                csv.write(self.read(csv_path), csv_path)
+            else:
+                since = pd.Timestamp(f"{min(stale)}-01-01")
+                rows = self.read(csv_path, start=since)
+                csv.truncate(csv_path, since, window=len(rows) + CORRECTION_WINDOW)
+                csv.append(rows, csv_path)
+            logger.info(f"Exported {target} to {csv_path} from {min(stale)}")
+            return csv_path
+
+# ========== Helpers ==========
+def _nth_line_start(data, n):
+    """Index where the n-th line from the end of data starts, or None if data holds fewer lines."""
+    idx = len(data) - 1 if data.endswith(b"\n") else len(data)
+    for _ in range(n):
+        idx = data.rfind(b"\n", 0, idx)
+        if idx < 0:
+            return None
+    return idx + 1
+
+def _line_offset(data, n):
+    """Byte index just past the first n lines of data."""
+    idx = 0
+    for _ in range(n):
+        idx = data.index(b"\n", idx) + 1
+    return idx
+
+def _date_slice(df, start=None, end=None):
+    if start is not None:
+        df = df[df["Date"] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df["Date"] <= pd.Timestamp(end)]
+    return df.reset_index(drop=True)
+
+def _check_after(rows, last_date, csv_path):
+    dates = pd.to_datetime(rows["Date"])
+    if not dates.is_monotonic_increasing or dates.duplicated().any():
+        raise ValueError(f"Rows appended to {csv_path} must have unique, ascending dates")
+    if last_date is not None and len(dates) and dates.iloc[0] <= last_date:
+        raise ValueError(
+            f"Rows appended to {csv_path} must be dated after {last_date:%Y-%m-%d}; "
+            f"got {dates.iloc[0]:%Y-%m-%d}. Use merge_corrections for earlier dates."
+        )
+
+def _merge_rows(existing, df_new, partial=False):
+    """
+    Existing rows plus df_new, later rows winning on duplicate dates, sorted by Date.
+    With partial=True df_new only overrides its own columns; the rest keep their stored values.
+    """
+    if partial:
+        keep_cols = [col for col in existing.columns if col not in df_new.columns]
+        stored = existing.drop_duplicates(subset=["Date"], keep="last").set_index("Date")[keep_cols]
+        filled = stored.reindex(pd.to_datetime(df_new["Date"])).reset_index(drop=True)
+        df_new = pd.concat([df_new.reset_index(drop=True), filled], axis=1)
+        df_new = df_new[list(existing.columns) + [col for col in df_new.columns if col not in existing.columns]]
+    merged = pd.concat([existing, df_new], ignore_index=True)
+    merged.drop_duplicates(subset=["Date"], keep="last", inplace=True)
+    merged.sort_values("Date", inplace=True)
+    return merged.reset_index(drop=True)
+
+# ========== Public API ==========
+_backends = {}
+
+def get_backend(name=None):
+    name = (name or STORAGE_BACKEND).lower()
+    if name not in _backends:
+        if name == "csv":
+            _backends[name] = CsvBackend()
+        elif name == "parquet":
+            _backends[name] = ParquetBackend()
+        else:
+            raise ValueError(f"Unknown storage backend: {name}")
+    return _backends[name]
+
+def read_frame(csv_path, columns=None, start=None, end=None):
+    """
+    Load a data/ frame by its CSV path. columns limits the read to those
+    columns plus Date; start/end bound Date inclusively.
+    """
+    return get_backend().read(csv_path, columns, start, end)
+
+def read_tail(csv_path, n_rows):
+    """The last n_rows stored rows, read without scanning the rest of the frame."""
+    return get_backend().read_tail(csv_path, n_rows)
+
+def last_stored_date(csv_path):
+    """Latest Date in the frame, or None when it is empty or missing."""
+    if not frame_exists(csv_path):
+        return None
+    return get_backend().last_date(csv_path)
+
+def write_frame(df, csv_path):
+    get_backend().write(df, csv_path)
+    logger.info(f"Wrote {len(df)} rows to {csv_path} ({get_backend().name})")
+
+def append_frame(rows, csv_path):
+    """
+    Add rows dated after everything already stored, writing only the new data.
+    Raises ValueError if a row is not strictly after the last stored date.
+    """
+    if len(rows):
+        get_backend().append(rows, csv_path)
+
+def merge_corrections(rows, csv_path, partial=False, window=CORRECTION_WINDOW):
+    """
+    Insert or replace rows within the last `window` stored rows, rewriting only
+    that tail. partial=True updates just the columns present in rows. Raises
+    ValueError when a row predates the window or adds columns.
+    """
+    if not len(rows):
+        return
+    if not get_backend().correct(rows, csv_path, partial, window):
+        raise ValueError(
+            f"Corrections to {csv_path} from {pd.Timestamp(rows['Date'].min()):%Y-%m-%d} fall outside "
+            f"the last {window} rows or add columns; rewrite the frame with write_frame instead"
+        )
+    logger.info(f"Merged {len(rows)} corrected row(s) into {csv_path}")
+
+def upsert_frame(df_new, csv_path, partial=False):
+    """
+    Insert or replace rows by Date, keeping the frame sorted. Rows after the
+    last stored date are appended and recent ones go through the bounded
+    correction path; only older edits or new columns rewrite the whole frame.
+    """
+    if not len(df_new):
+        return
+    backend = get_backend()
+    df_new = df_new.drop_duplicates(subset=["Date"], keep="last")
+    if not frame_exists(csv_path):
+        backend.upsert(df_new, csv_path, partial)
+        return
+
+    last = backend.last_date(csv_path)
+    dates = pd.to_datetime(df_new["Date"])
+    known_columns = set(df_new.columns) <= set(backend.columns(csv_path)) if backend.exists(csv_path) else False
+    if last is None or not known_columns:
+        backend.upsert(df_new, csv_path, partial)
+    elif (dates > last).all() and not partial:
+        backend.append(df_new.sort_values("Date"), csv_path)
+    elif not backend.correct(df_new, csv_path, partial):
+        logger.info(f"Rows for {csv_path} reach past the correction window. Rewriting the full frame.")
+        backend.upsert(df_new, csv_path, partial)
+    logger.info(f"Upserted {len(df_new)} rows into {csv_path} ({backend.name})")
+
+def truncate_frame(csv_path, from_date):
+    """Drop rows dated on or after from_date."""
+    get_backend().truncate(csv_path, from_date)
+
+def frame_signature(csv_path):
+    """
+    Cheap change marker for a stored frame: (backend, size in bytes, newest
+    mtime in ns). Equal signatures mean the frame was not rewritten in between.
+    """
+    backend = get_backend()
+    if backend.name == "parquet" and backend.exists(csv_path):
+        files = [os.path.join(root, f) for root, _, names in os.walk(backend.dataset_dir(csv_path)) for f in names]
+        stats = [os.stat(f) for f in files]
+        return ["parquet", sum(st.st_size for st in stats), max((st.st_mtime_ns for st in stats), default=0)]
+    if not os.path.exists(csv_path):
+        return None
+    st = os.stat(csv_path)
+    return ["csv", st.st_size, st.st_mtime_ns]
+
+def frame_exists(csv_path):
+    backend = get_backend()
+    return backend.exists(csv_path) or os.path.exists(csv_path)
+
+def frame_columns(csv_path):
+    return get_backend().columns(csv_path)
+
+def export_csv(csv_path):
+    """Make sure the CSV at csv_path reflects the stored frame, e.g. before a download."""
+    return get_backend().export_csv(csv_path)
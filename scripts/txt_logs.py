@@ -0,0 +1,99 @@
+import os
+import pandas as pd
+
+# Lines look like "2025-07-09, Steady Climb" (state log) or
+# "2025-07-09, Steady Climb, <diagnostics>" (diagnostics log), oldest first.
+# Only the end of a log is ever read, so appends cost the same at any length.
+
+DATE_FORMAT = "%Y-%m-%d"
+
+_TAIL_BLOCK = 1 << 14
+
+def _lines_from_end(f):
+    """Yield (offset, line bytes) for each complete line, newest first."""
+    end = f.seek(0, os.SEEK_END)
+    buffer, pos = b"", end
+    while pos > 0:
+        step = min(_TAIL_BLOCK, pos)
+        pos -= step
+        f.seek(pos)
+        buffer = f.read(step) + buffer
+        lines = buffer.split(b"\n")
+        # lines[0] may continue in the previous block unless we reached the start
+        buffer = lines[0]
+        offset = pos + len(buffer) + 1
+        for line in lines[1:]:
+            offset += len(line) + 1
+        for line in reversed(lines[1:]):
+            offset -= len(line) + 1
+            if line.strip():
+                yield offset, line
+    if buffer.strip():
+        yield 0, buffer
+
+def _line_date(line):
+    return pd.Timestamp(line.split(b",", 1)[0].strip().decode())
+
+def last_logged_date(path):
+    """Date of the last line in a txt log, or None if the log is missing or empty."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        for _, line in _lines_from_end(f):
+            return _line_date(line)
+    return None
+
+def _append_block(path, lines):
+    if not lines:
+        return
+    needs_newline = False
+    if os.path.exists(path) and os.path.getsize(path):
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b"\n"
+    with open(path, "a") as f:
+        f.write(("\n" if needs_newline else "") + "".join(lines))
+
+def _rows_after(df, last_date):
+    dates = pd.to_datetime(df["Date"])
+    mask = dates.notna() if last_date is None else dates > last_date
+    return df[mask.to_numpy()], dates[mask.to_numpy()]
+
+def append_state_logs(df, states_txt, diag_txt, state_column, diagnostics_column, render_diagnostics,
+                      date_format=DATE_FORMAT):
+    """
+    Append rows dated after each log's last line to the state and diagnostics
+    logs, one buffered write per file. Each log is checked on its own, so a
+    log left behind by an interrupted run catches up. Diagnostics come from
+    diagnostics_column when present, otherwise render_diagnostics(rows) is
+    called for the new rows only. Returns the number of rows added to the
+    state log.
+    """
+    new_states, dates = _rows_after(df, last_logged_date(states_txt))
+    date_strs = dates.dt.strftime(date_format)
+    _append_block(states_txt, (date_strs + ", " + new_states[state_column].astype(str) + "\n").tolist())
+
+    new_diag, dates = _rows_after(df, last_logged_date(diag_txt))
+    if len(new_diag):
+        if diagnostics_column in new_diag.columns:
+            diags = new_diag[diagnostics_column]
+        else:
+            diags = render_diagnostics(new_diag)
+        diags = pd.Series(diags, index=new_diag.index).astype(str)
+        date_strs = dates.dt.strftime(date_format)
+        _append_block(diag_txt, (date_strs + ", " + new_diag[state_column].astype(str) + ", " + diags + "\n").tolist())
+    return len(new_states)
+
+def truncate_log(path, from_date):
+    """Drop txt log lines dated on or after from_date, scanning back only over the removed lines."""
+    if not os.path.exists(path):
+        return
+    from_date = pd.Timestamp(from_date)
+    with open(path, "r+b") as f:
+        cut = None
+        for offset, line in _lines_from_end(f):
+            if _line_date(line) < from_date:
+                break
+            cut = offset
+        if cut is not None:
+            f.truncate(cut)
@@ -9,6 +9,7 @@ import sys
 from DataRetrieval_FMP import fetch_all_tickers, get_valid_trading_days, TICKER_MAP
 from MarketBreadth_SQL import gather_market_breadth_data, reformat_breadth_data, merge_with_market_data
 from calculate_indicators import calculate_all_indicators
+from incremental_indicators import update_indicators_incremental
 from classify_markets import classify_market_states
 from logger import get_logger
 from sql_upload import upload_market_states
@@ -94,22 +95,17 @@ def update_pipeline(start_date=None, end_date=None):
         new_dates = df_new_rows["Date"].dt.strftime("%Y-%m-%d").tolist()
         logger.info(f"Computing indicators for {len(new_dates)} new dates: {', '.join(new_dates)}")
 
-        tmp_input = os.path.join(data_dir, "temp_new_data.csv")
-        tmp_output = os.path.join(data_dir, "temp_new_indicators.csv")
-
-        df_new_rows.to_csv(tmp_input, index=False)
-        calculate_all_indicators(tmp_input, tmp_output)
-
-        df_new_indicators = pd.read_csv(tmp_output, parse_dates=["Date"])
-        final_df = pd.concat([df_indicators_existing, df_new_indicators], ignore_index=True)
-        final_df.drop_duplicates(subset=["Date"], keep="last", inplace=True)
-        final_df.sort_values("Date", inplace=True)
-        final_df.to_csv(indicator_path, index=False)
-        logger.info(f"Appended indicators for {len(new_dates)} date(s) to MarketData_with_Indicators.csv")
-
-        os.remove(tmp_input)
-        os.remove(tmp_output)
-        logger.info("Temporary files cleaned up")
+        if not df_indicators_existing.empty and df_new_rows["Date"].min() <= df_indicators_existing["Date"].max():
+            logger.info("New rows predate existing indicators. Running full recompute.")
+            calculate_all_indicators(market_path, indicator_path)
+            final_df = pd.read_csv(indicator_path, parse_dates=["Date"])
+        else:
+            df_new_indicators = update_indicators_incremental(df_new_rows, df_indicators_existing, indicator_path)
+            final_df = pd.concat([df_indicators_existing, df_new_indicators], ignore_index=True)
+            final_df.drop_duplicates(subset=["Date"], keep="last", inplace=True)
+            final_df.sort_values("Date", inplace=True)
+            final_df.to_csv(indicator_path, index=False)
+            logger.info(f"Appended indicators for {len(new_dates)} date(s) to MarketData_with_Indicators.csv")
 
     except Exception as e:
         logger.error(f"[Step 3 - Indicators] failed: {e}")
@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+from scripts import classification_checkpoint
+from scripts.classifier_runner import summarize_results
+
+
+@pytest.fixture
+def checkpoint(tmp_path, monkeypatch):
+    monkeypatch.setattr(classification_checkpoint, "checkpoint_path", str(tmp_path / "checkpoint.json"))
+    entry = {}
+    classification_checkpoint.update_system_checkpoint(
+        entry, "B", pd.to_datetime(["2025-07-01", "2025-07-02"]), ["Bullish", "Neutral"], full=True)
+    classification_checkpoint.save_checkpoint(entry)
+    return entry
+
+
+def timings(*systems):
+    return {"load_seconds": 0.1, "total_seconds": 0.2,
+            "systems": {name: {"mode": "append", "rows": 0} for name in systems}}
+
+
+def test_empty_append_reports_checkpoint(checkpoint):
+    results = {"B": pd.DataFrame({"Date": pd.to_datetime([]), "MarketState_B": []})}
+    summary = summarize_results(results, timings("B"))["systems"]["B"]
+    assert summary["last_date"] == "2025-07-02"
+    assert summary["last_state"] == "Neutral"
+    assert summary["rows"] == 0
+
+
+def test_new_rows_reported(checkpoint):
+    results = {"A": pd.DataFrame({"Date": pd.to_datetime(["2025-07-03"]), "MarketState_A": ["Bearish"]})}
+    summary = summarize_results(results, timings("A"))["systems"]["A"]
+    assert (summary["last_date"], summary["last_state"]) == ("2025-07-03", "Bearish")
+
+
+def test_no_checkpoint_reports_null(checkpoint):
+    results = {"June": pd.DataFrame({"Date": pd.to_datetime([]), "MarketState": []})}
+    summary = summarize_results(results, timings("June"))["systems"]["June"]
+    assert summary["last_date"] is None and summary["last_state"] is None
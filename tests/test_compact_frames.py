@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from scripts.compact_frames import FLOAT32_RTOL, compact_frame
+
+
+def test_short_decimals_keep_their_written_value():
+    prices = pd.Series([17.83, 21.5, 99.99, 12.07, np.nan])
+    compacted = compact_frame(pd.DataFrame({"Close_VIX": prices}))["Close_VIX"]
+    assert compacted.dtype == np.float32
+    np.testing.assert_array_equal(np.round(compacted.to_numpy(np.float64), 2), prices.to_numpy())
+
+
+def test_values_float32_cannot_write_back_stay_float64():
+    df = pd.DataFrame({
+        "Close_SP500": [1202.08, 1188.05, 1269.05005],
+        "Close_Oil": [136.38001, 134.01, 145.28999],
+        "Volume_SP500": [1.721e9, 1.7389e9, 11456230000.0],
+        "Huge": [1e39, 1.0, 2.0],
+    })
+    compacted = compact_frame(df)
+    assert (compacted.dtypes == np.float64).all()
+
+
+def test_computed_columns_downcast_within_rtol():
+    rng = np.random.default_rng(0)
+    values = rng.normal(0, 3, 1000)
+    compacted = compact_frame(pd.DataFrame({"20d_slope_SP500": values}))["20d_slope_SP500"]
+    assert compacted.dtype == np.float32
+    err = np.abs(compacted.to_numpy(np.float64) - values)
+    assert np.all(err <= FLOAT32_RTOL * np.abs(values))
+
+
+def test_zero_volumes_and_states():
+    df = pd.DataFrame({
+        "Volume_VIX": [0.0, 0.0, np.nan],
+        "MarketState_A": ["Steady Climb", "Volatile Chop", "Steady Climb"],
+    })
+    compacted = compact_frame(df)
+    assert isinstance(compacted["Volume_VIX"].dtype, pd.SparseDtype)
+    assert compacted["MarketState_A"].dtype == "category"
@@ -0,0 +1,151 @@
+import gzip
+import io
+import os
+
+import pandas as pd
+import pytest
+from flask import Flask, request
+
+from scripts import scoring_system_june
+from scripts.calculate_indicators import calculate_indicators_frame
+from scripts.classifier_runner import diagnostic_rows
+from scripts.download_cache import precompress_later, send_delta, send_download, zstandard
+from scripts.storage import CsvBackend
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+@pytest.fixture(scope="module")
+def classified():
+    df = pd.read_csv(os.path.join(DATA_DIR, "MarketStates_Data.csv"), parse_dates=["Date"])
+    df = calculate_indicators_frame(df.sort_values("Date").reset_index(drop=True)).iloc[-300:]
+    return scoring_system_june.classify_market_states_june(df.reset_index(drop=True))
+
+
+@pytest.fixture
+def states_csv(tmp_path, classified):
+    path = str(tmp_path / "MarketData_with_States.csv")
+    CsvBackend().write(classified, path)
+    return path
+
+
+def read_blocks(blocks):
+    return pd.read_csv(io.BytesIO(b"".join(blocks)), parse_dates=["Date"])
+
+
+# ========== Rendered Diagnostics ==========
+def test_diagnostics_rendered_for_selected_rows(states_csv, classified):
+    since, until = classified["Date"].iloc[-20], classified["Date"].iloc[-5]
+    out = read_blocks(diagnostic_rows(states_csv, since, until, ["MarketState", "Diagnostics"]))
+    expected = classified[(classified["Date"] >= since) & (classified["Date"] <= until)]
+    assert list(out.columns) == ["Date", "MarketState", "Diagnostics"]
+    assert out["Date"].tolist() == expected["Date"].tolist()
+    assert out["Diagnostics"].tolist() == scoring_system_june.render_diagnostics_june(expected).tolist()
+
+
+def test_stored_diagnostics_kept(states_csv, classified):
+    stored = classified.assign(Diagnostics="stored text")
+    stored.loc[stored.index[-3:], "Diagnostics"] = None
+    CsvBackend().write(stored, states_csv)
+    out = read_blocks(diagnostic_rows(states_csv, columns=["Diagnostics"]))
+    assert (out["Diagnostics"].iloc[:-3] == "stored text").all()
+    assert out["Diagnostics"].iloc[-3:].tolist() == \
+        scoring_system_june.render_diagnostics_june(classified.iloc[-3:]).tolist()
+
+
+def test_plain_columns_need_no_rendering(states_csv):
+    assert diagnostic_rows(states_csv, columns=["MarketState"]) is None
+    assert diagnostic_rows(states_csv) is None
+
+
+def test_unknown_column_with_diagnostics(states_csv):
+    with pytest.raises(ValueError, match="Unknown column"):
+        diagnostic_rows(states_csv, columns=["Diagnostics", "Nope"])
+
+
+# ========== Conditional and Encoded Downloads ==========
+@pytest.fixture
+def client(states_csv):
+    app = Flask(__name__)
+
+    @app.route("/file")
+    def download():
+        return send_download(states_csv)
+
+    @app.route("/delta")
+    def delta():
+        return send_delta(states_csv, request.args.get("since"), columns=["MarketState"])
+
+    return app.test_client()
+
+
+def test_etag_revalidates_with_304(client):
+    first = client.get("/file")
+    assert first.status_code == 200 and first.headers["ETag"]
+    again = client.get("/file", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    since = client.get("/file", headers={"If-Modified-Since": first.headers["Last-Modified"]})
+    assert since.status_code == 304
+
+
+def test_rewrite_changes_etag(client, states_csv, classified):
+    etag = client.get("/file").headers["ETag"]
+    CsvBackend().append(classified.iloc[-1:].assign(Date=classified["Date"].iloc[-1] + pd.Timedelta(days=1)),
+                        states_csv)
+    response = client.get("/file", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_range_request(client, states_csv):
+    with open(states_csv, "rb") as f:
+        raw = f.read()
+    response = client.get("/file", headers={"Range": "bytes=10-99"})
+    assert response.status_code == 206
+    assert response.data == raw[10:100]
+    assert response.headers["Content-Range"] == f"bytes 10-99/{len(raw)}"
+
+
+def test_gzip_compressed_on_demand(client, states_csv):
+    response = client.get("/file", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    with open(states_csv, "rb") as f:
+        assert gzip.decompress(response.data) == f.read()
+    # Only the negotiated coding is built
+    assert os.path.exists(states_csv + ".gz") and not os.path.exists(states_csv + ".zst")
+    identity = client.get("/file")
+    assert "Content-Encoding" not in identity.headers
+    assert identity.headers["ETag"] != response.headers["ETag"]
+
+
+@pytest.mark.skipif(zstandard is None, reason="zstandard not installed")
+def test_zstd_preferred(client, states_csv):
+    response = client.get("/file", headers={"Accept-Encoding": "gzip, zstd"})
+    assert response.headers["Content-Encoding"] == "zstd"
+    with open(states_csv, "rb") as f:
+        assert zstandard.ZstdDecompressor().decompressobj().decompress(response.data) == f.read()
+
+
+def test_stale_sibling_not_served(client, states_csv, classified):
+    client.get("/file", headers={"Accept-Encoding": "gzip"})
+    CsvBackend().write(classified.iloc[:50], states_csv)
+    response = client.get("/file", headers={"Accept-Encoding": "gzip"})
+    with open(states_csv, "rb") as f:
+        assert gzip.decompress(response.data) == f.read()
+
+
+def test_background_precompress(states_csv):
+    precompress_later(states_csv).result()
+    for suffix in (".gz",) + ((".zst",) if zstandard is not None else ()):
+        assert os.stat(states_csv + suffix).st_mtime_ns == os.stat(states_csv).st_mtime_ns
+
+
+def test_delta_etag_covers_query(client, classified):
+    since = classified["Date"].iloc[-10].strftime("%Y-%m-%d")
+    first = client.get(f"/delta?since={since}")
+    assert first.status_code == 200
+    assert len(first.data.decode().splitlines()) == 11
+    assert client.get(f"/delta?since={since}", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+    other = client.get("/delta?since=2000-01-01")
+    assert other.headers["ETag"] != first.headers["ETag"]
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.calculate_indicators import rolling_slope
+from scripts.indicator_sweep import sweep_indicators
+
+
+def polyfit_slopes(values, window):
+    """Reference implementation: the per-row np.polyfit loop rolling_slope replaced."""
+    out = np.full(len(values), np.nan)
+    x = np.arange(window)
+    for i in range(window, len(values)):
+        out[i] = np.polyfit(x, values[i - window:i], 1)[0]
+    return out
+
+
+def random_walk(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return 4000 + np.cumsum(rng.normal(0, 25, n))
+
+
+@pytest.mark.parametrize("window", [5, 20])
+def test_matches_polyfit(window):
+    closes = random_walk(300)
+    expected = polyfit_slopes(closes, window)
+    got = rolling_slope(closes, window)
+    assert np.isnan(got[:window]).all()
+    np.testing.assert_allclose(got, expected, rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize("window", [5, 20])
+def test_gaps_match_polyfit(window):
+    closes = random_walk(300, seed=1)
+    closes[[0, 7, 50, 51, 52, 199]] = np.nan
+    closes[120:150] = np.nan
+    expected = polyfit_slopes(closes, window)
+    got = rolling_slope(closes, window)
+    np.testing.assert_array_equal(np.isnan(got), np.isnan(expected))
+    np.testing.assert_allclose(got, expected, rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize("window", [5, 20])
+def test_columns_fitted_independently(window):
+    closes = np.column_stack([random_walk(120, seed=s) for s in range(3)])
+    closes[30:40, 1] = np.nan
+    got = rolling_slope(closes, window)
+    for j in range(closes.shape[1]):
+        np.testing.assert_allclose(got[:, j], polyfit_slopes(closes[:, j], window), rtol=1e-9, atol=1e-9)
+
+
+def test_short_series_is_all_nan():
+    assert np.isnan(rolling_slope(random_walk(5), 5)).all()
+    assert np.isnan(rolling_slope(random_walk(3), 20)).all()
+
+
+# ========== Window Sweep ==========
+def sweep_frame(closes):
+    dates = pd.date_range("2005-01-03", periods=len(closes), freq="B")
+    return pd.DataFrame({"Date": dates, **{f"Close_T{j}": closes[:, j] for j in range(closes.shape[1])}})
+
+
+def test_sweep_slope_matches_rolling_slope():
+    # Long, drifting histories are where global prefix sums lose the slope to cancellation
+    closes = np.column_stack([random_walk(6000, seed=s) * (1 + s) for s in range(3)])
+    closes[[10, 2500, 2501, 5990], 0] = np.nan
+    closes[3000:3100, 2] = np.nan
+    windows = [2, 3, 5, 20, 33, 60]
+    _, results = sweep_indicators(sweep_frame(closes), {"slope": windows})
+    for w, got in zip(windows, results["slope"][1]):
+        expected = rolling_slope(closes, w)
+        np.testing.assert_array_equal(np.isnan(got), np.isnan(expected))
+        np.testing.assert_allclose(got, expected, rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize("name", ["slope", "BBW"])
+def test_sweep_rejects_windows_below_two(name):
+    with pytest.raises(ValueError, match="at least 2"):
+        sweep_indicators(sweep_frame(random_walk(50)[:, None]), {name: [1, 5]})
+
+
+def test_sweep_rejects_unknown_indicator():
+    with pytest.raises(ValueError, match="Unknown sweep indicator"):
+        sweep_indicators(sweep_frame(random_walk(50)[:, None]), {"MACD": [5]})
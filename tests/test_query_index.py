@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+from scripts import state_store
+from scripts.query_index import StateIndex, indicator_frame
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(state_store, "db_path", str(tmp_path / "states.db"))
+    return state_store
+
+
+def test_empty_store_knows_registered_systems(store):
+    index = StateIndex(store.states_generation())
+    assert index.lookup("B") == []
+    assert index.lookup("june", start="2024-01-01") == []
+    assert index.lookup() == []
+
+
+def test_unknown_system_rejected(store):
+    with pytest.raises(ValueError, match="Unknown system: Z"):
+        StateIndex(store.states_generation()).lookup("Z")
+
+
+def test_lookup_slices_stored_rows(store):
+    dates = pd.date_range("2024-01-01", periods=5, freq="D")
+    df = pd.DataFrame({"Date": dates, "MarketState_A": ["Bull", "Bull", "Bear", "Bear", "Neutral"]})
+    store.write_states("A", df, "MarketState_A", full=True)
+    index = StateIndex(store.states_generation())
+    rows = index.lookup("a", start="2024-01-02", end="2024-01-04")
+    assert [row.split('"Date":"')[1][:10] for row in rows] == ["2024-01-02", "2024-01-03", "2024-01-04"]
+    assert index.lookup("B") == []
+
+
+def test_missing_indicator_frame(tmp_path):
+    with pytest.raises(FileNotFoundError, match="MarketData_with_Indicators.csv does not exist"):
+        indicator_frame(path=str(tmp_path / "MarketData_with_Indicators.csv"))
@@ -0,0 +1,143 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts import classify_markets, scoring_Euclidean, scoring_Original
+from scripts.calculate_indicators import calculate_indicators_frame
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+INDICATORS = ["5d_pct_SP500", "20d_slope_SP500", "RSI_14_SP500", "Close_VIX", "Normalized_ATR", "BBW"]
+
+# Every bucket edge of System A and System B, so rows land exactly on a threshold
+EDGES = {
+    "5d_pct_SP500": [-5.0, -3.5, -2.0, -1.0, -0.5, -0.2, 0.5, 1.0, 1.5, 2.0],
+    "20d_slope_SP500": [-0.5, -0.2, 0.2, 0.5],
+    "RSI_14_SP500": [35, 40, 45, 50, 55, 60, 65, 70],
+    "Close_VIX": [15, 16, 20, 22, 24, 25],
+    "Normalized_ATR": [0.01, 0.012, 0.015, 0.016, 0.017],
+    "BBW": [3.0, 4.0, 5.0, 5.5, 6.0],
+}
+
+
+@pytest.fixture(scope="module")
+def real_frame():
+    df = pd.read_csv(os.path.join(DATA_DIR, "MarketStates_Data.csv"), parse_dates=["Date"])
+    return calculate_indicators_frame(df.sort_values("Date").reset_index(drop=True))
+
+
+@pytest.fixture(scope="module")
+def edge_frame(real_frame):
+    """Real rows with indicators replaced by NaN or exact threshold values."""
+    rng = np.random.default_rng(0)
+    df = real_frame[["Date"] + INDICATORS].iloc[-600:].reset_index(drop=True)
+    for col, edges in EDGES.items():
+        df[col] = df[col].astype(np.float64)
+        df.loc[rng.random(len(df)) < 0.1, col] = np.nan
+        on_edge = rng.random(len(df)) < 0.3
+        df.loc[on_edge, col] = rng.choice(edges, on_edge.sum())
+    return df
+
+
+@pytest.fixture(params=["real", "edges"])
+def frame(request, real_frame, edge_frame):
+    return real_frame if request.param == "real" else edge_frame
+
+
+# ========== Row-wise Oracles ==========
+def nearest_state_rowwise(scores, profiles):
+    states, dists = [], []
+    for vector in scores:
+        distances = {state: np.linalg.norm(vector - np.array(profile)) for state, profile in profiles.items()}
+        best = min(distances, key=distances.get)
+        states.append(best)
+        dists.append(distances[best])
+    return states, dists
+
+
+def classify_system_b_rowwise(df):
+    """The iterrows() loop classify_market_states_system_b replaced."""
+    results = []
+    last_sustained_state = None
+    for _, row in df.iterrows():
+        scores = scoring_Original.score_row_system_b(row, last_sustained_state)
+        best_state, best_score = sorted(scores.items(), key=lambda x: x[1], reverse=True)[0]
+        prev_state = last_sustained_state or "None"
+        if last_sustained_state:
+            current_score = scores.get(last_sustained_state, 0)
+            if best_score - current_score < 2:
+                best_state, best_score = last_sustained_state, current_score
+        last_sustained_state = best_state
+        results.append((best_state, best_score, prev_state))
+    return pd.DataFrame(results, columns=["MarketState_B", "Score_B", "PrevState_B"], index=df.index)
+
+
+# ========== System A ==========
+def test_system_a_scores_match_rowwise(frame):
+    expected = frame.apply(scoring_Euclidean.compute_scores_system_a, axis=1).to_numpy()
+    got = scoring_Euclidean.compute_scores_system_a_vectorized(frame).to_numpy()
+    np.testing.assert_array_equal(got, expected)
+
+
+def test_system_a_states_match_rowwise(frame):
+    scores = frame.apply(scoring_Euclidean.compute_scores_system_a, axis=1).to_numpy()
+    states, dists = nearest_state_rowwise(scores, scoring_Euclidean.state_profiles)
+    got = scoring_Euclidean.classify_market_states_system_a(frame)
+    assert got["MarketState_A"].tolist() == states
+    np.testing.assert_array_equal(got["EuclideanDist_A"].to_numpy(), dists)
+
+
+def test_classify_markets_matches_rowwise(frame):
+    scores = frame.apply(classify_markets.compute_scores, axis=1).to_numpy()
+    np.testing.assert_array_equal(classify_markets.compute_scores_vectorized(frame).to_numpy(), scores)
+    states, dists = nearest_state_rowwise(scores, classify_markets.state_profiles)
+    got = classify_markets.classify_market_states(frame)
+    assert got["MarketState"].tolist() == states
+    np.testing.assert_array_equal(got["EuclideanDist"].to_numpy(), dists)
+
+
+def test_missing_columns_score_as_nan():
+    df = pd.DataFrame({"5d_pct_SP500": [1.0, np.nan, -3.0]})
+    expected = df.apply(scoring_Euclidean.compute_scores_system_a, axis=1).to_numpy()
+    np.testing.assert_array_equal(scoring_Euclidean.compute_scores_system_a_vectorized(df).to_numpy(), expected)
+
+
+# ========== System B ==========
+def test_system_b_score_matrix_matches_rowwise(frame):
+    got = scoring_Original.score_matrix_system_b(frame)
+    for last in (None, "Steady Climb"):
+        for i, (_, row) in enumerate(frame.iterrows()):
+            scores = scoring_Original.score_row_system_b(row, last)
+            assert [scores.get(state) for state in scoring_Original.STATES_B if state in scores] == \
+                [got[i, j] for j, state in enumerate(scoring_Original.STATES_B) if state in scores]
+
+
+def test_system_b_states_match_rowwise(frame):
+    expected = classify_system_b_rowwise(frame)
+    got = scoring_Original.classify_market_states_system_b(frame)
+    pd.testing.assert_frame_equal(got[expected.columns], expected, check_dtype=False)
+
+
+def sticky_states_rowwise(scores, initial_state, gap):
+    best_with = scores.argmax(axis=1)
+    without = scores.copy()
+    without[:, scoring_Original.TREND_PULLBACK] = np.iinfo(np.int64).min
+    best_without = without.argmax(axis=1)
+    states, best_scores, prev_states = [0] * len(scores), [0] * len(scores), [0] * len(scores)
+    scoring_Original._sticky_kernel(scores.tolist(), best_with.tolist(), best_without.tolist(),
+                                    initial_state, gap, states, best_scores, prev_states)
+    return states, best_scores, prev_states
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_sticky_states_match_kernel(seed):
+    rng = np.random.default_rng(seed)
+    for n in (0, 1, 2, 7, 50, 401):
+        scores = rng.integers(0, 13, (n, len(scoring_Original.STATES_B))).astype(np.int64)
+        for initial_state in range(-1, len(scoring_Original.STATES_B)):
+            for gap in (0, 1, 2, 3):
+                got = scoring_Original._sticky_states(scores, initial_state, gap)
+                for values, expected in zip(got, sticky_states_rowwise(scores, initial_state, gap)):
+                    assert values.dtype == np.int64
+                    np.testing.assert_array_equal(values, expected)
@@ -0,0 +1,140 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.storage import CsvBackend, ParquetBackend
+
+
+def frame(start, periods, offset=0):
+    dates = pd.date_range(start, periods=periods, freq="D")
+    return pd.DataFrame({"Date": dates, "Close": np.arange(periods, dtype=np.float64) + offset + 0.25})
+
+
+@pytest.fixture
+def csv(tmp_path):
+    path = str(tmp_path / "frame.csv")
+    CsvBackend().write(frame("2020-01-01", 400), path)
+    return path
+
+
+def test_append_writes_in_place(csv):
+    backend = CsvBackend()
+    inode, size = os.stat(csv).st_ino, os.path.getsize(csv)
+    backend.append(frame("2021-02-04", 2, offset=1000), csv)
+    assert os.stat(csv).st_ino == inode
+    assert os.path.getsize(csv) > size
+    df = backend.read(csv)
+    assert len(df) == 402
+    assert df["Close"].iloc[-1] == 1001.25
+    assert not os.path.exists(csv + ".undo")
+
+
+def test_append_rejects_old_dates(csv):
+    with pytest.raises(ValueError):
+        CsvBackend().append(frame("2020-06-01", 1), csv)
+
+
+def test_correct_rewrites_only_the_tail(csv):
+    backend = CsvBackend()
+    inode = os.stat(csv).st_ino
+    fix = pd.DataFrame({"Date": [pd.Timestamp("2021-01-30")], "Close": [-1.0]})
+    assert backend.correct(fix, csv, window=20)
+    assert os.stat(csv).st_ino == inode
+    df = backend.read(csv)
+    assert len(df) == 400
+    assert df.loc[df["Date"] == "2021-01-30", "Close"].item() == -1.0
+    pd.testing.assert_frame_equal(df.iloc[:390], frame("2020-01-01", 390), check_freq=False)
+
+
+def test_correct_outside_window_is_refused(csv):
+    fix = pd.DataFrame({"Date": [pd.Timestamp("2020-02-01")], "Close": [-1.0]})
+    assert not CsvBackend().correct(fix, csv, window=20)
+
+
+def test_truncate_inside_and_outside_window(csv):
+    backend = CsvBackend()
+    backend.truncate(csv, "2021-01-25", window=20)
+    assert backend.read(csv)["Date"].max() == pd.Timestamp("2021-01-24")
+    backend.truncate(csv, "2020-03-01", window=20)
+    df = backend.read(csv)
+    assert df["Date"].max() == pd.Timestamp("2020-02-29")
+    assert len(df) == 60
+
+
+def test_interrupted_write_is_rolled_back(csv):
+    before = open(csv, "rb").read()
+    offset = len(before) - 40
+    # Simulate a crash after the undo record was synced and the tail half-written
+    with open(csv + ".undo", "wb") as u:
+        u.write(f"{offset}\n".encode() + before[offset:])
+    with open(csv, "r+b") as f:
+        f.truncate(offset)
+        f.seek(offset)
+        f.write(b"2021-02-0")
+    with open(csv + ".tmp", "wb") as f:
+        f.write(b"partial")
+
+    df = CsvBackend().read(csv)
+    assert open(csv, "rb").read() == before
+    assert len(df) == 400
+    assert not os.path.exists(csv + ".undo")
+    assert not os.path.exists(csv + ".tmp")
+
+
+def test_readers_never_see_a_partial_tail(csv):
+    backend = CsvBackend()
+    stop, errors = threading.Event(), []
+
+    def reader():
+        while not stop.is_set():
+            try:
+                df = backend.read(csv)
+                assert df["Date"].is_monotonic_increasing and df["Close"].notna().all()
+            except Exception as e:
+                errors.append(e)
+                return
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    try:
+        for i in range(30):
+            backend.append(frame(pd.Timestamp("2021-02-04") + pd.Timedelta(days=i), 1, offset=i), csv)
+        backend.truncate(csv, "2021-02-20", window=50)
+    finally:
+        stop.set()
+        thread.join()
+    assert not errors
+    assert backend.read(csv)["Date"].max() == pd.Timestamp("2021-02-19")
+
+
+def test_parquet_readers_never_see_a_partial_upsert(tmp_path):
+    pytest.importorskip("pyarrow")
+    backend = ParquetBackend()
+    path = str(tmp_path / "frame.csv")
+    backend.write(frame("2020-01-01", 400), path)
+    # One row in each year partition, changed together by every upsert
+    dates = pd.to_datetime(["2020-12-30", "2021-01-02"])
+    stop, errors = threading.Event(), []
+
+    def reader():
+        while not stop.is_set():
+            try:
+                closes = backend.read(path).set_index("Date").loc[dates, "Close"]
+                assert closes.iloc[0] == closes.iloc[1] or closes.iloc[0] == 364.25
+            except Exception as e:
+                errors.append(e)
+                return
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    try:
+        for i in range(30):
+            backend.upsert(pd.DataFrame({"Date": dates, "Close": [float(i), float(i)]}), path)
+    finally:
+        stop.set()
+        thread.join()
+    assert not errors
+    assert (backend.read(path).set_index("Date").loc[dates, "Close"] == 29.0).all()